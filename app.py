@@ -1,20 +1,51 @@
 from flask import (
     Flask, render_template, request, redirect, url_for, 
-    session, jsonify, abort
+    session, jsonify, abort, g, has_request_context, has_app_context, Response, stream_with_context,
+    before_render_template, template_rendered
 )
-from core.case_manager import manager 
+from core.case_manager import CaseManager, manager, registro, CLAVE_LOCAL
+from core.autoguardado import autoguardado
+from core.almacen import AlmacenCasos
 from core.models import (
     DatosProyeccion, ActivoFijo, InversionDiferidaItem, 
-    CapitalTrabajoItem, ItemRolPagos, AnioRolPagos, RegistroConsumoDiario, RegistroConsumoMensual, DatosFinanciamiento, ItemWacc, DatosWacc, DatosAmortizacion
+    CapitalTrabajoItem, ItemRolPagos, RegistroConsumoDiario, RegistroConsumoMensual, DatosFinanciamiento, ItemWacc, DatosWacc, DatosAmortizacion,
+    DatosFlujo, Escenario, DatosSimulacion, Distribucion, DatosEnergia, TramoTarifa, PeriodoTarifa,
+    MAX_ANIOS_PROYECCION_LOTE
 )
 from core.calculations import (
-    calcular_proyeccion, inversion_total_activos, 
+    calcular_proyeccion, proyectar_productos, inversion_total_activos, 
     inversion_total_diferida, inversion_total_capital_trabajo, 
     inversion_total_general, sincronizar_total_capital_trabajo
 )
-
-import copy
-import dataclasses
+from core.amortizacion import (
+    METODOS_AMORTIZACION, monto_prestamo, tabla_amortizacion_caso,
+    resumir_por_anio, totales_anuales_amortizacion
+)
+from core.depreciacion import (
+    METODOS_DEPRECIACION, matriz_depreciacion, matriz_amortizacion_diferida
+)
+from core.flujo import CONCEPTOS_FLUJO, evaluar_escenarios, flujo_escenario
+from core.payback import evaluar_payback, payback_escenario, formato_periodo
+from core.wacc import TABLAS_WACC, matriz_roe, leer_cambio
+from core.importacion import TIPOS_IMPORTACION, IMPORTACION_CARGOS, leer_lote, detectar_formato
+from core.nomina import calcular_nomina
+from core.columnar import compactar_inversion, sumar_campo
+from core.simulacion import simular
+from core.sensibilidad import barrido, tornado, valores_rango
+from core.portafolio import cargar_portafolio
+from core.energia import importar_serie, ruta_serie, actualizar_resumen, validar_tarifa
+from core.exportacion import EXPORTADORES, FORMATOS_EXPORTACION, cuadro_resumen
+from core.fragmentos import fragmentos, clave_pestana, etag_pestana
+from core.metricas import metricas, medir, RegistroLentas, METRICA_PETICIONES, METRICA_TRAMOS, UMBRAL_LENTAS_MS
+
+from core.codec import a_dict
+from werkzeug.http import is_resource_modified
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import csv
+import os
+import time
+import uuid
 
 # -------------------------------------------------------------------
 # CONFIGURACIÓN INICIAL
@@ -22,13 +53,158 @@ import dataclasses
 app = Flask(__name__)
 app.secret_key = 'tu_clave_secreta_aqui' 
 
+# Persistencia: 'completo' (instantánea en cada guardado) o 'diario' (cambios + compactación)
+CaseManager.modo_persistencia = os.environ.get('MERCURIOS_PERSISTENCIA', CaseManager.modo_persistencia)
+CaseManager.umbral_diario = int(os.environ.get('MERCURIOS_UMBRAL_DIARIO', CaseManager.umbral_diario))
+# Formato de los casos nuevos: 'json' o 'binario' (.mcaso, más compacto y rápido de leer)
+CaseManager.formato = os.environ.get('MERCURIOS_FORMATO', CaseManager.formato)
+# Tablas de inversión con al menos estas filas se cargan en formato columnar (0 = desactivado)
+CaseManager.umbral_columnar = int(os.environ.get('MERCURIOS_UMBRAL_COLUMNAR', CaseManager.umbral_columnar))
+
+# Intervalo del autoguardado diferido (segundos)
+autoguardado.intervalo = float(os.environ.get('MERCURIOS_AUTOGUARDADO_SEG', autoguardado.intervalo))
+
+# Límites del registro de casos abiertos (uno por sesión)
+registro.max_casos = int(os.environ.get('MERCURIOS_MAX_CASOS', registro.max_casos))
+registro.max_bytes = int(os.environ.get('MERCURIOS_MEMORIA_CASOS_MB', registro.max_bytes // (1024 * 1024))) * 1024 * 1024
+
+# Pestañas renderizadas que se guardan en memoria (0 = sin caché)
+fragmentos.max_entradas = int(os.environ.get('MERCURIOS_CACHE_PESTANAS', fragmentos.max_entradas))
+
+# Servidor con varios workers (servidor.py): el caso activo de cada sesión se comparte
+# entre procesos mediante el almacén SQLite de resources/almacen
+if os.environ.get('MERCURIOS_ALMACEN'):
+    registro.usar_almacen(AlmacenCasos(os.environ['MERCURIOS_ALMACEN']))
+
+# Instrumentación (/metrics) y registro de peticiones lentas, con perfil cProfile opcional
+metricas.activo = os.environ.get('MERCURIOS_METRICAS', '1') != '0'
+lentas = RegistroLentas(
+    archivo=os.environ.get('MERCURIOS_LOG_LENTAS'),
+    umbral_ms=float(os.environ.get('MERCURIOS_LENTAS_MS', UMBRAL_LENTAS_MS)),
+    perfilar=os.environ.get('MERCURIOS_PERFILAR') == '1'
+)
+
+# Procesos de la simulación Monte Carlo y del barrido de sensibilidad (0 = uno por núcleo)
+PROCESOS_SIMULACION = int(os.environ.get('MERCURIOS_PROCESOS_SIMULACION', 0)) or None
+
 app.jinja_env.globals.update(
+    matriz_roe=matriz_roe,
+    evaluar_escenarios=evaluar_escenarios,
+    flujo_escenario=flujo_escenario,
+    evaluar_payback=evaluar_payback,
+    payback_escenario=payback_escenario,
+    formato_periodo=formato_periodo,
+    cuadro_resumen=cuadro_resumen,
+    conceptos_flujo=CONCEPTOS_FLUJO,
     inversion_total_activos=inversion_total_activos,
     inversion_total_diferida=inversion_total_diferida,
     inversion_total_capital_trabajo=inversion_total_capital_trabajo,
-    inversion_total_general=inversion_total_general
+    inversion_total_general=inversion_total_general,
+    totales_anuales_amortizacion=totales_anuales_amortizacion,
+    matriz_depreciacion=matriz_depreciacion,
+    matriz_amortizacion_diferida=matriz_amortizacion_diferida
 )
 
+# -------------------------------------------------------------------
+# MÉTRICAS Y PETICIONES LENTAS
+# -------------------------------------------------------------------
+# Se registran antes que el bloqueo por caso: la latencia incluye la espera del bloqueo
+
+metricas.describir('mercurios_peticiones_total', 'Peticiones atendidas por ruta, método y estado HTTP')
+metricas.describir('mercurios_peticiones_lentas_total', 'Peticiones por encima del umbral de lentitud')
+metricas.agregar_medidor('mercurios_casos_abiertos', 'Casos abiertos en memoria en este proceso',
+                         lambda: sum(1 for caso in registro.casos_abiertos().values() if caso))
+metricas.agregar_medidor('mercurios_cache_pestanas_aciertos_total', 'Pestañas servidas desde la caché de fragmentos',
+                         lambda: fragmentos.aciertos, tipo='counter')
+metricas.agregar_medidor('mercurios_cache_pestanas_fallos_total', 'Pestañas renderizadas por no estar en la caché',
+                         lambda: fragmentos.fallos, tipo='counter')
+
+
+@app.before_request
+def iniciar_medicion():
+    g.inicio_peticion = time.perf_counter()
+    g.perfil = lentas.iniciar_perfil()
+
+
+@app.after_request
+def anotar_estado(respuesta):
+    g.estado = respuesta.status_code
+    return respuesta
+
+
+@app.teardown_request
+def registrar_medicion(exc):
+    """Latencia por ruta (plantilla de la URL, no la URL concreta) y registro de peticiones lentas."""
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+    estado = g.pop('estado', 500)
+    metricas.observar(METRICA_PETICIONES, segundos, ruta=ruta, metodo=request.method)
+    metricas.incrementar('mercurios_peticiones_total', ruta=ruta, metodo=request.method, estado=str(estado))
+    entrada = {'metodo': request.method, 'ruta': ruta, 'url': request.full_path.rstrip('?'),
+               'endpoint': request.endpoint, 'estado': estado}
+    if lentas.registrar(entrada, segundos * 1000, g.pop('perfil', None)):
+        metricas.incrementar('mercurios_peticiones_lentas_total', ruta=ruta, metodo=request.method)
+
+
+@before_render_template.connect_via(app)
+def iniciar_plantilla(sender, template, context, **extra):
+    g.setdefault('plantillas', []).append(time.perf_counter())
+
+
+@template_rendered.connect_via(app)
+def registrar_plantilla(sender, template, context, **extra):
+    plantillas = g.get('plantillas')
+    if plantillas:
+        metricas.observar(METRICA_TRAMOS, time.perf_counter() - plantillas.pop(), tramo=f'plantilla:{template.name}')
+
+
+@app.route('/metrics')
+def metricas_prometheus():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return Response(metricas.texto_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+# -------------------------------------------------------------------
+# SESIONES Y BLOQUEO POR CASO
+# -------------------------------------------------------------------
+
+def clave_sesion() -> str:
+    """Identificador estable de la sesión del navegador; cada sesión tiene su propio caso activo."""
+    if not has_request_context():
+        return CLAVE_LOCAL
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return session['sid']
+
+registro.configurar_clave(clave_sesion)
+# Dentro de una petición, `manager` usa el gestor fijado por bloquear_caso_sesion
+registro.configurar_gestor(lambda: g.get('gestor') if has_app_context() else None)
+
+
+@app.before_request
+def bloquear_caso_sesion():
+    """Toma el bloqueo del caso de la sesión durante toda la petición."""
+    if request.endpoint in ('static', 'metricas_prometheus'):
+        return # Sin sesión: no crean un caso por cada petición de un cliente sin cookie
+    g.clave = registro.clave_actual()
+    g.gestor = registro.obtener(g.clave, fijar=True) # Fijado: no se desaloja durante la petición
+    g.gestor.lock.acquire()
+    # Con varios workers: bloqueo entre procesos y caso al día según el almacén compartido
+    g.franja = registro.sincronizar(g.clave, g.gestor)
+
+
+@app.teardown_request
+def liberar_caso_sesion(exc):
+    gestor = g.pop('gestor', None)
+    if gestor is not None:
+        try:
+            registro.publicar(g.clave, gestor, g.pop('franja', None))
+        finally:
+            gestor.lock.release()
+            registro.soltar(gestor)
+
 # -------------------------------------------------------------------
 # RUTAS DE NAVEGACIÓN
 # -------------------------------------------------------------------
@@ -45,11 +221,61 @@ def cerrar_caso():
     session.pop('needs_name', None)
     return redirect(url_for('index'))
 
+CASOS_POR_PAGINA = 20
+
 @app.route('/reporte')
 def reporte():
-    """Lista los proyectos guardados."""
-    casos = manager.listar_casos()
-    return render_template('reporte.html', casos=casos)
+    """Lista los proyectos guardados desde el catálogo, con búsqueda, filtros, orden y paginación."""
+    args = request.args
+    filtros = {
+        'texto': args.get('q', '').strip() or None,
+        'orden': args.get('orden', 'fecha_creacion'),
+        'descendente': args.get('dir', 'desc') != 'asc',
+        'pagina': args.get('pagina', 1, type=int),
+        'por_pagina': CASOS_POR_PAGINA,
+        'inversion_min': args.get('inv_min', type=float),
+        'inversion_max': args.get('inv_max', type=float),
+        'desde': args.get('desde') or None,
+        'hasta': args.get('hasta') or None,
+    }
+    if args.get('periodo') == 'mes':
+        filtros['desde'] = datetime.now().strftime('%Y-%m-01')
+
+    casos, total = manager.consultar_casos(refrescar=bool(args.get('refrescar')), **filtros)
+    paginas = max((total + CASOS_POR_PAGINA - 1) // CASOS_POR_PAGINA, 1)
+    return render_template(
+        'reporte.html', casos=casos, total=total,
+        pagina=filtros['pagina'], paginas=paginas, filtros=args
+    )
+
+@app.route('/portafolio')
+def portafolio():
+    """Compara los casos guardados seleccionados (?archivos=...) sin activarlos."""
+    disponibles = manager.listar_casos()
+    seleccion = request.args.getlist('archivos')
+    try:
+        resultado = cargar_portafolio(seleccion) if seleccion else None
+    except ValueError as e:
+        abort(400, description=str(e))
+    return render_template(
+        'portafolio.html', disponibles=disponibles, seleccion=seleccion, resultado=resultado
+    )
+
+
+@app.route('/api/portafolio', methods=['GET', 'POST'])
+def api_portafolio():
+    """Métricas y totales de varios casos guardados; sin selección compara todos los casos."""
+    if request.method == 'POST':
+        archivos = (request.get_json(silent=True) or {}).get('archivos')
+    else:
+        archivos = request.args.getlist('archivos')
+    if not isinstance(archivos, list) or not archivos:
+        archivos = manager.listar_casos()
+    try:
+        resultado = cargar_portafolio([str(a) for a in archivos])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **resultado})
 
 @app.route('/nuevo-caso/<tab_name>', defaults={'sub_tab_name': None})
 @app.route('/nuevo-caso', defaults={'tab_name': 'proyeccion', 'sub_tab_name': None})
@@ -98,14 +324,27 @@ def nuevo_caso(tab_name: str, sub_tab_name: str):
     else:
         sub_tab_name = None 
 
-    return render_template(
-        'nuevo_caso.html', 
-        tabs=tabs,
-        active_tab=tab_name,
-        sub_tab=sub_tab_name, 
-        inversion_sub_tabs=inversion_sub_tabs,
-        caso=caso
-    )
+    # La pestaña solo cambia con la revisión del caso: 304 si el navegador ya la tiene,
+    # o el fragmento ya renderizado si está en la caché
+    etag = etag_pestana(caso, tab_name, sub_tab_name)
+    modificado_en = caso._modificado_en.replace(microsecond=0)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modificado_en):
+        respuesta = app.response_class(status=304)
+    else:
+        contexto = dict(active_tab=tab_name, sub_tab=sub_tab_name, inversion_sub_tabs=inversion_sub_tabs, caso=caso)
+        contenido_tab = fragmentos.obtener(
+            clave_pestana(caso, tab_name, sub_tab_name),
+            lambda: render_template('tabs/contenido.html', **contexto)
+        )
+        respuesta = app.make_response(render_template(
+            'nuevo_caso.html', tabs=tabs, contenido_tab=contenido_tab, **contexto
+        ))
+    respuesta.set_etag(etag)
+    respuesta.last_modified = modificado_en
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True # Siempre revalidar con el ETag
+    respuesta.vary.add('Cookie')
+    return respuesta
 
 @app.route('/iniciar-caso', methods=['POST'])
 def iniciar_caso():
@@ -135,6 +374,21 @@ def guardar_caso():
     return f"Error al guardar: {result}", 500
 
 
+@app.route('/exportar/<formato>')
+def exportar_caso(formato):
+    """Descarga el reporte completo del caso activo (csv o html) como respuesta en flujo."""
+    caso = validar_caso_activo()
+    if formato not in EXPORTADORES:
+        abort(404, description=f"Formato de exportación desconocido: {formato}")
+    mimetype, extension = FORMATOS_EXPORTACION[formato]
+    nombre = (secure_filename(os.path.splitext(caso.filename or caso.nombre)[0]) or 'reporte') + extension
+    return Response(
+        stream_with_context(EXPORTADORES[formato](caso)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+    )
+
+
 @app.route('/cargar-caso/<filename>')
 def cargar_caso(filename):
     """Carga un caso desde el disco y lo establece como activo."""
@@ -143,52 +397,13 @@ def cargar_caso(filename):
     return "Error al cargar el archivo. Puede estar corrupto o no existir.", 400
 
 
+@medir('regenerar_proyeccion_rol')
 def regenerar_proyeccion_rol(caso):
     """
-    Reconstruye la proyección anual del Rol de Pagos, aplicando el incremento salarial (1.03) 
-    a partir del Año 2, y asegura que existan N años de proyección.
+    Ajusta el Rol de Pagos al horizonte de proyección del caso. Solo se calculan los años
+    nuevos; los años proyectados (incremento salarial 1.03 desde el Año 2) se generan bajo demanda.
     """
-    
-    num_proyeccion_anos = caso.proyeccion.num_proyeccion
-    
-    # Si no hay cargos en el rol (es la primera vez), solo inicializa la lista de años
-    if not caso.rol_pagos.proyeccion_anual or not caso.rol_pagos.proyeccion_anual[0].items:
-        # Crea una lista de N AnioRolPagos vacíos
-        caso.rol_pagos.proyeccion_anual = [AnioRolPagos() for _ in range(num_proyeccion_anos)]
-        return
-
-    # Cargos base (se obtienen del primer año, que siempre debe ser la fuente de verdad)
-    cargos_base = caso.rol_pagos.proyeccion_anual[0].items
-
-    # 1. Reiniciar la proyección anual
-    caso.rol_pagos.proyeccion_anual = []
-    
-    # 2. Iterar y proyectar para cada año
-    for anio in range(num_proyeccion_anos):
-        anio_rol = AnioRolPagos()
-        
-        for cargo_item in cargos_base:
-            # Clonar el cargo del AÑO BASE (cargo_item) para empezar el cálculo
-            clon_cargo = copy.deepcopy(cargo_item) 
-            
-            # --- LÓGICA DE INCREMENTO SALARIAL (1.03) ---
-            if anio > 0: 
-                # Sueldo del año anterior (base para el incremento)
-                
-                # Para simplificar y evitar buscar en el año anterior que acabamos de crear,
-                # aplicamos el factor de incremento de forma acumulada sobre el sueldo base (Año 1)
-                
-                # Se calcula el factor de incremento: 1.03 elevado al número del año proyectado (anio)
-                factor_incremento = 1.03 ** anio
-                
-                # El nuevo sueldo nominal es el original * factor_incremento
-                clon_cargo.sueldo_nominal = cargo_item.sueldo_nominal * factor_incremento
-            # --- FIN INCREMENTO SALARIAL ---
-            
-            clon_cargo.calcular_rol() 
-            anio_rol.items.append(clon_cargo)
-            
-        caso.rol_pagos.proyeccion_anual.append(anio_rol)
+    caso.rol_pagos.ajustar_anios(caso.proyeccion.num_proyeccion)
 
 # -------------------------------------------------------------------
 # RUTAS DE GUARDADO DE DATOS (API POST)
@@ -212,8 +427,8 @@ def guardar_maquinarias():
     
     if nuevo_activo.descripcion:
         caso.inversion.activos_fijos.append(nuevo_activo)
+        manager.registrar_cambio('append', 'inversion.activos_fijos', a_dict(nuevo_activo)) # Autosave (diferido)
     
-    manager.guardar_caso_actual() # Autosave
     return redirect(url_for('nuevo_caso', tab_name='inversion', sub_tab_name='maquinarias'))
 
 
@@ -236,8 +451,8 @@ def guardar_diferida():
 
     if nuevo_item_diferido.descripcion:
         caso.inversion.inversion_diferida.append(nuevo_item_diferido)
+        manager.registrar_cambio('append', 'inversion.inversion_diferida', a_dict(nuevo_item_diferido)) # Autosave (diferido)
     
-    manager.guardar_caso_actual() # Autosave
     return redirect(url_for('nuevo_caso', tab_name='inversion', sub_tab_name='diferida'))
 
 
@@ -259,11 +474,65 @@ def guardar_capital():
 
     if nuevo_item_capital.descripcion:
         caso.inversion.capital_trabajo_items.append(nuevo_item_capital)
+        manager.registrar_cambio('append', 'inversion.capital_trabajo_items', a_dict(nuevo_item_capital)) # Autosave (diferido)
 
-    manager.guardar_caso_actual() # Autosave
     return redirect(url_for('nuevo_caso', tab_name='inversion', sub_tab_name='capital'))
 
 
+@app.route('/api/importar/<tipo>', methods=['POST'])
+def importar_items(tipo):
+    """
+    Importación masiva (activos, diferida, capital, consumo-mensual, consumo-diario).
+    Recibe un archivo 'archivo' (multipart) o el cuerpo CSV/JSON directamente; las filas
+    válidas se añaden en una sola operación y se informa el error de cada fila inválida.
+    Con ?estricto=1 no se importa nada si alguna fila tiene errores.
+    """
+    caso = validar_caso_activo()
+    config = TIPOS_IMPORTACION.get(tipo)
+    if config is None:
+        return jsonify({'success': False, 'message': f'Tipo de importación desconocido: {tipo}'}), 404
+
+    if request.mimetype == 'multipart/form-data':
+        archivo = request.files.get('archivo')
+        if archivo is None:
+            return jsonify({'success': False, 'message': "Falta el archivo 'archivo'."}), 400
+        flujo, formato = archivo.stream, detectar_formato(archivo.mimetype, archivo.filename)
+    else:
+        flujo, formato = request.stream, detectar_formato(request.mimetype)
+    formato = request.args.get('formato', formato)
+
+    try:
+        resultado = leer_lote(flujo, formato, config)
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'Archivo inválido: {e}'}), 400
+
+    respuesta = {
+        'num_errores': resultado.num_errores,
+        'errores': resultado.errores,
+        'total_lote': resultado.total_lote,
+    }
+    if resultado.num_errores and request.args.get('estricto') == '1':
+        return jsonify({'success': False, 'importados': 0, **respuesta}), 400
+
+    if resultado.items:
+        sin_consumos = not caso.inversion.consumos_mensuales
+        getattr(caso.inversion, config.tabla).extend(resultado.items)
+        manager.registrar_cambio('extend', f'inversion.{config.tabla}', [a_dict(i) for i in resultado.items]) # Un solo guardado
+        if config.tabla == 'capital_trabajo_items':
+            sincronizar_total_capital_trabajo(caso.inversion)
+            manager.registrar_cambio('set', 'inversion.capital_trabajo', caso.inversion.capital_trabajo)
+        if config.tabla == 'consumos_mensuales' and sin_consumos:
+            agregar_item_consumo_electrico(caso)
+        compactar_inversion(caso.inversion, CaseManager.umbral_columnar)
+
+    return jsonify({
+        'success': True,
+        'importados': len(resultado.items),
+        'total_tabla': sumar_campo(getattr(caso.inversion, config.tabla), config.campo_total),
+        **respuesta
+    })
+
+
 @app.route('/api/guardar-proyeccion', methods=['POST'])
 def guardar_proyeccion():
     """Guarda los datos de la Proyección (usa JSON para el recálculo AJAX)."""
@@ -289,7 +558,7 @@ def guardar_proyeccion():
     datos_proyeccion.resultados_proyeccion = resultados
     caso.proyeccion = datos_proyeccion
     
-    manager.guardar_caso_actual() # Autosave
+    manager.registrar_cambio('set', 'proyeccion', a_dict(datos_proyeccion)) # Autosave (diferido)
     return jsonify({
         'success': True, 
         'resultados': resultados,
@@ -297,6 +566,41 @@ def guardar_proyeccion():
     })
 
 
+@app.route('/api/guardar-proyeccion-productos', methods=['POST'])
+def guardar_proyeccion_productos():
+    """
+    Guarda y proyecta varias series de demanda (una por producto) en una sola llamada.
+    Espera JSON columnar: productos, demandas_iniciales, tasas_crecimiento y horizontes.
+    """
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        productos = [str(p) for p in data.get('productos', [])]
+        demandas = [float(d) for d in data.get('demandas_iniciales', [])]
+        tasas = [float(t) for t in data.get('tasas_crecimiento', [])]
+        horizontes = [int(h) for h in data.get('horizontes', [])]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
+
+    if not (len(productos) == len(demandas) == len(tasas) == len(horizontes)):
+        return jsonify({'success': False, 'message': 'Todas las listas deben tener la misma longitud.'}), 400
+    if any(h < 1 or h > MAX_ANIOS_PROYECCION_LOTE for h in horizontes):
+        return jsonify({'success': False, 'message': f'El número de años debe estar entre 1 y {MAX_ANIOS_PROYECCION_LOTE}.'}), 400
+
+    p = caso.proyeccion
+    p.productos, p.demandas_iniciales = productos, demandas
+    p.tasas_crecimiento, p.horizontes = tasas, horizontes
+    resultados = proyectar_productos(p)
+
+    for campo in ('productos', 'demandas_iniciales', 'tasas_crecimiento', 'horizontes', 'resultados_productos'):
+        manager.registrar_cambio('set', f'proyeccion.{campo}', getattr(p, campo)) # Autosave (diferido)
+    return jsonify({
+        'success': True,
+        'productos': productos,
+        'resultados': resultados
+    })
+
+
 @app.route('/api/guardar-rol-config', methods=['POST'])
 def guardar_rol_config():
     """Actualiza el número de años de proyección y reconstruye las tablas del Rol de Pagos."""
@@ -311,37 +615,142 @@ def guardar_rol_config():
         abort(400, description="Dato de años inválido.")
     regenerar_proyeccion_rol(caso)
     
+    manager.registrar_cambio('set', 'proyeccion.num_proyeccion', num_proyeccion_rol) # Autosave (diferido)
+    manager.registrar_cambio('set', 'rol_pagos.num_proyeccion', num_proyeccion_rol)
     return redirect(url_for('nuevo_caso', tab_name='rol-pagos'))
 
 
+def leer_cargo_formulario(form) -> ItemRolPagos:
+    """Construye un ItemRolPagos a partir de los campos del formulario (o JSON) del Rol de Pagos."""
+    cargo = ItemRolPagos(
+        cargo=form.get('cargo', ''),
+        sueldo_nominal=float(form.get('sueldo_nominal', 0)),
+        dias_trabajados=int(form.get('dias_trabajados', 30)),
+        no_he=float(form.get('no_he', 0) or 0),
+        no_hs=float(form.get('no_hs', 0) or 0),
+        no_jn=float(form.get('no_jn', 0) or 0),
+        comisiones=float(form.get('comisiones', 0) or 0),
+        anticipos=float(form.get('anticipos', 0) or 0),
+        descuentos=float(form.get('descuentos', 0) or 0),
+        quincenas=float(form.get('quincenas', 0) or 0)
+    )
+    cargo.calcular_rol()
+    return cargo
+
+
 @app.route('/api/guardar-rol-cargo', methods=['POST'])
 def guardar_rol_cargo():
-    """Guarda un nuevo cargo en la lista base y reconstruye la proyección."""
+    """Guarda un nuevo cargo en la lista base y actualiza solo sus años proyectados."""
     caso = validar_caso_activo()
     try:
-        nuevo_cargo = ItemRolPagos(
-            cargo=request.form.get('cargo', ''),
-            sueldo_nominal=float(request.form.get('sueldo_nominal', 0)),
-            dias_trabajados=int(request.form.get('dias_trabajados', 30)),
-            no_he=float(request.form.get('no_he', 0)),
-            no_hs=float(request.form.get('no_hs', 0)),
-            no_jn=float(request.form.get('no_jn', 0)),
-            comisiones=float(request.form.get('comisiones', 0)),
-            anticipos=float(request.form.get('anticipos', 0)),
-            descuentos=float(request.form.get('descuentos', 0)),
-            quincenas=float(request.form.get('quincenas', 0))
-        )
-        nuevo_cargo.calcular_rol() 
-
+        nuevo_cargo = leer_cargo_formulario(request.form)
     except ValueError:
         abort(400, description="Datos numéricos inválidos en el formulario de Rol de Pagos.")
-    caso.rol_pagos.proyeccion_anual[0].items.append(nuevo_cargo)
     regenerar_proyeccion_rol(caso)
+    caso.rol_pagos.agregar_cargo(nuevo_cargo)
     
-    manager.guardar_caso_actual() # Autosave
+    manager.registrar_cambio('set', 'rol_pagos.num_proyeccion', caso.rol_pagos.num_proyeccion) # Autosave (diferido)
+    manager.registrar_cambio('append', 'rol_pagos.cargos', a_dict(nuevo_cargo))
     return redirect(url_for('nuevo_caso', tab_name='rol-pagos'))
 
 
+@app.route('/api/actualizar-rol-cargo', methods=['POST'])
+def actualizar_rol_cargo():
+    """Edita un cargo base existente; devuelve los totales anuales actualizados."""
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        idx = int(data.get('index', -1))
+        cargo = leer_cargo_formulario(data)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos numéricos inválidos.'}), 400
+
+    if not 0 <= idx < len(caso.rol_pagos.cargos):
+        return jsonify({'success': False, 'message': 'Cargo inexistente.'}), 400
+    caso.rol_pagos.actualizar_cargo(idx, cargo)
+
+    manager.registrar_cambio('set', f'rol_pagos.cargos.{idx}', a_dict(cargo)) # Autosave (diferido)
+    return jsonify({
+        'success': True,
+        'totales_anuales': caso.rol_pagos.totales_anuales,
+        'gran_total_general': caso.rol_pagos.gran_total_general
+    })
+
+
+def agregar_item_consumo_electrico(caso):
+    """Crea el ítem 'Consumo electrico' del Capital de Trabajo a partir del primer consumo mensual."""
+    item_electrico = CapitalTrabajoItem(
+        descripcion="Consumo electrico",
+        valor_unitario=caso.inversion.consumos_mensuales[0].costo_usd,
+        cantidad=1
+    )
+    item_electrico.calcular_total()
+    caso.inversion.capital_trabajo_items.append(item_electrico)
+    sincronizar_total_capital_trabajo(caso.inversion)
+    manager.registrar_cambio('append', 'inversion.capital_trabajo_items', a_dict(item_electrico))
+    manager.registrar_cambio('set', 'inversion.capital_trabajo', caso.inversion.capital_trabajo)
+
+
+@app.route('/api/importar-rol', methods=['POST'])
+def importar_rol():
+    """
+    Importación masiva de cargos del Rol de Pagos (CSV o JSON, como /api/importar/<tipo>).
+    Los totales anuales se recalculan por columnas una sola vez para todo el lote.
+    """
+    caso = validar_caso_activo()
+    if request.mimetype == 'multipart/form-data':
+        archivo = request.files.get('archivo')
+        if archivo is None:
+            return jsonify({'success': False, 'message': "Falta el archivo 'archivo'."}), 400
+        flujo, formato = archivo.stream, detectar_formato(archivo.mimetype, archivo.filename)
+    else:
+        flujo, formato = request.stream, detectar_formato(request.mimetype)
+    formato = request.args.get('formato', formato)
+
+    try:
+        resultado = leer_lote(flujo, formato, IMPORTACION_CARGOS)
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'Archivo inválido: {e}'}), 400
+
+    respuesta = {'num_errores': resultado.num_errores, 'errores': resultado.errores}
+    if resultado.num_errores and request.args.get('estricto') == '1':
+        return jsonify({'success': False, 'importados': 0, **respuesta}), 400
+
+    if resultado.items:
+        regenerar_proyeccion_rol(caso)
+        caso.rol_pagos.agregar_cargos(resultado.items)
+        manager.registrar_cambio('set', 'rol_pagos.num_proyeccion', caso.rol_pagos.num_proyeccion) # Un solo guardado
+        manager.registrar_cambio('extend', 'rol_pagos.cargos', [a_dict(c) for c in resultado.items])
+
+    return jsonify({
+        'success': True,
+        'importados': len(resultado.items),
+        'num_cargos': len(caso.rol_pagos.cargos),
+        'totales_anuales': caso.rol_pagos.totales_anuales,
+        'gran_total_general': caso.rol_pagos.gran_total_general,
+        **respuesta
+    })
+
+
+@app.route('/api/rol-pagos/nomina')
+def obtener_nomina():
+    """
+    Rol de Pagos proyectado por columnas (cargos × años). ?campos=sueldo,pago_empleador elige
+    las columnas devueltas (por defecto solo totales); ?mensual=1 añade el total de cada mes.
+    """
+    caso = validar_caso_activo()
+    rol = caso.rol_pagos
+    campos = [c for c in request.args.get('campos', '').split(',') if c]
+    try:
+        resultado = calcular_nomina(rol.cargos, rol.factor_incremento, rol.num_proyeccion,
+                                    mensual=request.args.get('mensual') == '1', campos=campos)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not campos:
+        resultado.pop('anios')
+    return jsonify({'success': True, **resultado})
+
+
 @app.route('/api/guardar-consumo-mensual', methods=['POST'])
 def guardar_consumo_mensual():
     caso = validar_caso_activo()
@@ -352,17 +761,11 @@ def guardar_consumo_mensual():
             costo_usd=consumo * 100
         )
         caso.inversion.consumos_mensuales.append(nuevo_registro)
+        manager.registrar_cambio('append', 'inversion.consumos_mensuales', a_dict(nuevo_registro)) # Autosave (diferido)
         
         # Sincronización automática con Capital de Trabajo (Anexo 3)
         if len(caso.inversion.consumos_mensuales) == 1:
-            item_electrico = CapitalTrabajoItem(
-                descripcion="Consumo electrico",
-                valor_unitario=nuevo_registro.costo_usd,
-                cantidad=1
-            )
-            item_electrico.calcular_total()
-            caso.inversion.capital_trabajo_items.append(item_electrico)
-            sincronizar_total_capital_trabajo(caso.inversion)
+            agregar_item_consumo_electrico(caso)
 
     except ValueError:
         abort(400, description="Valores numéricos inválidos")
@@ -384,18 +787,120 @@ def guardar_consumo_diario():
             total=anual * costo_unitario
         )
         caso.inversion.consumos_diarios.append(nuevo_registro)
+        manager.registrar_cambio('append', 'inversion.consumos_diarios', a_dict(nuevo_registro)) # Autosave (diferido)
     except ValueError:
         abort(400, description="Valores numéricos inválidos")
     return redirect(url_for('nuevo_caso', tab_name='inversion', sub_tab_name='energetico'))
 
 
+def actualizar_item_consumo_electrico(caso):
+    """Lleva el costo anual de la serie de lecturas al ítem 'Consumo electrico' del Capital de Trabajo."""
+    items = caso.inversion.capital_trabajo_items
+    indice = next((i for i, item in enumerate(items) if item.descripcion == "Consumo electrico"), None)
+    if indice is None:
+        item = CapitalTrabajoItem(descripcion="Consumo electrico", valor_unitario=caso.energia.costo_anual, cantidad=1)
+        item.calcular_total()
+        items.append(item)
+        manager.registrar_cambio('append', 'inversion.capital_trabajo_items', a_dict(item)) # El diario debe crear el ítem
+    else:
+        item = items[indice]
+        item.valor_unitario = caso.energia.costo_anual
+        item.cantidad = 1
+        item.calcular_total()
+        manager.registrar_cambio('set', f'inversion.capital_trabajo_items.{indice}', a_dict(item))
+    sincronizar_total_capital_trabajo(caso.inversion)
+    manager.registrar_cambio('set', 'inversion.capital_trabajo', caso.inversion.capital_trabajo)
+
+
+@app.route('/api/energia')
+def obtener_energia():
+    """Resumen, acumulados (mensual y anual; diario con ?detalle=diario) y costo de la serie de lecturas."""
+    caso = validar_caso_activo()
+    resultado = actualizar_resumen(caso, con_diario=request.args.get('detalle') == 'diario')
+    return jsonify({'energia': a_dict(caso.energia), 'serie': resultado})
+
+
+@app.route('/api/energia/lecturas', methods=['POST'])
+def importar_lecturas_energia():
+    """
+    Importa lecturas por intervalo (CSV con columnas fecha y kwh) como archivo 'archivo'
+    (multipart) o en el cuerpo. Reemplaza la serie del caso y actualiza el costo anual en el
+    ítem 'Consumo electrico' del Capital de Trabajo. ?intervalo=N fija el intervalo en minutos.
+    """
+    caso = validar_caso_activo()
+    if request.mimetype == 'multipart/form-data':
+        archivo = request.files.get('archivo')
+        if archivo is None:
+            return jsonify({'success': False, 'message': "Falta el archivo 'archivo'."}), 400
+        flujo = archivo.stream
+    else:
+        flujo = request.stream
+
+    try:
+        intervalo = int(request.args.get('intervalo', 0)) or None
+        resultado = importar_serie(flujo, ruta_serie(caso), intervalo)
+    except (ValueError, TypeError, csv.Error, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'Archivo inválido: {e}'}), 400
+
+    serie = actualizar_resumen(caso)
+    manager.registrar_cambio('set', 'energia', a_dict(caso.energia)) # Autosave (diferido)
+    actualizar_item_consumo_electrico(caso)
+    return jsonify({
+        'success': True,
+        'lecturas': resultado.lecturas,
+        'huecos': resultado.huecos,
+        'num_errores': resultado.num_errores,
+        'errores': resultado.errores,
+        'energia': a_dict(caso.energia),
+        'serie': serie,
+    })
+
+
+@app.route('/api/energia/tarifa', methods=['POST'])
+def guardar_tarifa_energia():
+    """Guarda la tarifa (plana, escalonada u horaria) y recalcula el costo anual de la serie."""
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    datos = caso.energia
+    try:
+        tarifa = DatosEnergia(
+            tarifa=str(data.get('tarifa', datos.tarifa)).strip(),
+            precio_kwh=float(data.get('precio_kwh', datos.precio_kwh)),
+            cargo_fijo_mensual=float(data.get('cargo_fijo_mensual', datos.cargo_fijo_mensual)),
+            tramos=[
+                TramoTarifa(hasta_kwh=float(t.get('hasta_kwh', 0)), precio=float(t.get('precio', 0)))
+                for t in data['tramos']
+            ] if 'tramos' in data else datos.tramos,
+            periodos=[
+                PeriodoTarifa(
+                    dias=str(p.get('dias', 'todos')).strip(),
+                    hora_desde=float(p.get('hora_desde', 0)),
+                    hora_hasta=float(p.get('hora_hasta', 24)),
+                    precio=float(p.get('precio', 0))
+                )
+                for p in data['periodos']
+            ] if 'periodos' in data else datos.periodos
+        )
+        validar_tarifa(tarifa)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Tarifa inválida: {e}'}), 400
+
+    datos.tarifa, datos.precio_kwh, datos.cargo_fijo_mensual = tarifa.tarifa, tarifa.precio_kwh, tarifa.cargo_fijo_mensual
+    datos.tramos, datos.periodos = tarifa.tramos, tarifa.periodos
+    serie = actualizar_resumen(caso)
+    manager.registrar_cambio('set', 'energia', a_dict(datos)) # Autosave (diferido)
+    if serie is not None:
+        actualizar_item_consumo_electrico(caso)
+    return jsonify({'success': True, 'energia': a_dict(datos), 'serie': serie})
+
+
 @app.route('/api/actualizar-financiamiento', methods=['POST'])
 def actualizar_financiamiento():
     caso = validar_caso_activo()
     data = request.get_json()
     caso.financiamiento.porcentaje_propio = float(data.get('propio', 75))
     caso.financiamiento.porcentaje_externo = 100 - caso.financiamiento.porcentaje_propio
-    manager.guardar_caso_actual() # Autosave
+    manager.registrar_cambio('set', 'financiamiento', a_dict(caso.financiamiento)) # Autosave (diferido)
     return jsonify({
         'propio': caso.financiamiento.porcentaje_propio,
         'externo': caso.financiamiento.porcentaje_externo
@@ -411,7 +916,7 @@ def guardar_porcentaje():
         propio = float(data.get('propio', 75))
         caso.financiamiento.porcentaje_propio = propio
         caso.financiamiento.porcentaje_externo = 100 - propio
-        manager.guardar_caso_actual() # Autosave
+        manager.registrar_cambio('set', 'financiamiento', a_dict(caso.financiamiento)) # Autosave (diferido)
         return jsonify({'success': True})
     except ValueError:
         return jsonify({'success': False}), 400
@@ -426,7 +931,9 @@ def wacc_anhadir_fila():
     caso.wacc.tabla_utilidad.append(ItemWacc(nombre=nombre_defecto, valores_anuales=[0.0] * num_anos))
     caso.wacc.tabla_patrimonio.append(ItemWacc(nombre=nombre_defecto, valores_anuales=[0.0] * num_anos))
     
-    manager.guardar_caso_actual() # Autosave
+    fila = a_dict(caso.wacc.tabla_utilidad[-1])
+    manager.registrar_cambio('append', 'wacc.tabla_utilidad', fila) # Autosave (diferido)
+    manager.registrar_cambio('append', 'wacc.tabla_patrimonio', fila)
     return jsonify({'success': True})
 
 
@@ -438,49 +945,258 @@ def wacc_guardar_nombre():
     
     caso.wacc.tabla_utilidad[idx].nombre = nuevo_nombre
     caso.wacc.tabla_patrimonio[idx].nombre = nuevo_nombre
-    manager.guardar_caso_actual() # Autosave
+    manager.registrar_cambio('set', f'wacc.tabla_utilidad.{idx}.nombre', nuevo_nombre) # Autosave (diferido)
+    manager.registrar_cambio('set', f'wacc.tabla_patrimonio.{idx}.nombre', nuevo_nombre)
     return jsonify({'success': True})
 
 
+def aplicar_cambios_wacc(caso, cambios):
+    """Aplica cambios WACC ya validados (ver core/wacc.leer_cambio) y devuelve los agregados ROE que cambiaron."""
+    matriz = matriz_roe(caso)
+    celdas = []
+    for tipo, fila_idx, col_idx, valor in cambios:
+        if col_idx == 0:
+            # Sincronización de nombres (columna 0)
+            for tabla in TABLAS_WACC.values():
+                filas = getattr(caso.wacc, tabla)
+                if fila_idx < len(filas):
+                    filas[fila_idx].nombre = valor
+                    manager.registrar_cambio('set', f'wacc.{tabla}.{fila_idx}.nombre', valor) # Autosave (diferido)
+            continue
+
+        tabla = TABLAS_WACC[tipo]
+        valores = getattr(caso.wacc, tabla)[fila_idx].valores_anuales
+        k = col_idx - 1
+        if k < len(valores):
+            valores[k] = valor
+            manager.registrar_cambio('set', f'wacc.{tabla}.{fila_idx}.valores_anuales.{k}', valor) # Autosave (diferido)
+        else:
+            valores.extend([0.0] * (k + 1 - len(valores)))
+            valores[k] = valor
+            manager.registrar_cambio('set', f'wacc.{tabla}.{fila_idx}.valores_anuales', valores)
+        celdas.append((fila_idx, k))
+
+    resultado = matriz.actualizar_celdas(caso.wacc, celdas)
+    if caso.wacc.gran_total_general != matriz.promedio_final:
+        caso.wacc.gran_total_general = matriz.promedio_final
+        manager.registrar_cambio('set', 'wacc.gran_total_general', matriz.promedio_final)
+    return resultado
+
+
 @app.route('/api/wacc/guardar-celda', methods=['POST'])
 def wacc_guardar_celda():
     caso = validar_caso_activo()
-    data = request.json
-    tipo, fila_idx, col_idx = data['tipo'], data['fila'], data['col']
-    valor = str(data['valor'])
-    
-    # Sincronización de nombres (columna 0)
-    if col_idx == 0:
-        if fila_idx < len(caso.wacc.tabla_utilidad):
-            caso.wacc.tabla_utilidad[fila_idx].nombre = valor
-        if fila_idx < len(caso.wacc.tabla_patrimonio):
-            caso.wacc.tabla_patrimonio[fila_idx].nombre = valor
-    else:
-        # Guardado de valores numéricos
-        target_table = caso.wacc.tabla_utilidad if tipo == 'utilidad' else caso.wacc.tabla_patrimonio
+    try:
+        cambio = leer_cambio(request.get_json(silent=True) or {}, caso.wacc, caso.proyeccion.num_proyeccion)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Cambio inválido: {e}'}), 400
+    return jsonify({'success': True, **aplicar_cambios_wacc(caso, [cambio])})
+
+
+@app.route('/api/wacc/guardar-celdas', methods=['POST'])
+def wacc_guardar_celdas():
+    """
+    Guarda un lote de celdas WACC: {"cambios": [{tipo, fila, col, valor}, ...]}.
+    Devuelve solo las celdas ROE, promedios por año y promedio final que cambiaron.
+    """
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    cambios = []
+    for i, cambio in enumerate(data.get('cambios', [])):
         try:
-            val_float = float(valor.replace(',', ''))
-            target_table[fila_idx].valores_anuales[col_idx - 1] = val_float
-        except ValueError:
-            pass
-    return jsonify({'success': True})
+            cambios.append(leer_cambio(cambio, caso.wacc, caso.proyeccion.num_proyeccion))
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'success': False, 'message': f'Cambio {i} inválido: {e}'}), 400
+    return jsonify({'success': True, **aplicar_cambios_wacc(caso, cambios)})
 
 
 
+@app.route('/api/flujo')
+def obtener_flujo():
+    """Devuelve el flujo de caja, VAN y TIR de todos los escenarios del caso."""
+    caso = validar_caso_activo()
+    return jsonify(evaluar_escenarios(caso))
+
+
+@app.route('/api/payback')
+def obtener_payback():
+    """Devuelve los flujos acumulados y el payback simple y descontado de todos los escenarios."""
+    caso = validar_caso_activo()
+    return jsonify(evaluar_payback(caso))
+
+
+@app.route('/api/guardar-flujo', methods=['POST'])
+def guardar_flujo():
+    """Guarda precio, costos, tasas y escenarios; devuelve VAN y TIR de cada escenario."""
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        escenarios = [
+            Escenario(
+                nombre=str(e.get('nombre', '')).strip(),
+                factor_demanda=float(e.get('factor_demanda', 1)),
+                factor_precio=float(e.get('factor_precio', 1)),
+                factor_costos=float(e.get('factor_costos', 1))
+            )
+            for e in data.get('escenarios', [])
+        ]
+        datos = DatosFlujo(
+            precio_unitario=float(data.get('precio_unitario', caso.flujo.precio_unitario)),
+            costo_unitario=float(data.get('costo_unitario', caso.flujo.costo_unitario)),
+            gastos_fijos_anuales=float(data.get('gastos_fijos_anuales', caso.flujo.gastos_fijos_anuales)),
+            tasa_descuento=float(data.get('tasa_descuento', caso.flujo.tasa_descuento)),
+            participacion_trabajadores=float(data.get('participacion_trabajadores', caso.flujo.participacion_trabajadores)),
+            impuesto_renta=float(data.get('impuesto_renta', caso.flujo.impuesto_renta)),
+            escenarios=escenarios or caso.flujo.escenarios
+        )
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
+
+    nombres = [e.nombre.lower() for e in datos.escenarios]
+    if not all(nombres) or len(set(nombres)) != len(nombres):
+        return jsonify({'success': False, 'message': 'Cada escenario necesita un nombre único.'}), 400
+    if datos.tasa_descuento <= -100:
+        return jsonify({'success': False, 'message': 'La tasa de descuento debe ser mayor que -100%.'}), 400
+
+    caso.flujo = datos
+    manager.registrar_cambio('set', 'flujo', a_dict(datos)) # Autosave (diferido)
+    evaluacion = evaluar_escenarios(caso)
+    return jsonify({
+        'success': True,
+        'escenarios': [{'nombre': e['nombre'], 'van': e['van'], 'tir': e['tir']} for e in evaluacion['escenarios']]
+    })
+
+
+@app.route('/api/simulacion', methods=['POST'])
+def ejecutar_simulacion():
+    """
+    Guarda las distribuciones de la simulación Monte Carlo y la ejecuta.
+    Devuelve la distribución del VAN y la TIR, percentiles y probabilidad de pérdida.
+    """
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        distribuciones = [
+            Distribucion(
+                parametro=str(d.get('parametro', '')).strip(),
+                tipo=str(d.get('tipo', 'normal')).strip(),
+                media=float(d.get('media', 0)),
+                desviacion=float(d.get('desviacion', 0)),
+                minimo=float(d.get('minimo', 0)),
+                moda=float(d.get('moda', 0)),
+                maximo=float(d.get('maximo', 0))
+            )
+            for d in data.get('distribuciones', [])
+        ]
+        datos = DatosSimulacion(
+            distribuciones=distribuciones if 'distribuciones' in data else caso.simulacion.distribuciones,
+            trayectorias=int(data.get('trayectorias', caso.simulacion.trayectorias)),
+            semilla=int(data.get('semilla', caso.simulacion.semilla))
+        )
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
+
+    parametros = [d.parametro for d in datos.distribuciones]
+    if len(set(parametros)) != len(parametros):
+        return jsonify({'success': False, 'message': 'Cada parámetro admite una sola distribución.'}), 400
+
+    try:
+        resultado = simular(caso, datos, procesos=PROCESOS_SIMULACION)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    caso.simulacion = datos
+    manager.registrar_cambio('set', 'simulacion', a_dict(datos)) # Autosave (diferido)
+    return jsonify({'success': True, **resultado})
+
+
+@app.route('/api/sensibilidad', methods=['POST'])
+def ejecutar_sensibilidad():
+    """
+    Barre una rejilla de parámetros y devuelve VAN y payback de cada punto. Cada parámetro
+    se indica con {nombre, valores} o con {nombre, minimo, maximo, pasos}.
+    """
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        parametros = []
+        for p in data.get('parametros', []):
+            if 'valores' in p:
+                valores = [float(v) for v in p['valores']]
+            else:
+                valores = valores_rango(float(p['minimo']), float(p['maximo']), int(p.get('pasos', 10)))
+            parametros.append((str(p.get('nombre', '')).strip(), valores))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
+    if not parametros:
+        return jsonify({'success': False, 'message': 'Indique al menos un parámetro.'}), 400
+
+    try:
+        resultado = barrido(caso, parametros, procesos=PROCESOS_SIMULACION)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **resultado})
+
+
+@app.route('/api/tornado', methods=['POST'])
+def ejecutar_tornado():
+    """
+    Diagrama tornado del VAN: {variacion} aplica ±% a todos los parámetros, o
+    {rangos: {parametro: [bajo, alto]}} fija los extremos de cada uno.
+    """
+    caso = validar_caso_activo()
+    data = request.get_json(silent=True) or {}
+    try:
+        rangos = None
+        if data.get('rangos'):
+            rangos = {str(nombre): (float(bajo), float(alto)) for nombre, (bajo, alto) in data['rangos'].items()}
+        variacion = float(data.get('variacion', 10))
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
+
+    try:
+        resultado = tornado(caso, rangos, variacion)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **resultado})
+
+
+@app.route('/api/depreciacion')
+def obtener_depreciacion():
+    """Devuelve las matrices de depreciación y amortización diferida con sus totales por año."""
+    caso = validar_caso_activo()
+    return jsonify({
+        'depreciacion': matriz_depreciacion(caso).a_dict(),
+        'amortizacion': matriz_amortizacion_diferida(caso).a_dict()
+    })
+
+
 @app.route('/api/guardar-depreciacion-activo', methods=['POST'])
 def guardar_depreciacion_activo():
     caso = validar_caso_activo()
     try:
         data = request.get_json()
         idx = int(data.get('index', -1))
+        metodo = data.get('metodo', 'lineal')
         
-        if 0 <= idx < len(caso.inversion.activos_fijos):
+        if 0 <= idx < len(caso.inversion.activos_fijos) and metodo in METODOS_DEPRECIACION:
             activo = caso.inversion.activos_fijos[idx]
             activo.dep_tipo = data.get('tipo', '')
             activo.dep_porcentaje_residual = float(data.get('porcentaje_residual', 10.0))
             activo.dep_monto_valor_residual_pct = float(data.get('monto_residual_pct', 100.0))
-            manager.guardar_caso_actual() # Autosave
-            return jsonify({'success': True})
+            activo.dep_metodo = metodo
+            
+            # Solo se recalcula la fila del activo y los totales
+            matriz = matriz_depreciacion(caso)
+            fila = matriz.actualizar(idx, activo)
+            for campo in ('dep_tipo', 'dep_porcentaje_residual', 'dep_monto_valor_residual_pct', 'dep_metodo'):
+                manager.registrar_cambio('set', f'inversion.activos_fijos.{idx}.{campo}', getattr(activo, campo)) # Autosave (diferido)
+            return jsonify({
+                'success': True,
+                'fila': fila,
+                'totales': matriz.totales,
+                'total_valor_dep': matriz.total_valor_dep
+            })
             
     except ValueError:
         pass
@@ -499,8 +1215,16 @@ def guardar_amortizacion_diferida():
         if 0 <= idx < len(caso.inversion.inversion_diferida):
             item = caso.inversion.inversion_diferida[idx]
             item.amort_anios = anios
-            manager.guardar_caso_actual() # Autosave
-            return jsonify({'success': True})
+
+            matriz = matriz_amortizacion_diferida(caso)
+            fila = matriz.actualizar(idx, item)
+            manager.registrar_cambio('set', f'inversion.inversion_diferida.{idx}.amort_anios', anios) # Autosave (diferido)
+            return jsonify({
+                'success': True,
+                'fila': fila,
+                'totales': matriz.totales,
+                'total_valor_dep': matriz.total_valor_dep
+            })
             
     except ValueError:
         pass
@@ -508,17 +1232,45 @@ def guardar_amortizacion_diferida():
     return jsonify({'success': False}), 400
 
 
+def respuesta_tabla_amortizacion(caso):
+    """Serializa la tabla de amortización precalculada del caso (mensual y anual)."""
+    mensual = tabla_amortizacion_caso(caso)
+    return jsonify({
+        'success': True,
+        'prestamo': monto_prestamo(caso),
+        'interes_mensual': caso.amortizacion.interes_anual / 12,
+        'pagos_totales': len(mensual['mes']),
+        'mensual': mensual,
+        'anual': resumir_por_anio(mensual)
+    })
+
+
+@app.route('/api/tabla-amortizacion')
+def obtener_tabla_amortizacion():
+    """Devuelve la tabla de amortización calculada en el servidor."""
+    caso = validar_caso_activo()
+    return respuesta_tabla_amortizacion(caso)
+
+
 @app.route('/api/guardar-amortizacion', methods=['POST'])
 def guardar_amortizacion():
-    caso = manager.obtener_caso_actual()
+    caso = validar_caso_activo()
     data = request.get_json()
     
-    caso.amortizacion.interes_anual = float(data.get('interes_anual', 0))
-    caso.amortizacion.institucion = data.get('institucion', "")
-    caso.amortizacion.anios = int(data.get('anios', 5))
+    try:
+        metodo = data.get('metodo', caso.amortizacion.metodo)
+        if metodo not in METODOS_AMORTIZACION:
+            return jsonify({'success': False, 'message': 'Método de amortización inválido.'}), 400
+        caso.amortizacion.interes_anual = float(data.get('interes_anual', 0))
+        caso.amortizacion.institucion = data.get('institucion', "")
+        caso.amortizacion.anios = int(data.get('anios', 5))
+        caso.amortizacion.metodo = metodo
+        caso.amortizacion.meses_gracia = int(data.get('meses_gracia', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Datos de entrada inválidos.'}), 400
     
-    manager.guardar_caso_actual() # Autosave
-    return jsonify({'success': True})
+    manager.registrar_cambio('set', 'amortizacion', a_dict(caso.amortizacion)) # Autosave (diferido)
+    return respuesta_tabla_amortizacion(caso)
 
         
 # -------------------------------------------------------------------
@@ -0,0 +1,211 @@
+"""
+Prueba de carga: sesiones de analista simuladas contra app.py (en proceso, con el test client
+de Flask) desde varios hilos a la vez.
+
+Cada hilo es una sesión de navegador (su propio test client y cookie): crea un caso, lo
+agranda hasta el tamaño pedido con una importación masiva y repite el guion de la sesión
+(añadir ítems, editar celdas WACC, cambiar el financiamiento, recargar pestañas, guardar).
+Se informa el throughput y la latencia p50/p95/p99 de cada ruta para cada tamaño de caso, y
+se marcan las rutas cuya latencia crece con el tamaño del caso.
+
+Uso:
+    python benchmarks/bench_carga.py --hilos 8 --iteraciones 20 --tamanos 0,2000,10000
+    python benchmarks/bench_carga.py --salida /tmp/carga.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import case_manager
+
+UMBRAL_CRECIMIENTO = 2.0 # p50 del caso más grande / p50 del más pequeño a partir del cual se marca la ruta
+MINIMO_MS = 1.0 # Diferencias de p50 menores que esto no se marcan (ruido)
+
+
+#-----------------------
+# GUION DE LA SESIÓN
+#-----------------------
+
+def csv_activos(filas: int) -> bytes:
+    lineas = ["descripcion,valor_unitario,cantidad"]
+    lineas += [f"Activo carga {i},{100 + i % 900},{1 + i % 7}" for i in range(filas)]
+    return "\n".join(lineas).encode('utf-8')
+
+
+def guion(iteracion: int) -> List[Tuple[str, str, str, Dict]]:
+    """Peticiones de una vuelta del guion: (ruta para el informe, método, url, argumentos del client)."""
+    return [
+        ('POST /api/guardar-maquinarias', 'POST', '/api/guardar-maquinarias',
+         {'data': {'descripcion': f'Equipo {iteracion}', 'valor_unitario': '250.5', 'cantidad': '2'}}),
+        ('POST /api/wacc/anhadir-fila', 'POST', '/api/wacc/anhadir-fila', {}),
+        ('POST /api/wacc/guardar-celda', 'POST', '/api/wacc/guardar-celda',
+         {'json': {'tipo': 'utilidad', 'fila': 0, 'col': 1, 'valor': str(1000 + iteracion)}}),
+        ('POST /api/guardar-porcentaje-financiamiento', 'POST', '/api/guardar-porcentaje-financiamiento',
+         {'json': {'propio': 50 + iteracion % 40}}),
+        ('GET /nuevo-caso/inversion/maquinarias', 'GET', '/nuevo-caso/inversion/maquinarias', {}),
+        ('GET /nuevo-caso/wacc', 'GET', '/nuevo-caso/wacc', {}),
+        ('GET /nuevo-caso/financiamiento', 'GET', '/nuevo-caso/financiamiento', {}),
+        ('GET /api/flujo', 'GET', '/api/flujo', {}),
+        ('GET /guardar-caso', 'GET', '/guardar-caso', {}),
+    ]
+
+
+class Registro:
+    """Latencias por ruta, compartidas por todos los hilos."""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def anotar(self, ruta: str, ms: float, estado: int):
+        with self._lock:
+            self.latencias[ruta].append(ms)
+            if estado >= 400:
+                self.errores[ruta] += 1
+
+
+def _peticion(cliente, registro: Registro, ruta: str, metodo: str, url: str, argumentos: Dict):
+    inicio = time.perf_counter()
+    respuesta = cliente.open(url, method=metodo, **argumentos)
+    ms = (time.perf_counter() - inicio) * 1000
+    respuesta.close()
+    registro.anotar(ruta, ms, respuesta.status_code)
+
+
+def sesion(app, registro: Registro, indice: int, tamano: int, iteraciones: int, barrera: threading.Barrier):
+    cliente = app.test_client()
+    _peticion(cliente, registro, 'POST /iniciar-caso', 'POST', '/iniciar-caso',
+              {'data': {'nombre_caso': f'Carga {tamano} {indice}'}})
+    if tamano:
+        _peticion(cliente, registro, 'POST /api/importar/activos', 'POST', '/api/importar/activos',
+                  {'data': csv_activos(tamano), 'content_type': 'text/csv'})
+    barrera.wait() # Todas las sesiones empiezan el guion a la vez
+    for iteracion in range(iteraciones):
+        for ruta, metodo, url, argumentos in guion(iteracion):
+            _peticion(cliente, registro, ruta, metodo, url, argumentos)
+
+
+#-----------------------
+# ESTADÍSTICAS
+#-----------------------
+
+def percentil(ordenados: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    k = max(int(-(-p * len(ordenados) // 100)) - 1, 0)
+    return ordenados[min(k, len(ordenados) - 1)]
+
+
+def resumen(registro: Registro, segundos: float) -> Dict:
+    rutas = {}
+    for ruta, latencias in sorted(registro.latencias.items()):
+        ordenados = sorted(latencias)
+        rutas[ruta] = {
+            'peticiones': len(ordenados),
+            'errores': registro.errores.get(ruta, 0),
+            'rps': len(ordenados) / segundos if segundos else 0.0,
+            'p50_ms': percentil(ordenados, 50),
+            'p95_ms': percentil(ordenados, 95),
+            'p99_ms': percentil(ordenados, 99),
+        }
+    total = sum(r['peticiones'] for r in rutas.values())
+    return {'segundos': segundos, 'peticiones': total, 'rps': total / segundos if segundos else 0.0, 'rutas': rutas}
+
+
+def imprimir(tamano: int, datos: Dict):
+    print(f"\nCaso con {tamano} ítems: {datos['peticiones']} peticiones en {datos['segundos']:.2f} s "
+          f"({datos['rps']:.1f} peticiones/s)")
+    print(f"{'ruta':<46}{'n':>6}{'err':>5}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for ruta, r in datos['rutas'].items():
+        print(f"{ruta:<46}{r['peticiones']:>6}{r['errores']:>5}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+
+def crecimiento(por_tamano: Dict[int, Dict], umbral: float) -> List[Dict]:
+    """Rutas cuyo p50 en el caso más grande supera `umbral` veces el del más pequeño."""
+    tamanos = sorted(por_tamano)
+    if len(tamanos) < 2:
+        return []
+    menor, mayor = por_tamano[tamanos[0]]['rutas'], por_tamano[tamanos[-1]]['rutas']
+    marcadas = []
+    for ruta in menor:
+        if ruta not in mayor:
+            continue
+        antes, despues = menor[ruta]['p50_ms'], mayor[ruta]['p50_ms']
+        relacion = despues / antes if antes else float('inf')
+        if relacion >= umbral and despues - antes >= MINIMO_MS:
+            marcadas.append({'ruta': ruta, 'p50_menor_ms': antes, 'p50_mayor_ms': despues, 'relacion': relacion})
+    return sorted(marcadas, key=lambda m: m['relacion'], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga en proceso de app.py con sesiones simuladas.")
+    parser.add_argument('--hilos', type=int, default=8, help="Sesiones concurrentes")
+    parser.add_argument('--iteraciones', type=int, default=10, help="Vueltas del guion por sesión")
+    parser.add_argument('--tamanos', default='0,5000', help="Ítems importados en cada caso, separados por coma")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_CRECIMIENTO)
+    parser.add_argument('--salida', default=None, help="Archivo JSON con los resultados")
+    args = parser.parse_args(argv)
+    tamanos = [int(t) for t in args.tamanos.split(',') if t.strip()]
+
+    directorio = tempfile.mkdtemp(prefix='bench_carga_')
+    case_manager.CASES_DIR = directorio
+    from app import app, registro as registro_casos
+    from core.autoguardado import autoguardado
+    registro_casos.max_casos = max(registro_casos.max_casos, args.hilos * len(tamanos) + 1)
+
+    por_tamano = {}
+    try:
+        for tamano in tamanos:
+            registro = Registro()
+            barrera = threading.Barrier(args.hilos + 1)
+            hilos = [
+                threading.Thread(target=sesion, args=(app, registro, i, tamano, args.iteraciones, barrera), daemon=True)
+                for i in range(args.hilos)
+            ]
+            for hilo in hilos:
+                hilo.start()
+            barrera.wait()
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.join()
+            segundos = time.perf_counter() - inicio
+            # La creación del caso y la importación inicial no cuentan en el throughput del guion
+            for ruta in ('POST /iniciar-caso', 'POST /api/importar/activos'):
+                registro.latencias.pop(ruta, None)
+            por_tamano[tamano] = resumen(registro, segundos)
+            imprimir(tamano, por_tamano[tamano])
+        autoguardado.vaciar()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    marcadas = crecimiento(por_tamano, args.umbral)
+    if marcadas:
+        print(f"\nRutas cuya latencia crece con el tamaño del caso (p50 x{args.umbral:g} o más):")
+        for m in marcadas:
+            print(f"  {m['ruta']:<46}{m['p50_menor_ms']:>9.2f} ms -> {m['p50_mayor_ms']:>9.2f} ms  (x{m['relacion']:.1f})")
+    elif len(tamanos) > 1:
+        print("\nNinguna ruta crece con el tamaño del caso por encima del umbral.")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'hilos': args.hilos, 'iteraciones': args.iteraciones,
+                       'resultados': {str(t): d for t, d in por_tamano.items()}, 'crecen_con_el_caso': marcadas},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Benchmarks de los cálculos y la persistencia más usados, con resultados guardados por commit.
+
+Uso:
+    python benchmarks/bench_nucleo.py                          # mide y guarda resultados/<commit>.json
+    python benchmarks/bench_nucleo.py --items 20000 --cargos 5000 --anios 20
+    python benchmarks/bench_nucleo.py --comparar benchmarks/resultados/abc1234.json
+    python benchmarks/bench_nucleo.py --solo rol,persistencia
+
+Cada medición es el mejor tiempo y la mediana de --repeticiones ejecuciones. Con --comparar
+se muestra la relación con un resultado anterior y el proceso termina con código 1 si alguna
+mediana empeora más que --umbral (por defecto 10 %).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.generador import caso_sintetico
+from core import case_manager
+from core.case_manager import CaseManager, FORMATO_JSON, FORMATO_BINARIO, EXTENSIONES_CASO
+from core.calculations import (
+    calcular_proyeccion, inversion_total_activos, inversion_total_diferida,
+    inversion_total_capital_trabajo, inversion_total_general
+)
+
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), 'resultados')
+
+
+def medir(funcion, repeticiones: int, preparar=None) -> dict:
+    """Mejor tiempo y mediana en milisegundos; `preparar` se ejecuta antes de cada repetición sin medirse."""
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {'mejor_ms': min(tiempos), 'mediana_ms': statistics.median(tiempos)}
+
+
+#-----------------------
+# GRUPOS DE BENCHMARKS
+#-----------------------
+
+def bench_calculos(caso, args) -> dict:
+    inversion = caso.inversion
+    return {
+        'calcular_proyeccion': medir(lambda: calcular_proyeccion(caso.proyeccion), args.repeticiones),
+        'inversion_total_activos': medir(lambda: inversion_total_activos(inversion), args.repeticiones),
+        'inversion_total_diferida': medir(lambda: inversion_total_diferida(inversion), args.repeticiones),
+        'inversion_total_capital_trabajo': medir(lambda: inversion_total_capital_trabajo(inversion), args.repeticiones),
+        'inversion_total_general': medir(lambda: inversion_total_general(inversion), args.repeticiones),
+    }
+
+
+def bench_rol(caso, args) -> dict:
+    from app import regenerar_proyeccion_rol
+    rol = caso.rol_pagos
+
+    def calcular_roles():
+        for cargo in rol.cargos:
+            cargo.calcular_rol()
+
+    def reiniciar_anios():
+        # Sin años calculados: regenerar_proyeccion_rol calcula todo el horizonte
+        rol.totales_anuales = []
+        rol._anios_cache = {}
+
+    return {
+        'calcular_rol': medir(calcular_roles, args.repeticiones),
+        'regenerar_proyeccion_rol': medir(lambda: regenerar_proyeccion_rol(caso), args.repeticiones, reiniciar_anios),
+    }
+
+
+def bench_persistencia(caso, args) -> dict:
+    directorio = tempfile.mkdtemp(prefix='bench_casos_')
+    anterior = case_manager.CASES_DIR
+    case_manager.CASES_DIR = directorio
+    resultados = {}
+    try:
+        for formato in (FORMATO_JSON, FORMATO_BINARIO):
+            gestor = CaseManager()
+            caso.filename = f"benchmark{EXTENSIONES_CASO[formato]}"
+            gestor._caso_actual = caso
+
+            def guardar():
+                gestor._requiere_instantanea = True
+                exito, mensaje = gestor.guardar_caso_actual()
+                if not exito:
+                    raise RuntimeError(mensaje)
+
+            resultados[f'guardar_caso_actual[{formato}]'] = medir(guardar, args.repeticiones)
+            resultados[f'cargar_caso_desde_archivo[{formato}]'] = medir(
+                lambda: gestor.cargar_caso_desde_archivo(caso.filename), args.repeticiones)
+            resultados[f'tamano_archivo_kb[{formato}]'] = os.path.getsize(os.path.join(directorio, caso.filename)) / 1024
+    finally:
+        case_manager.CASES_DIR = anterior
+        shutil.rmtree(directorio, ignore_errors=True)
+    return resultados
+
+
+def bench_listado(caso, args) -> dict:
+    directorio = tempfile.mkdtemp(prefix='bench_listado_')
+    anterior = case_manager.CASES_DIR
+    case_manager.CASES_DIR = directorio
+    try:
+        extensiones = list(EXTENSIONES_CASO.values())
+        for i in range(args.archivos):
+            # listar_casos solo mira los nombres; los diarios y otros archivos también se recorren
+            nombre = f"caso_{i:06d}_20240101000000{extensiones[i % len(extensiones)]}"
+            open(os.path.join(directorio, nombre), 'wb').close()
+            if i % 10 == 0:
+                open(os.path.join(directorio, nombre + '.diario'), 'wb').close()
+        gestor = CaseManager()
+        return {f'listar_casos[{args.archivos}]': medir(gestor.listar_casos, args.repeticiones)}
+    finally:
+        case_manager.CASES_DIR = anterior
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+GRUPOS = {
+    'calculos': bench_calculos,
+    'rol': bench_rol,
+    'persistencia': bench_persistencia,
+    'listado': bench_listado,
+}
+
+
+#-----------------------
+# RESULTADOS POR COMMIT
+#-----------------------
+
+def commit_actual() -> str:
+    """Hash corto del commit (con '-modificado' si hay cambios sin confirmar)."""
+    raiz = os.path.join(os.path.dirname(__file__), '..')
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=raiz, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=raiz,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'sin-git'
+    return f"{commit}-modificado" if cambios else commit
+
+
+def comparar(actual: dict, anterior: dict, umbral: float) -> list:
+    """Imprime la relación actual/anterior de cada medición y devuelve las que empeoraron."""
+    if actual['parametros'] != anterior.get('parametros'):
+        print(f"Aviso: parámetros distintos ({anterior.get('parametros')}); la comparación es orientativa.")
+    regresiones = []
+    print(f"\n{'medición':<44}{'anterior (ms)':>15}{'actual (ms)':>14}{'relación':>10}")
+    for nombre, valor in actual['resultados'].items():
+        previo = anterior.get('resultados', {}).get(nombre)
+        if not isinstance(valor, dict) or not isinstance(previo, dict):
+            continue
+        relacion = valor['mediana_ms'] / previo['mediana_ms'] if previo['mediana_ms'] else float('inf')
+        marca = ''
+        if relacion > 1 + umbral:
+            marca = '  <-- regresión'
+            regresiones.append(nombre)
+        print(f"{nombre:<44}{previo['mediana_ms']:>15.3f}{valor['mediana_ms']:>14.3f}{relacion:>10.2f}{marca}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=5000, help="Filas por tabla de inversión")
+    parser.add_argument('--cargos', type=int, default=1000)
+    parser.add_argument('--anios', type=int, default=20)
+    parser.add_argument('--empresas', type=int, default=200, help="Filas por tabla WACC")
+    parser.add_argument('--archivos', type=int, default=20000, help="Archivos del directorio para listar_casos")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--solo', default='', help="Grupos separados por coma: " + ', '.join(GRUPOS))
+    parser.add_argument('--salida', default=None, help="Archivo de resultados (por defecto resultados/<commit>.json)")
+    parser.add_argument('--comparar', default=None, help="Resultado anterior con el que comparar")
+    parser.add_argument('--umbral', type=float, default=0.10, help="Empeoramiento tolerado (0.10 = 10 %%)")
+    args = parser.parse_args(argv)
+
+    grupos = [g for g in args.solo.split(',') if g] or list(GRUPOS)
+    desconocidos = set(grupos) - set(GRUPOS)
+    if desconocidos:
+        parser.error(f"grupos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    parametros = {k: getattr(args, k) for k in ('items', 'cargos', 'anios', 'empresas', 'archivos', 'repeticiones', 'semilla')}
+    inicio = time.perf_counter()
+    caso = caso_sintetico(args.items, args.cargos, args.anios, args.empresas, args.semilla)
+    print(f"Caso sintético generado en {time.perf_counter() - inicio:.2f} s: {parametros}")
+
+    resultados = {}
+    for grupo in grupos:
+        for nombre, valor in GRUPOS[grupo](caso, args).items():
+            resultados[nombre] = valor
+            if isinstance(valor, dict):
+                print(f"{nombre:<44}{valor['mejor_ms']:>12.3f} ms (mediana {valor['mediana_ms']:.3f})")
+            else:
+                print(f"{nombre:<44}{valor:>12.1f}")
+
+    commit = commit_actual()
+    salida = {
+        'commit': commit,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': parametros,
+        'resultados': resultados,
+    }
+    ruta = args.salida or os.path.join(DIRECTORIO_RESULTADOS, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(salida, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+        regresiones = comparar(salida, anterior, args.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones por encima del {args.umbral:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
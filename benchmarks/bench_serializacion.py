@@ -0,0 +1,67 @@
+"""
+Mide guardado y carga de casos grandes: asdict + json (método anterior) frente al
+codec JSON y al formato binario de core/codec.py.
+
+Uso:
+    python benchmarks/bench_serializacion.py --items 20000 --repeticiones 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.generador import caso_sintetico
+from core import codec
+from core.models import Caso
+
+
+def caso_grande(items: int, semilla: int = 1) -> Caso:
+    """Caso sintético con `items` filas en cada tabla principal."""
+    return caso_sintetico(items=items, cargos=items, anios=5, empresas=items, semilla=semilla)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo (segundos) de varias repeticiones."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    caso = caso_grande(args.items)
+    texto_anterior = json.dumps(asdict(caso), indent=4)
+    texto_codec = codec.a_json(caso)
+    binario = codec.a_binario(caso)
+
+    formatos = [
+        ("asdict + json indent", lambda: json.dumps(asdict(caso), indent=4),
+         lambda: json.loads(texto_anterior), len(texto_anterior.encode('utf-8'))),
+        ("codec json", lambda: codec.a_json(caso),
+         lambda: codec.desde_json(Caso, texto_codec), len(texto_codec.encode('utf-8'))),
+        ("codec binario", lambda: codec.a_binario(caso),
+         lambda: codec.desde_binario(Caso, binario), len(binario)),
+    ]
+
+    print(f"Caso con {args.items} ítems por tabla (mejor de {args.repeticiones})")
+    print(f"{'formato':<24}{'guardar (ms)':>14}{'cargar (ms)':>14}{'tamaño (KB)':>14}")
+    for nombre, guardar, cargar, tamano in formatos:
+        t_guardar = medir(guardar, args.repeticiones) * 1000
+        t_cargar = medir(cargar, args.repeticiones) * 1000
+        print(f"{nombre:<24}{t_guardar:>14.1f}{t_cargar:>14.1f}{tamano / 1024:>14.0f}")
+    print("(la carga de 'asdict + json indent' solo decodifica el JSON, sin hidratar dataclasses)")
+
+
+if __name__ == '__main__':
+    main()
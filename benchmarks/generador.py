@@ -0,0 +1,70 @@
+"""
+Generador de casos sintéticos de tamaño configurable para los benchmarks.
+
+    caso_sintetico(items=5000, cargos=1000, anios=20, empresas=200)
+
+Los valores salen de un random.Random con semilla fija: el mismo tamaño y semilla dan
+siempre el mismo caso, así que los tiempos de distintos commits son comparables.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.models import (
+    Caso, ActivoFijo, InversionDiferidaItem, CapitalTrabajoItem, ItemRolPagos, ItemWacc,
+    RegistroConsumoMensual
+)
+
+ANIOS_WACC = 5 # Columnas de las tablas WACC (2020-2024)
+
+
+def caso_sintetico(items: int = 1000, cargos: int = 100, anios: int = 10, empresas: int = 20,
+                   semilla: int = 1, filename: str = "benchmark.json") -> Caso:
+    """
+    Caso con `items` filas en cada tabla de inversión, `cargos` cargos en el Rol de Pagos,
+    `anios` años de proyección y `empresas` filas en cada tabla WACC.
+    """
+    rnd = random.Random(semilla)
+    caso = Caso(nombre="Benchmark", filename=filename)
+    caso.proyeccion.demanda_inicial = rnd.uniform(1000, 50000)
+    caso.proyeccion.tasa_crecimiento = rnd.uniform(1, 8)
+    caso.proyeccion.num_proyeccion = anios
+    caso.financiamiento.porcentaje_propio = 60.0
+    caso.financiamiento.porcentaje_externo = 40.0
+
+    inversion = caso.inversion
+    for i in range(items):
+        activo = ActivoFijo(descripcion=f"Activo {i}", valor_unitario=rnd.uniform(10, 5000),
+                            cantidad=rnd.randint(1, 20), dep_tipo="Equipos")
+        activo.calcular_total()
+        inversion.activos_fijos.append(activo)
+        diferido = InversionDiferidaItem(descripcion=f"Diferido {i}", valor_unitario=rnd.uniform(10, 900),
+                                         cantidad=rnd.randint(1, 5))
+        diferido.calcular_total()
+        inversion.inversion_diferida.append(diferido)
+        capital = CapitalTrabajoItem(descripcion=f"Capital {i}", valor_unitario=rnd.uniform(1, 300),
+                                     cantidad=rnd.randint(1, 50))
+        capital.calcular_total()
+        inversion.capital_trabajo_items.append(capital)
+        consumo = rnd.uniform(100, 5000)
+        inversion.consumos_mensuales.append(RegistroConsumoMensual(consumo_kwh=consumo, costo_usd=consumo * 100))
+    inversion.capital_trabajo = sum((c.total for c in inversion.capital_trabajo_items), 0.0)
+
+    rol = caso.rol_pagos
+    rol.num_proyeccion = anios
+    for i in range(cargos):
+        cargo = ItemRolPagos(cargo=f"Cargo {i}", sueldo_nominal=rnd.uniform(460, 3000),
+                             dias_trabajados=rnd.randint(20, 30), no_he=rnd.randint(0, 40),
+                             comisiones=rnd.uniform(0, 200), descuentos=rnd.uniform(0, 50))
+        cargo.calcular_rol()
+        rol.cargos.append(cargo)
+    rol.recalcular_totales()
+
+    for i in range(empresas):
+        caso.wacc.tabla_utilidad.append(ItemWacc(nombre=f"Empresa {i}",
+                                                 valores_anuales=[rnd.uniform(-1e5, 1e6) for _ in range(ANIOS_WACC)]))
+        caso.wacc.tabla_patrimonio.append(ItemWacc(nombre=f"Empresa {i}",
+                                                   valores_anuales=[rnd.uniform(1e5, 5e6) for _ in range(ANIOS_WACC)]))
+    return caso
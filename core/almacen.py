@@ -0,0 +1,198 @@
+"""
+Almacén compartido del caso activo de cada sesión, para servir la app con varios procesos.
+
+Cada proceso (worker) guarda en memoria los casos que ya leyó; el almacén SQLite en
+resources/ tiene la última versión publicada del caso de cada sesión, identificada por
+(archivo, instancia, revisión):
+
+    inicio de la petición  -> bloqueo de la sesión entre procesos y lectura de la versión;
+                              el caso solo se decodifica si otro proceso publicó uno más nuevo
+    fin de la petición     -> si el caso cambió, se publica (codec binario) y se libera el bloqueo
+
+El bloqueo por sesión usa franjas de un archivo (fcntl.lockf sobre un byte por franja), así que
+las peticiones de una misma sesión se serializan en todos los procesos y las de sesiones
+distintas corren en paralelo. Si un proceso muere, el caso publicado sigue en el almacén y
+las revisiones que no llegaron al disco quedan marcadas como pendientes.
+"""
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError: # Windows: sin bloqueo entre procesos (un solo proceso)
+    fcntl = None
+
+from . import codec, diario
+from .models import Caso
+
+DIRECTORIO_ALMACEN = os.path.join(os.path.dirname(__file__), '..', 'resources', 'almacen')
+ARCHIVO_ALMACEN = "sesiones.sqlite3"
+FRANJAS_BLOQUEO = 1024
+
+Version = Tuple[str, str, int] # (archivo, instancia, revisión); ('', '', 0) = sin caso activo
+SIN_CASO: Version = ('', '', 0)
+
+
+class BloqueoFranjas:
+    """
+    Bloqueo exclusivo por clave entre procesos e hilos. Cada clave cae en una franja (un byte
+    del archivo de bloqueo); dentro del proceso cada franja tiene además su propio Lock, porque
+    los bloqueos de fcntl son por proceso y no excluyen a otros hilos.
+    """
+
+    def __init__(self, ruta: str, franjas: int = FRANJAS_BLOQUEO):
+        self.ruta = ruta
+        self.franjas = franjas
+        self._locks = [threading.Lock() for _ in range(franjas)]
+        self._descriptor: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _archivo(self) -> int:
+        # Un descriptor por proceso: cerrar cualquier descriptor del archivo suelta todos sus bloqueos
+        with self._lock:
+            if self._pid != os.getpid():
+                os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+                self._descriptor = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+                self._pid = os.getpid()
+            return self._descriptor
+
+    def adquirir(self, clave: str) -> int:
+        """Bloquea la franja de la clave y la devuelve (para pasarla a liberar)."""
+        franja = zlib.crc32(clave.encode('utf-8')) % self.franjas
+        self._locks[franja].acquire()
+        if fcntl is not None:
+            try:
+                fcntl.lockf(self._archivo(), fcntl.LOCK_EX, 1, franja)
+            except BaseException:
+                self._locks[franja].release()
+                raise
+        return franja
+
+    def liberar(self, franja: int):
+        try:
+            if fcntl is not None:
+                fcntl.lockf(self._archivo(), fcntl.LOCK_UN, 1, franja)
+        finally:
+            self._locks[franja].release()
+
+    @contextmanager
+    def bloqueo(self, clave: str):
+        franja = self.adquirir(clave)
+        try:
+            yield
+        finally:
+            self.liberar(franja)
+
+
+class AlmacenCasos:
+    """Caso activo publicado de cada sesión (SQLite) y bloqueos entre procesos."""
+
+    def __init__(self, directorio: str = DIRECTORIO_ALMACEN):
+        self.directorio = os.path.abspath(directorio)
+        self.ruta = os.path.join(self.directorio, ARCHIVO_ALMACEN)
+        # Sesiones (una petición a la vez por sesión) y archivos de caso (un guardado a la vez por archivo)
+        self.bloqueo_sesiones = BloqueoFranjas(os.path.join(self.directorio, "sesiones.lock"))
+        self.bloqueo_archivos = BloqueoFranjas(os.path.join(self.directorio, "archivos.lock"))
+
+    def _conectar(self) -> sqlite3.Connection:
+        os.makedirs(self.directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        conexion.execute("PRAGMA journal_mode=WAL") # Lecturas concurrentes con una escritura
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS sesiones ("
+            " clave TEXT PRIMARY KEY, filename TEXT, instancia TEXT, revision INTEGER,"
+            " modificado_en TEXT, seq INTEGER, pendiente INTEGER, contenido BLOB, actualizado REAL)"
+        )
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_archivo ON sesiones (filename, instancia)")
+        return conexion
+
+    #-----------------------
+    # CASO DE CADA SESIÓN
+    #-----------------------
+
+    def version(self, clave: str) -> Optional[Version]:
+        """Versión publicada del caso de la sesión (None si la sesión no está en el almacén)."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT filename, instancia, revision FROM sesiones WHERE clave = ?", (clave,)
+            ).fetchone()
+        if fila is None:
+            return None
+        return (fila[0] or '', fila[1] or '', fila[2] or 0)
+
+    def leer(self, clave: str) -> Optional[Tuple[Caso, int, bool]]:
+        """(caso, último número de secuencia, pendiente de guardar en disco) o None si no hay caso."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT instancia, modificado_en, seq, pendiente, contenido FROM sesiones WHERE clave = ?",
+                (clave,)
+            ).fetchone()
+        if fila is None or fila[4] is None:
+            return None
+        instancia, modificado_en, seq, pendiente, contenido = fila
+        caso, _ = codec.desde_binario(Caso, contenido)
+        # Misma instancia y fecha en todos los procesos: los ETag de las pestañas coinciden
+        caso._instancia = instancia
+        caso._modificado_en = datetime.fromisoformat(modificado_en)
+        return caso, seq or 0, bool(pendiente)
+
+    def publicar(self, clave: str, caso: Optional[Caso], seq: int = 0, pendiente: bool = False):
+        """Publica el caso activo de la sesión (None = la sesión no tiene caso abierto)."""
+        if caso is None:
+            fila = (clave, None, None, 0, None, 0, 0, None, time.time())
+        else:
+            contenido = codec.a_binario(caso, {diario.CLAVE_SECUENCIA: seq})
+            modificado_en = getattr(caso, '_modificado_en', None) or datetime.now(timezone.utc)
+            fila = (clave, caso.filename, caso._instancia, caso.revision, modificado_en.isoformat(),
+                    seq, int(pendiente), contenido, time.time())
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                "INSERT OR REPLACE INTO sesiones (clave, filename, instancia, revision, modificado_en,"
+                " seq, pendiente, contenido, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", fila
+            )
+
+    def eliminar(self, clave: str):
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("DELETE FROM sesiones WHERE clave = ?", (clave,))
+
+    #-----------------------
+    # GUARDADO EN DISCO
+    #-----------------------
+
+    def es_vigente(self, filename: str, instancia: str, revision: int) -> bool:
+        """False si otro proceso ya publicó una revisión más nueva de ese mismo caso."""
+        with closing(self._conectar()) as conexion:
+            fila = conexion.execute(
+                "SELECT MAX(revision) FROM sesiones WHERE filename = ? AND instancia = ?", (filename, instancia)
+            ).fetchone()
+        return fila[0] is None or revision >= fila[0]
+
+    def marcar_guardado(self, filename: str, instancia: str, revision: int):
+        """Quita la marca de pendiente de las revisiones ya escritas en disco."""
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                "UPDATE sesiones SET pendiente = 0 WHERE filename = ? AND instancia = ? AND revision <= ?",
+                (filename, instancia, revision)
+            )
+
+    def claves_pendientes(self) -> List[str]:
+        """Sesiones cuyo caso publicado aún no se escribió en disco (p. ej. el proceso murió antes)."""
+        with closing(self._conectar()) as conexion:
+            return [c for (c,) in conexion.execute(
+                "SELECT clave FROM sesiones WHERE pendiente = 1 AND contenido IS NOT NULL"
+            )]
+
+    def purgar(self, antiguedad: float) -> int:
+        """Elimina las sesiones sin cambios pendientes que no se usan desde hace `antiguedad` segundos."""
+        with closing(self._conectar()) as conexion, conexion:
+            cursor = conexion.execute(
+                "DELETE FROM sesiones WHERE pendiente = 0 AND actualizado < ?", (time.time() - antiguedad,)
+            )
+            return cursor.rowcount
@@ -0,0 +1,100 @@
+from typing import Dict, List
+from .models import Caso, DatosAmortizacion
+from .calculations import inversion_total_general
+
+#-----------------------
+# MÉTODOS DE AMORTIZACIÓN
+#-----------------------
+
+METODO_ALEMAN = "aleman"    # Amortización constante (método actual de la pestaña)
+METODO_FRANCES = "frances"  # Cuota constante
+METODOS_AMORTIZACION = (METODO_ALEMAN, METODO_FRANCES)
+
+
+def monto_prestamo(caso: Caso) -> float:
+    """Préstamo a financiar: parte externa de la inversión inicial total."""
+    return inversion_total_general(caso.inversion) * (caso.financiamiento.porcentaje_externo / 100)
+
+
+def calcular_tabla_amortizacion(
+    prestamo: float,
+    interes_anual: float,
+    anios: int,
+    metodo: str = METODO_ALEMAN,
+    meses_gracia: int = 0
+) -> Dict[str, List[float]]:
+    """
+    Calcula la tabla mensual completa en formato columnar (una lista por columna).
+    Cada columna sale de la forma cerrada del saldo, sin arrastrar el saldo mes a mes.
+    Durante los meses de gracia solo se pagan intereses; el capital se amortiza en los
+    meses restantes del plazo.
+    """
+    if metodo not in METODOS_AMORTIZACION:
+        raise ValueError(f"Método de amortización desconocido: {metodo}")
+
+    pagos = max(int(anios), 0) * 12
+    gracia = min(max(int(meses_gracia), 0), pagos)
+    meses_amortizacion = pagos - gracia
+    i = (interes_anual / 100) / 12
+
+    # Saldo al inicio de cada mes; j = número de cuotas de capital ya pagadas
+    cuotas_pagadas = [max(mes - gracia - 1, 0) for mes in range(1, pagos + 1)]
+
+    if meses_amortizacion == 0:
+        capital = [prestamo] * pagos
+        amortizacion = [0.0] * pagos
+    elif metodo == METODO_ALEMAN:
+        cuota_capital = prestamo / meses_amortizacion
+        capital = [prestamo - cuota_capital * j for j in cuotas_pagadas]
+        amortizacion = [0.0] * gracia + [cuota_capital] * meses_amortizacion
+    else:
+        if i == 0:
+            cuota = prestamo / meses_amortizacion
+            capital = [prestamo - cuota * j for j in cuotas_pagadas]
+        else:
+            cuota = prestamo * i / (1 - (1 + i) ** -meses_amortizacion)
+            capital = [prestamo * (1 + i) ** j - cuota * ((1 + i) ** j - 1) / i for j in cuotas_pagadas]
+        amortizacion = [0.0] * gracia + [cuota - c * i for c in capital[gracia:]]
+
+    interes = [c * i for c in capital]
+    pago = [a + b for a, b in zip(interes, amortizacion)]
+    deuda_final = [max(0.0, c - a) for c, a in zip(capital, amortizacion)]
+    if deuda_final and meses_amortizacion:
+        deuda_final[-1] = 0.0 # Evitar residuos por redondeo en el último mes
+
+    return {
+        'mes': list(range(1, pagos + 1)),
+        'capital': capital,
+        'interes': interes,
+        'amortizacion': amortizacion,
+        'pago': pago,
+        'deuda_final': deuda_final,
+    }
+
+
+def resumir_por_anio(tabla: Dict[str, List[float]]) -> Dict[str, List[float]]:
+    """Agrupa la tabla mensual en bloques de 12 meses (capital inicial, totales y deuda final por año)."""
+    meses = len(tabla['mes'])
+    inicios = range(0, meses, 12)
+    return {
+        'anio': [k // 12 + 1 for k in inicios],
+        'capital': [tabla['capital'][k] for k in inicios],
+        'interes': [sum(tabla['interes'][k:k + 12]) for k in inicios],
+        'amortizacion': [sum(tabla['amortizacion'][k:k + 12]) for k in inicios],
+        'pago': [sum(tabla['pago'][k:k + 12]) for k in inicios],
+        'deuda_final': [tabla['deuda_final'][min(k + 11, meses - 1)] for k in inicios],
+    }
+
+
+def tabla_amortizacion_caso(caso: Caso) -> Dict[str, List[float]]:
+    """Tabla mensual del préstamo del caso con los parámetros de DatosAmortizacion."""
+    datos: DatosAmortizacion = caso.amortizacion
+    return calcular_tabla_amortizacion(
+        monto_prestamo(caso), datos.interes_anual, datos.anios, datos.metodo, datos.meses_gracia
+    )
+
+
+def totales_anuales_amortizacion(caso: Caso) -> Dict[str, List[float]]:
+    """Intereses y capital pagados por año, para las pestañas que los necesiten (flujos, resumen)."""
+    anual = resumir_por_anio(tabla_amortizacion_caso(caso))
+    return {'interes': anual['interes'], 'amortizacion': anual['amortizacion']}
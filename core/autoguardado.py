@@ -0,0 +1,66 @@
+import atexit
+import os
+import threading
+from typing import Dict
+
+
+class AutoGuardado:
+    """
+    Guardado diferido (write-behind) de casos modificados.
+    Las rutas solo marcan el caso como sucio; un hilo en segundo plano agrupa las
+    ráfagas de cambios y guarda cada caso sucio como máximo una vez por intervalo.
+    """
+
+    def __init__(self, intervalo: float = 2.0):
+        self.intervalo = intervalo
+        self._sucios: Dict[int, object] = {} # id(gestor) -> gestor con cambios pendientes
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def marcar(self, gestor):
+        """Registra el gestor como pendiente de guardar; arranca el hilo la primera vez."""
+        with self._lock:
+            self._sucios[id(gestor)] = gestor
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="autoguardado", daemon=True)
+                self._hilo.start()
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return len(self._sucios)
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.vaciar(esperar=False)
+
+    def vaciar(self, esperar: bool = True):
+        """
+        Guarda ahora todos los casos pendientes. Con esperar=False no se bloquea en los casos
+        que una petición tiene en uso: quedan marcados para el próximo intervalo.
+        """
+        with self._lock:
+            gestores, self._sucios = list(self._sucios.values()), {}
+        for gestor in gestores:
+            try:
+                gestor.guardar_si_modificado(bloquear=esperar)
+            except Exception as e:
+                print(f"Error en autoguardado: {e}")
+
+    def _reiniciar_tras_fork(self):
+        # El hilo del proceso padre no existe en el hijo (servidor con varios workers)
+        self._lock = threading.Lock()
+        self._sucios = {}
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def detener(self):
+        """Detiene el hilo y guarda lo pendiente (se llama al cerrar el proceso)."""
+        self._detener.set()
+        self.vaciar()
+
+
+autoguardado = AutoGuardado()
+atexit.register(autoguardado.detener)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=autoguardado._reiniciar_tras_fork)
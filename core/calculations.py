@@ -1,29 +1,52 @@
-from typing import List
+from typing import Dict, List, Sequence
 from .models import DatosProyeccion, DatosInversion
+from .columnar import sumar_campo
+from .metricas import medir
 
+@medir('calculations.calcular_proyeccion')
 def calcular_proyeccion(datos: DatosProyeccion) -> List[int]:
-    demanda_inicial = datos.demanda_inicial
-    tasa_crecimiento_decimal = datos.tasa_crecimiento / 100.0
-    num_proyeccion = datos.num_proyeccion
-    
-    resultados: List[float] = []
-    demanda_anterior = demanda_inicial
-    
-    if num_proyeccion <= 0:
+    if datos.num_proyeccion <= 0:
         return []
-
-    for i in range(num_proyeccion):
-        demanda_actual: float
-        
-        if i == 0:
-            demanda_actual = demanda_inicial
-        else:
-            demanda_actual = demanda_anterior * (1 + tasa_crecimiento_decimal)
-        
-        resultados.append(round(demanda_actual))
-        demanda_anterior = demanda_actual
-        
-    return resultados
+    return calcular_proyeccion_lote(
+        [datos.demanda_inicial], [datos.tasa_crecimiento], [datos.num_proyeccion]
+    )[0]
+
+
+@medir('calculations.calcular_proyeccion_lote')
+def calcular_proyeccion_lote(
+    demandas_iniciales: Sequence[float],
+    tasas_crecimiento: Sequence[float],
+    horizontes: Sequence[int]
+) -> List[List[int]]:
+    """
+    Proyecta varias series de demanda en una sola llamada usando la forma cerrada
+    demanda_inicial * (1 + tasa)^año. Devuelve una fila por serie (con su propio horizonte)
+    y conserva el redondeo de round() de la versión iterativa.
+    """
+    if not (len(demandas_iniciales) == len(tasas_crecimiento) == len(horizontes)):
+        raise ValueError("Las listas de demandas, tasas y horizontes deben tener la misma longitud.")
+
+    # Las potencias (1 + tasa)^k se calculan una sola vez por tasa distinta, hasta el mayor horizonte
+    max_horizonte = max(horizontes, default=0)
+    potencias: Dict[float, List[float]] = {}
+    for tasa in tasas_crecimiento:
+        if tasa not in potencias:
+            factor = 1 + tasa / 100.0
+            potencias[tasa] = [factor ** k for k in range(max_horizonte)]
+
+    return [
+        [round(demanda * p) for p in potencias[tasa][:max(horizonte, 0)]]
+        for demanda, tasa, horizonte in zip(demandas_iniciales, tasas_crecimiento, horizontes)
+    ]
+
+
+@medir('calculations.proyectar_productos')
+def proyectar_productos(datos: DatosProyeccion) -> List[List[int]]:
+    """Recalcula la matriz de resultados de todas las series multiproducto del caso."""
+    datos.resultados_productos = calcular_proyeccion_lote(
+        datos.demandas_iniciales, datos.tasas_crecimiento, datos.horizontes
+    )
+    return datos.resultados_productos
 
 
 
@@ -43,19 +66,24 @@ def inversion_total_capital_trabajo_dev(datos_inversion: DatosInversion) -> floa
 
 
 
+# Las tablas columnares (core/columnar.py) suman directamente su columna
+@medir('calculations.inversion_total_activos')
 def inversion_total_activos(datos_inversion):
-    return sum(item.valor_total for item in datos_inversion.activos_fijos)
+    return sumar_campo(datos_inversion.activos_fijos, 'valor_total')
 
+@medir('calculations.inversion_total_diferida')
 def inversion_total_diferida(datos_inversion):
-    return sum(item.total for item in datos_inversion.inversion_diferida)
+    return sumar_campo(datos_inversion.inversion_diferida, 'total')
 
+@medir('calculations.inversion_total_capital_trabajo')
 def inversion_total_capital_trabajo(datos_inversion):
-    return sum(item.total for item in datos_inversion.capital_trabajo_items)
+    return sumar_campo(datos_inversion.capital_trabajo_items, 'total')
 
 
 
 
 
+@medir('calculations.inversion_total_general')
 def inversion_total_general(datos_inversion: DatosInversion) -> float:
     """Calcula la inversión inicial total (Fijos + Diferida + Capital)."""
     total_fijos = inversion_total_activos(datos_inversion)
@@ -67,10 +95,11 @@ def sincronizar_total_capital_trabajo_dev(datos_inversion: DatosInversion):
     """Sincroniza el campo antiguo 'capital_trabajo' con el total calculado de ítems."""
     datos_inversion.capital_trabajo = inversion_total_capital_trabajo(datos_inversion)
 
+@medir('calculations.sincronizar_total_capital_trabajo')
 def sincronizar_total_capital_trabajo(datos_inversion):
     """Sincroniza el campo antiguo 'capital_trabajo' con el total de la lista de ítems."""
     # Suma el campo 'total' de cada ítem en la lista
-    total_calculado = sum(item.total for item in datos_inversion.capital_trabajo_items)
+    total_calculado = sumar_campo(datos_inversion.capital_trabajo_items, 'total')
     # Actualiza el atributo float para mantener compatibilidad con otras pestañas
     datos_inversion.capital_trabajo = total_calculado
     return total_calculado
\ No newline at end of file
@@ -1,154 +1,558 @@
-from .models import (
-    Caso, DatosProyeccion, DatosInversion, ActivoFijo, InversionDiferidaItem, 
-    CapitalTrabajoItem, AnalisisEnergeticoItem, RegistroConsumoMensual, 
-    RegistroConsumoDiario, DatosRolPagos, AnioRolPagos, ItemRolPagos,
-    DatosFinanciamiento, DatosWacc, ItemWacc, DatosAmortizacion
-)
-from dataclasses import asdict
+from .models import Caso, DatosRolPagos
+from .autoguardado import autoguardado
+from . import diario
+from . import codec
+from .columnar import TablaColumnar, compactar_inversion
+from .catalogo import CatalogoCasos, resumen_caso
+from .metricas import medir
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, List
-import json
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional, List, Tuple
 import os
+import threading
 
 # Define la ruta donde se guardarán los archivos JSON
 CASES_DIR = os.path.join(os.path.dirname(__file__), '..', 'resources', 'reports')
 
+CLAVE_LOCAL = "local" # Clave usada fuera de una petición (un solo usuario)
+BYTES_BASE_CASO = 64 * 1024
+BYTES_POR_ITEM = 600 # Aproximación del costo en memoria de un ítem dataclass
+
+# Modos de persistencia: instantánea completa en cada guardado, o diario de cambios
+# con compactación periódica en una instantánea
+MODO_COMPLETO = "completo"
+MODO_DIARIO = "diario"
+
+# Formatos de archivo: la extensión decide el formato con el que se guarda cada caso
+FORMATO_JSON = "json"
+FORMATO_BINARIO = "binario"
+EXTENSIONES_CASO = {FORMATO_JSON: ".json", FORMATO_BINARIO: ".mcaso"}
+
+
+def _migrar_caso(data: dict) -> dict:
+    data.setdefault('nombre', 'Sin Nombre')
+    return data
+
+
+def _migrar_rol_pagos(data: dict) -> dict:
+    """Formato anterior: N años materializados; el Año 1 contiene los cargos base."""
+    if 'cargos' not in data and 'proyeccion_anual' in data:
+        data = dict(data)
+        anios = data.pop('proyeccion_anual') or []
+        data['cargos'] = anios[0].get('items', []) if anios else []
+        if anios:
+            data['num_proyeccion'] = len(anios)
+    return data
+
+
+codec.registrar_migracion(Caso, _migrar_caso)
+codec.registrar_migracion(DatosRolPagos, _migrar_rol_pagos)
+
+
 class CaseManager:
     """
     Gestiona el estado del caso activo y la persistencia de archivos.
     """
+
+    modo_persistencia: str = MODO_COMPLETO
+    umbral_diario: int = 500 # Líneas de diario antes de compactar en una instantánea
+    formato: str = FORMATO_JSON # Formato de los casos nuevos
+    umbral_columnar: int = 1000 # Filas a partir de las cuales una tabla de inversión se guarda por columnas (0 = nunca)
+    almacen = None # AlmacenCasos compartido entre procesos (ver core/almacen.py), o None con un solo proceso
     
     def __init__(self):
         self._caso_actual: Optional[Caso] = None
+        # Bloqueo por caso: las peticiones de una misma sesión se serializan sobre su caso
+        self.lock = threading.RLock()
+        self._lock_escritura = threading.Lock()
+        self.modificado = False # Cambios pendientes de guardar (autoguardado diferido)
+        self._seq = 0 # Número de secuencia de la última operación registrada
+        self._pendientes: List[list] = [] # Operaciones aún no escritas en el diario
+        self._requiere_instantanea = False # Hubo cambios no descritos como operaciones
+        self._lineas_diario = 0
+        self.version_publicada = None # Versión del caso en el almacén compartido (ver core/almacen.py)
+        self.en_uso = 0 # Peticiones que lo tienen fijado (RegistroCasos.obtener con fijar); no se desaloja
+
+    def tamano_estimado(self) -> int:
+        """Estimación (en bytes) de la memoria que ocupa el caso activo, según su número de ítems."""
+        caso = self._caso_actual
+        if not caso:
+            return 0
+        inv = caso.inversion
+        tablas = (inv.activos_fijos, inv.inversion_diferida, inv.capital_trabajo_items,
+                  inv.consumos_mensuales, inv.consumos_diarios)
+        columnares = sum(t.bytes_estimados() for t in tablas if isinstance(t, TablaColumnar))
+        items = (
+            sum(len(t) for t in tablas if not isinstance(t, TablaColumnar)) + len(caso.rol_pagos.cargos)
+            + sum(len(f.valores_anuales) for f in caso.wacc.tabla_utilidad + caso.wacc.tabla_patrimonio)
+            + sum(len(r) for r in caso.proyeccion.resultados_productos)
+        )
+        return BYTES_BASE_CASO + items * BYTES_POR_ITEM + columnares
 
     def cerrar_caso_actual(self):
-        """Cierra el caso activo actual, limpiando la memoria."""
+        """Cierra el caso activo actual (guardando cambios pendientes), limpiando la memoria."""
+        self.guardar_si_modificado()
         self._caso_actual = None
 
     def inicializar_nuevo_caso(self, nombre: str) -> Caso:
         """Crea un nuevo caso y lo establece como activo."""
+        self.guardar_si_modificado()
         nuevo_caso = Caso(nombre=nombre, fecha_creacion=datetime.now().isoformat())
         
         # Generamos un nombre de archivo único UNA VEZ al inicio
-        nombre_limpio = nombre.replace(" ", "_").lower()
-        nuevo_caso.filename = f"{nombre_limpio}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+        nuevo_caso.filename = self._nuevo_filename(nombre)
         
         self._caso_actual = nuevo_caso
+        self._seq, self._pendientes, self._lineas_diario = 0, [], 0
         return nuevo_caso
 
+    def _nuevo_filename(self, nombre: str) -> str:
+        nombre_limpio = nombre.replace(" ", "_").lower()
+        extension = EXTENSIONES_CASO.get(self.formato, EXTENSIONES_CASO[FORMATO_JSON])
+        return f"{nombre_limpio}_{datetime.now().strftime('%Y%m%d%H%M%S')}{extension}"
+
     def obtener_caso_actual(self) -> Optional[Caso]:
         """Devuelve el caso actualmente activo."""
         return self._caso_actual
 
+    def version(self) -> Tuple[str, str, int]:
+        """(archivo, instancia, revisión) del caso activo; ('', '', 0) si no hay caso."""
+        caso = self._caso_actual
+        if caso is None:
+            return ('', '', 0)
+        return (caso.filename, caso._instancia, caso.revision)
+
+    def activar_caso(self, caso: Optional[Caso], seq: int = 0, pendiente: bool = False):
+        """Establece como activo el caso publicado por otro proceso (sin guardar el anterior)."""
+        self._caso_actual = caso
+        self._seq, self._pendientes, self._lineas_diario = seq, [], 0
+        self._requiere_instantanea = pendiente
+        self.modificado = pendiente
+        if pendiente:
+            autoguardado.marcar(self)
+
     def listar_casos(self) -> List[str]:
         """Devuelve una lista de nombres de archivos de casos guardados."""
         if not os.path.exists(CASES_DIR):
             return []
-        files = [f for f in os.listdir(CASES_DIR) if f.endswith('.json')]
+        files = [f for f in os.listdir(CASES_DIR) if es_archivo_caso(f)]
         files.sort(reverse=True) # Mostrar más recientes primero (por fecha en nombre)
         return files
 
-    def guardar_caso_actual(self):
-        """Guarda el caso actual como archivo JSON en la carpeta resources/reports."""
-        caso = self.obtener_caso_actual()
-        if not caso:
-            return False, "No hay caso activo para guardar."
-        
-    def guardar_caso_actual(self):
-        """Guarda el caso actual como archivo JSON en la carpeta resources/reports."""
-        caso = self.obtener_caso_actual()
-        if not caso:
-            return False, "No hay caso activo para guardar."
-        
-        # Si por alguna razón no tiene filename (casos viejos en memoria), generamos uno
-        if not caso.filename:
-             nombre_limpio = caso.nombre.replace(" ", "_").lower()
-             caso.filename = f"{nombre_limpio}_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    def marcar_modificado(self):
+        """Marca el caso como modificado; el autoguardado lo persistirá en segundo plano."""
+        self._requiere_instantanea = True
+        self._marcar_sucio()
 
-        # Asegurarse de que el directorio de casos exista
-        os.makedirs(CASES_DIR, exist_ok=True)
-        filepath = os.path.join(CASES_DIR, caso.filename)
+    def registrar_cambio(self, op: str, ruta: str, valor=None):
+        """
+        Registra una mutación ya aplicada al caso (ver core/diario.py). En modo diario solo
+        se anexa esta operación al guardar; en modo completo equivale a marcar_modificado.
+        """
+        self._seq += 1
+        if self.modo_persistencia == MODO_DIARIO:
+            self._pendientes.append([self._seq, op, ruta, valor])
+        else:
+            self._requiere_instantanea = True
+        self._marcar_sucio()
+
+    def _marcar_sucio(self):
+        if self._caso_actual is not None:
+            self._caso_actual.incrementar_revision()
+        self.modificado = True
+        autoguardado.marcar(self)
+
+    def guardar_si_modificado(self, bloquear: bool = True):
+        """Guarda el caso solo si tiene cambios pendientes."""
+        if self.modificado:
+            return self.guardar_caso_actual(bloquear)
+        return True, None
 
-        # 2. Serializar usando asdict para recursividad
+    @medir('case_manager.guardar_caso_actual')
+    def guardar_caso_actual(self, bloquear: bool = True):
+        """
+        Guarda el caso actual como archivo JSON en la carpeta resources/reports.
+        Con bloquear=False no espera si una petición tiene el caso: lo deja marcado para el
+        próximo intervalo del autoguardado.
+        """
+        if not self.lock.acquire(blocking=bloquear):
+            autoguardado.marcar(self)
+            return False, "El caso está en uso; se guardará en el próximo intervalo."
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(asdict(caso), f, indent=4)
-            return True, caso.filename
+            caso = self.obtener_caso_actual()
+            if not caso:
+                return False, "No hay caso activo para guardar."
+            
+            # Si por alguna razón no tiene filename (casos viejos en memoria), generamos uno
+            if not caso.filename:
+                 caso.filename = self._nuevo_filename(caso.nombre)
+
+            filename = caso.filename
+            filepath = os.path.join(CASES_DIR, filename)
+            instancia, revision = caso._instancia, caso.revision
+            operaciones, self._pendientes = self._pendientes, []
+            instantanea = (
+                self._requiere_instantanea
+                or self.modo_persistencia != MODO_DIARIO
+                or not os.path.exists(filepath)
+                or self._lineas_diario + len(operaciones) > self.umbral_diario
+            )
+
+            # Serializar en memoria bajo el bloqueo del caso (instantánea consistente)
+            if instantanea:
+                try:
+                    contenido = serializar_caso(caso, {diario.CLAVE_SECUENCIA: self._seq})
+                except Exception as e:
+                    # Las operaciones siguen pendientes; se reintenta en el próximo intervalo
+                    self._pendientes = operaciones + self._pendientes
+                    autoguardado.marcar(self)
+                    return False, str(e)
+            resumen = resumen_caso(caso)
+            self.modificado = False
+            self._requiere_instantanea = False
+
+            # La escritura a disco se hace fuera del bloqueo del caso, pero en orden
+            self._lock_escritura.acquire()
+        finally:
+            self.lock.release()
+
+        almacen = self.almacen
+        try:
+            with almacen.bloqueo_archivos.bloqueo(filename) if almacen else nullcontext():
+                if almacen and not almacen.es_vigente(filename, instancia, revision):
+                    return True, filename # Otro proceso tiene una revisión más nueva de este caso
+                if instantanea:
+                    self._escribir_atomico(filename, contenido)
+                    diario.eliminar(filepath) # La instantánea ya incluye todo el diario
+                    self._lineas_diario = 0
+                elif operaciones:
+                    diario.anexar(filepath, operaciones)
+                    self._lineas_diario += len(operaciones)
+                if almacen:
+                    almacen.marcar_guardado(filename, instancia, revision)
         except Exception as e:
+            self.marcar_modificado() # Reintentar en el próximo intervalo
             return False, str(e)
+        finally:
+            self._lock_escritura.release()
+
+        self._actualizar_catalogo(lambda catalogo: catalogo.actualizar(resumen))
+        return True, filename
+
+    @staticmethod
+    def _actualizar_catalogo(cambio: Callable[[CatalogoCasos], None]):
+        """Mantiene el catálogo de /reporte al día (un fallo aquí no invalida el guardado ni la carga)."""
+        try:
+            cambio(obtener_catalogo())
+        except Exception as e:
+            print(f"Error actualizando el catálogo: {e}")
+
+    def _escribir_atomico(self, filename: str, contenido: bytes):
+        """Escribe en un archivo temporal y lo renombra: el archivo nunca queda a medio escribir."""
+        # Asegurarse de que el directorio de casos exista
+        os.makedirs(CASES_DIR, exist_ok=True)
+        filepath = os.path.join(CASES_DIR, filename)
+        temporal = f"{filepath}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, filepath)
 
     def cargar_caso_desde_archivo(self, filename: str) -> bool:
-        """Carga un caso desde un archivo JSON y reconstruye los objetos dataclass."""
+        """Carga un caso desde un archivo JSON y lo establece como activo."""
         filepath = os.path.join(CASES_DIR, filename)
         if not os.path.exists(filepath):
+            self._actualizar_catalogo(lambda catalogo: catalogo.eliminar(filename)) # Borrado fuera de la app
             return False
-            
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Reconstrucción manual de la jerarquía (Hydration)
-            caso = Caso(
-                nombre=data.get('nombre', 'Sin Nombre'), 
-                fecha_creacion=data.get('fecha_creacion', ''),
-                filename=filename # Mantenemos el nombre del archivo original
-            )
-            
-            # 1. Proyección
-            p_data = data.get('proyeccion', {})
-            caso.proyeccion = DatosProyeccion(
-                demanda_inicial=p_data.get('demanda_inicial', 0),
-                tasa_crecimiento=p_data.get('tasa_crecimiento', 0),
-                num_proyeccion=p_data.get('num_proyeccion', 5),
-                resultados_proyeccion=p_data.get('resultados_proyeccion', [])
-            )
-            
-            # 2. Inversión
-            inv_data = data.get('inversion', {})
-            caso.inversion = DatosInversion(
-                capital_trabajo=inv_data.get('capital_trabajo', 0)
-            )
-            # Reconstruir listas de inversión
-            caso.inversion.activos_fijos = [ActivoFijo(**item) for item in inv_data.get('activos_fijos', [])]
-            caso.inversion.inversion_diferida = [InversionDiferidaItem(**item) for item in inv_data.get('inversion_diferida', [])]
-            caso.inversion.capital_trabajo_items = [CapitalTrabajoItem(**item) for item in inv_data.get('capital_trabajo_items', [])]
-            caso.inversion.analisis_energetico = [AnalisisEnergeticoItem(**item) for item in inv_data.get('analisis_energetico', [])]
-            caso.inversion.consumos_mensuales = [RegistroConsumoMensual(**item) for item in inv_data.get('consumos_mensuales', [])]
-            caso.inversion.consumos_diarios = [RegistroConsumoDiario(**item) for item in inv_data.get('consumos_diarios', [])]
-            
-            # 3. Rol de Pagos
-            rol_data = data.get('rol_pagos', {})
-            caso.rol_pagos = DatosRolPagos(
-                num_proyeccion=rol_data.get('num_proyeccion', 5),
-                gran_total_general=rol_data.get('gran_total_general', 0)
-            )
-            caso.rol_pagos.proyeccion_anual = []
-            for anio_data in rol_data.get('proyeccion_anual', []):
-                anio = AnioRolPagos(total_anual=anio_data.get('total_anual', 0))
-                anio.items = [ItemRolPagos(**item) for item in anio_data.get('items', [])]
-                caso.rol_pagos.proyeccion_anual.append(anio)
-
-            # 4. Financiamiento
-            fin_data = data.get('financiamiento', {})
-            caso.financiamiento = DatosFinanciamiento(**fin_data)
-            
-            # 5. WACC
-            wacc_data = data.get('wacc', {})
-            caso.wacc = DatosWacc(
-                gran_total_general=wacc_data.get('gran_total_general', 0)
-            )
-            caso.wacc.tabla_utilidad = [ItemWacc(**item) for item in wacc_data.get('tabla_utilidad', [])]
-            caso.wacc.tabla_patrimonio = [ItemWacc(**item) for item in wacc_data.get('tabla_patrimonio', [])]
-            
-            # 6. Amortización
-            amort_data = data.get('amortizacion', {})
-            caso.amortizacion = DatosAmortizacion(**amort_data)
-            
-            self._caso_actual = caso
-            return True
-        except Exception as e:
-            print(f"Error cargando caso: {e}")
+        self.guardar_si_modificado()
+
+        leido = leer_caso(filename)
+        if leido is None:
             return False
+        caso, self._seq, self._lineas_diario = leido
+        self._actualizar_catalogo(lambda catalogo: catalogo.actualizar(resumen_caso(caso)))
+        self._caso_actual = caso
+        self.modificado = False
+        self._pendientes = []
+        self._requiere_instantanea = False
+        return True
+
+    def consultar_casos(self, refrescar: bool = False, **filtros):
+        """
+        Consulta el catálogo de casos guardados (ver CatalogoCasos.consultar). No recorre la carpeta:
+        con refrescar=True se sincroniza antes con los archivos copiados o borrados a mano.
+        """
+        if refrescar:
+            sincronizar_catalogo()
+        return obtener_catalogo().consultar(**filtros)
+
+
+def es_archivo_caso(filename: str) -> bool:
+    return filename.endswith(tuple(EXTENSIONES_CASO.values()))
+
+
+def serializar_caso(caso: Caso, extras: Optional[dict] = None) -> bytes:
+    """Serializa el caso en el formato que indica la extensión de su archivo."""
+    if caso.filename.endswith(EXTENSIONES_CASO[FORMATO_BINARIO]):
+        return codec.a_binario(caso, extras)
+    return codec.a_json(caso, extras).encode('utf-8')
+
+
+def deserializar_caso(contenido: bytes):
+    """Devuelve (caso, claves extra) a partir del contenido de un archivo JSON o binario."""
+    if codec.es_binario(contenido):
+        return codec.desde_binario(Caso, contenido)
+    return codec.desde_json(Caso, contenido.decode('utf-8'))
+
+
+@medir('case_manager.leer_caso')
+def leer_caso(filename: str):
+    """
+    Lee un caso del disco sin activarlo: instantánea JSON más los cambios de su diario.
+    Devuelve (caso, último número de secuencia, líneas de diario) o None si no se pudo leer.
+    """
+    filepath = os.path.join(CASES_DIR, filename)
+    if not os.path.exists(filepath):
+        return None
+    try:
+        with open(filepath, 'rb') as f:
+            contenido = f.read()
+        caso, extras = deserializar_caso(contenido)
+        caso.filename = filename # Mantenemos el nombre del archivo original
+        compactar_inversion(caso.inversion, CaseManager.umbral_columnar)
+
+        # Cambios del diario posteriores a la instantánea (recuperación tras un corte)
+        ultimo_seq = extras.get(diario.CLAVE_SECUENCIA, 0)
+        lineas_diario = 0
+        for seq, op, ruta, valor in diario.leer(filepath):
+            lineas_diario += 1
+            if seq > ultimo_seq:
+                diario.aplicar_cambio(caso, op, ruta, valor)
+                caso.revision += 1
+                ultimo_seq = seq
+        caso.rol_pagos.recalcular_totales()
+
+        return caso, ultimo_seq, lineas_diario
+    except Exception as e:
+        print(f"Error cargando caso: {e}")
+        return None
+
+
+_catalogos: Dict[str, CatalogoCasos] = {}
+
+def obtener_catalogo() -> CatalogoCasos:
+    """Catálogo SQLite de la carpeta de casos actual; se sincroniza con la carpeta la primera vez que se abre."""
+    directorio = os.path.abspath(CASES_DIR)
+    if directorio not in _catalogos:
+        _catalogos[directorio] = CatalogoCasos(directorio)
+        sincronizar_catalogo(_catalogos[directorio])
+    return _catalogos[directorio]
+
+
+def sincronizar_catalogo(catalogo: Optional[CatalogoCasos] = None) -> int:
+    """Recorre la carpeta de casos y reindexa solo los archivos nuevos, modificados o borrados fuera de la app."""
+    def solo_caso(filename):
+        leido = leer_caso(filename)
+        return leido[0] if leido else None
+
+    if catalogo is None:
+        catalogo = obtener_catalogo()
+    return catalogo.sincronizar_directorio(solo_caso, tuple(EXTENSIONES_CASO.values()))
+
+
+class RegistroCasos:
+    """
+    Registro de casos abiertos por clave (sesión o usuario). Cada clave tiene su propio
+    CaseManager con bloqueo; los casos inactivos menos usados se guardan en disco y se
+    liberan de memoria cuando se supera el máximo de casos o el presupuesto de memoria.
+    Los guardados del desalojo se hacen fuera del bloqueo del registro.
+    """
+
+    def __init__(self, max_casos: int = 32, max_bytes: int = 256 * 1024 * 1024):
+        self.max_casos = max_casos
+        self.max_bytes = max_bytes
+        self._gestores: "OrderedDict[str, CaseManager]" = OrderedDict()
+        self._desalojados: Dict[str, str] = {} # clave -> archivo del caso guardado al desalojarlo
+        self._saliendo: Dict[str, CaseManager] = {} # Desalojados que aún se están guardando
+        self._lock = threading.Lock()
+        self._clave_actual: Callable[[], str] = lambda: CLAVE_LOCAL
+        self._gestor_actual: Callable[[], Optional[CaseManager]] = lambda: None
+        self.almacen = None
+
+    def configurar_clave(self, funcion: Callable[[], str]):
+        """Define cómo obtener la clave del usuario actual (por ejemplo, a partir de la sesión Flask)."""
+        self._clave_actual = funcion
+
+    def clave_actual(self) -> str:
+        return self._clave_actual()
+
+    def configurar_gestor(self, funcion: Callable[[], Optional[CaseManager]]):
+        """Define cómo obtener el gestor ya fijado por la petición actual (None si no hay)."""
+        self._gestor_actual = funcion
+
+    def gestor_actual(self) -> CaseManager:
+        gestor = self._gestor_actual()
+        return gestor if gestor is not None else self.obtener()
+
+    def obtener(self, clave: Optional[str] = None, fijar: bool = False) -> CaseManager:
+        """
+        Devuelve el CaseManager de la clave, recargándolo desde disco si fue desalojado. Con
+        `fijar`, el gestor no se desaloja hasta llamar a soltar() (una petición en curso).
+        """
+        clave = clave if clave is not None else self.clave_actual()
+        with self._lock:
+            gestor = self._gestores.get(clave)
+            victimas = []
+            if gestor is not None:
+                self._gestores.move_to_end(clave)
+            elif clave in self._saliendo:
+                # Se estaba guardando para desalojarlo: vuelve a usarse el mismo gestor
+                gestor = self._gestores[clave] = self._saliendo.pop(clave)
+            else:
+                gestor = CaseManager()
+                archivo = self._desalojados.pop(clave, None)
+                if archivo and self.almacen is None: # Con almacén, el caso se lee de allí al sincronizar
+                    gestor.cargar_caso_desde_archivo(archivo)
+                self._gestores[clave] = gestor
+                victimas = self._elegir_desalojo(excepto=clave)
+            if fijar:
+                gestor.en_uso += 1
+        self._desalojar(victimas)
+        return gestor
+
+    def soltar(self, gestor: CaseManager):
+        """Deshace un obtener(fijar=True)."""
+        with self._lock:
+            gestor.en_uso -= 1
+
+    def cerrar(self, clave: str):
+        """Libera el caso de la clave sin guardarlo."""
+        with self._lock:
+            self._gestores.pop(clave, None)
+            self._saliendo.pop(clave, None)
+            self._desalojados.pop(clave, None)
+        if self.almacen is not None:
+            self.almacen.eliminar(clave)
+
+    #-----------------------
+    # ALMACÉN COMPARTIDO ENTRE PROCESOS
+    #-----------------------
+
+    def usar_almacen(self, almacen):
+        """Comparte el caso activo de cada clave entre procesos mediante un AlmacenCasos."""
+        self.almacen = almacen
+        CaseManager.almacen = almacen
+        # Los diarios de cambios de varios procesos sobre un mismo archivo se mezclarían
+        CaseManager.modo_persistencia = MODO_COMPLETO
+
+    def sincronizar(self, clave: str, gestor: CaseManager) -> Optional[int]:
+        """
+        Toma el bloqueo de la clave entre procesos y actualiza el caso del gestor si otro proceso
+        publicó una versión distinta. Devuelve el bloqueo para pasarlo a publicar().
+        """
+        if self.almacen is None:
+            return None
+        franja = self.almacen.bloqueo_sesiones.adquirir(clave)
+        try:
+            version = self.almacen.version(clave)
+            if version is not None and version != gestor.version():
+                leido = self.almacen.leer(clave)
+                if leido is None:
+                    gestor.activar_caso(None)
+                else:
+                    caso, seq, pendiente = leido
+                    compactar_inversion(caso.inversion, CaseManager.umbral_columnar)
+                    gestor.activar_caso(caso, seq, pendiente)
+            gestor.version_publicada = version
+        except BaseException:
+            self.almacen.bloqueo_sesiones.liberar(franja)
+            raise
+        return franja
+
+    def publicar(self, clave: str, gestor: CaseManager, franja: Optional[int]):
+        """Publica el caso del gestor si cambió durante la petición y suelta el bloqueo de la clave."""
+        if self.almacen is None or franja is None:
+            return
+        try:
+            if gestor.version() != gestor.version_publicada:
+                self.almacen.publicar(clave, gestor.obtener_caso_actual(), gestor._seq, gestor.modificado)
+                gestor.version_publicada = gestor.version()
+        finally:
+            self.almacen.bloqueo_sesiones.liberar(franja)
+
+    def recuperar_pendientes(self) -> int:
+        """
+        Escribe en disco los casos publicados que ningún proceso llegó a guardar (por ejemplo,
+        porque el worker murió antes del autoguardado). Devuelve los casos guardados.
+        """
+        if self.almacen is None:
+            return 0
+        guardados = 0
+        for clave in self.almacen.claves_pendientes():
+            with self.almacen.bloqueo_sesiones.bloqueo(clave):
+                leido = self.almacen.leer(clave)
+                if leido is None:
+                    continue
+                gestor = CaseManager()
+                gestor.activar_caso(leido[0], leido[1])
+                gestor._requiere_instantanea = True
+                exito, _ = gestor.guardar_caso_actual()
+                guardados += exito
+        return guardados
+
+    def casos_abiertos(self) -> Dict[str, Optional[Caso]]:
+        with self._lock:
+            return {clave: g.obtener_caso_actual() for clave, g in self._gestores.items()}
+
+    def _elegir_desalojo(self, excepto: str) -> List[Tuple[str, CaseManager]]:
+        """
+        Con el bloqueo del registro tomado: saca los casos inactivos más antiguos mientras se
+        exceda el límite (LRU) y los deja en _saliendo hasta que _desalojar los guarde.
+        """
+        ocupado = sum(g.tamano_estimado() for g in self._gestores.values())
+        victimas = []
+        for clave in list(self._gestores):
+            if len(self._gestores) <= self.max_casos and ocupado <= self.max_bytes:
+                break
+            gestor = self._gestores[clave]
+            if clave == excepto or gestor.en_uso:
+                continue # En uso por una petición
+            ocupado -= gestor.tamano_estimado()
+            del self._gestores[clave]
+            self._saliendo[clave] = gestor
+            victimas.append((clave, gestor))
+        return victimas
+
+    def _desalojar(self, victimas: List[Tuple[str, CaseManager]]):
+        """Guarda los casos elegidos (sin el bloqueo del registro) y los libera de memoria."""
+        for clave, gestor in victimas:
+            exito, archivo = True, None
+            with gestor.lock:
+                if gestor.obtener_caso_actual():
+                    exito, archivo = gestor.guardar_caso_actual()
+            with self._lock:
+                if self._saliendo.get(clave) is not gestor:
+                    continue # Se volvió a usar (o se cerró) mientras se guardaba
+                del self._saliendo[clave]
+                if not exito:
+                    self._gestores[clave] = gestor # No se pudo guardar: sigue en memoria
+                    self._gestores.move_to_end(clave, last=False)
+                elif archivo:
+                    self._desalojados[clave] = archivo
+
+
+class _GestorActual:
+    """Proxy que delega en el CaseManager de la clave actual del registro."""
+
+    def __init__(self, registro: RegistroCasos):
+        self._registro = registro
+
+    def __getattr__(self, nombre):
+        return getattr(self._registro.gestor_actual(), nombre)
+
 
-# Instancia única del CaseManager para usar en Flask
-manager = CaseManager()
\ No newline at end of file
+# Registro compartido de casos y proxy al caso del usuario actual para usar en Flask
+registro = RegistroCasos()
+manager = _GestorActual(registro)
\ No newline at end of file
@@ -0,0 +1,158 @@
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import os
+import sqlite3
+
+from .models import Caso
+from .calculations import (
+    inversion_total_activos, inversion_total_diferida,
+    inversion_total_capital_trabajo, inversion_total_general
+)
+
+ARCHIVO_CATALOGO = "catalogo.sqlite3"
+
+# Columnas del catálogo (además de filename); el orden solo admite estas columnas
+COLUMNAS = (
+    'nombre', 'fecha_creacion', 'num_proyeccion',
+    'inversion_activos', 'inversion_diferida', 'inversion_capital', 'inversion_total_general',
+    'porcentaje_propio', 'porcentaje_externo', 'monto_propio', 'monto_externo',
+    'num_cargos', 'gran_total_rol', 'actualizado', 'mtime'
+)
+
+
+def resumen_caso(caso: Caso) -> Dict:
+    """Métricas del caso que se indexan en el catálogo (sin abrir el JSON en consultas)."""
+    total = inversion_total_general(caso.inversion)
+    return {
+        'filename': caso.filename,
+        'nombre': caso.nombre,
+        'fecha_creacion': caso.fecha_creacion,
+        'num_proyeccion': caso.proyeccion.num_proyeccion,
+        'inversion_activos': inversion_total_activos(caso.inversion),
+        'inversion_diferida': inversion_total_diferida(caso.inversion),
+        'inversion_capital': inversion_total_capital_trabajo(caso.inversion),
+        'inversion_total_general': total,
+        'porcentaje_propio': caso.financiamiento.porcentaje_propio,
+        'porcentaje_externo': caso.financiamiento.porcentaje_externo,
+        'monto_propio': total * caso.financiamiento.porcentaje_propio / 100,
+        'monto_externo': total * caso.financiamiento.porcentaje_externo / 100,
+        'num_cargos': len(caso.rol_pagos.cargos),
+        'gran_total_rol': caso.rol_pagos.gran_total_general,
+        'actualizado': datetime.now().isoformat(),
+    }
+
+
+class CatalogoCasos:
+    """
+    Índice SQLite de los casos guardados en la carpeta de reportes.
+    Se actualiza en cada guardado o carga y permite buscar, ordenar y paginar sin leer los JSON;
+    la carpeta completa solo se recorre al abrirlo o al pedir una sincronización explícita.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, ARCHIVO_CATALOGO)
+
+    def _conectar(self) -> sqlite3.Connection:
+        os.makedirs(self.directorio, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS casos ("
+            " filename TEXT PRIMARY KEY, nombre TEXT, fecha_creacion TEXT, num_proyeccion INTEGER,"
+            " inversion_activos REAL, inversion_diferida REAL, inversion_capital REAL,"
+            " inversion_total_general REAL, porcentaje_propio REAL, porcentaje_externo REAL,"
+            " monto_propio REAL, monto_externo REAL, num_cargos INTEGER, gran_total_rol REAL,"
+            " actualizado TEXT, mtime REAL)"
+        )
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_casos_fecha ON casos (fecha_creacion)")
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_casos_inversion ON casos (inversion_total_general)")
+        return conexion
+
+    def actualizar(self, resumen: Dict):
+        """Inserta o reemplaza la fila del caso (resumen generado con resumen_caso)."""
+        fila = dict(resumen)
+        if fila.get('mtime') is None:
+            ruta = os.path.join(self.directorio, fila['filename'])
+            fila['mtime'] = os.path.getmtime(ruta) if os.path.exists(ruta) else None
+        columnas = ('filename',) + COLUMNAS
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute(
+                f"INSERT OR REPLACE INTO casos ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                [fila.get(c) for c in columnas]
+            )
+
+    def eliminar(self, filename: str):
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("DELETE FROM casos WHERE filename = ?", (filename,))
+
+    def sincronizar_directorio(self, cargar_caso, extensiones: Tuple[str, ...] = ('.json',)) -> int:
+        """
+        Indexa los archivos de caso que no están en el catálogo o cambiaron desde la última indexación
+        (comparando solo el mtime) y quita los que ya no existen. Devuelve los casos indexados.
+        """
+        if not os.path.isdir(self.directorio):
+            return 0
+        with closing(self._conectar()) as conexion, conexion:
+            indexados = {f: m for f, m in conexion.execute("SELECT filename, mtime FROM casos")}
+
+        en_disco = {e.name: e.stat().st_mtime for e in os.scandir(self.directorio) if e.name.endswith(extensiones)}
+        nuevos = 0
+        for filename, mtime in en_disco.items():
+            if indexados.get(filename) != mtime:
+                caso = cargar_caso(filename)
+                if caso is not None:
+                    resumen = resumen_caso(caso)
+                    resumen['mtime'] = mtime
+                    self.actualizar(resumen)
+                    nuevos += 1
+        for filename in set(indexados) - set(en_disco):
+            self.eliminar(filename)
+        return nuevos
+
+    def consultar(
+        self,
+        texto: Optional[str] = None,
+        inversion_min: Optional[float] = None,
+        inversion_max: Optional[float] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        orden: str = 'fecha_creacion',
+        descendente: bool = True,
+        pagina: int = 1,
+        por_pagina: int = 20
+    ) -> Tuple[List[Dict], int]:
+        """Devuelve (filas de la página, total de coincidencias) con filtros opcionales."""
+        condiciones, parametros = [], []
+        if texto:
+            # % y _ del texto se buscan literalmente, no como comodines de LIKE
+            patron = '%' + texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            condiciones.append("(nombre LIKE ? ESCAPE '\\' OR filename LIKE ? ESCAPE '\\')")
+            parametros += [patron, patron]
+        if inversion_min is not None:
+            condiciones.append("inversion_total_general >= ?")
+            parametros.append(inversion_min)
+        if inversion_max is not None:
+            condiciones.append("inversion_total_general <= ?")
+            parametros.append(inversion_max)
+        if desde:
+            condiciones.append("fecha_creacion >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("fecha_creacion < ?")
+            parametros.append(hasta)
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+        if orden not in COLUMNAS and orden != 'filename':
+            orden = 'fecha_creacion'
+        direccion = "DESC" if descendente else "ASC"
+        pagina, por_pagina = max(int(pagina), 1), max(int(por_pagina), 1)
+
+        with closing(self._conectar()) as conexion, conexion:
+            total = conexion.execute(f"SELECT COUNT(*) FROM casos {where}", parametros).fetchone()[0]
+            filas = conexion.execute(
+                f"SELECT * FROM casos {where} ORDER BY {orden} {direccion}, filename LIMIT ? OFFSET ?",
+                parametros + [por_pagina, (pagina - 1) * por_pagina]
+            ).fetchall()
+        return [dict(f) for f in filas], total
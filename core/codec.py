@@ -0,0 +1,363 @@
+"""
+Codec genérico para los dataclasses de core/models.py.
+
+Para cada dataclass se generan una sola vez funciones especializadas de conversión
+(dataclass -> dict y dict -> dataclass) a partir de sus campos y anotaciones, de modo
+que guardar y cargar un Caso es una sola pasada sin código de hidratación manual.
+
+También define un formato binario compacto (solo biblioteca estándar) y versionado:
+
+    MAGIC (4 bytes) | VERSION (1 byte) | esquema | valor raíz | extras
+
+El esquema lista los campos de cada clase tal como se escribieron; al leer, los valores
+se asignan por nombre, así que agregar o quitar campos no rompe archivos antiguos.
+"""
+from array import array
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args, get_origin, get_type_hints
+import json
+import struct
+
+from .metricas import medir
+
+MAGIC = b"MCSO"
+VERSION_BINARIA = 1
+
+# Migraciones de formatos antiguos: clase -> función(dict) -> dict (antes de decodificar)
+_migraciones: Dict[type, Callable[[dict], dict]] = {}
+_codificadores: Dict[type, Callable] = {}
+_decodificadores: Dict[type, Callable] = {}
+
+
+def registrar_migracion(cls: type, funcion: Callable[[dict], dict]):
+    """Registra una transformación del dict leído antes de construir la clase."""
+    _migraciones[cls] = funcion
+    _decodificadores.pop(cls, None)
+
+
+#-----------------------
+# CONVERTIDORES POR TIPO
+#-----------------------
+
+def _es_lista(tipo) -> bool:
+    return get_origin(tipo) in (list, List)
+
+
+def _elemento(tipo):
+    return (get_args(tipo) or (Any,))[0]
+
+
+def codificador_tipo(tipo) -> Optional[Callable]:
+    """Convertidor para un valor del tipo dado; None significa 'se copia tal cual'."""
+    if is_dataclass(tipo):
+        return codificador(tipo)
+    if _es_lista(tipo):
+        interno = codificador_tipo(_elemento(tipo))
+        if interno is None:
+            return list
+
+        def codificar_lista(valores):
+            # Las tablas columnares generan sus filas sin crear vistas por ítem
+            a_dicts = getattr(valores, 'a_dicts', None)
+            return a_dicts() if a_dicts else [interno(v) for v in valores]
+        return codificar_lista
+    return None
+
+
+def decodificador_tipo(tipo) -> Optional[Callable]:
+    """Convertidor de un valor JSON al tipo dado; None significa 'se usa tal cual'."""
+    if is_dataclass(tipo):
+        return decodificador(tipo)
+    if _es_lista(tipo):
+        interno = decodificador_tipo(_elemento(tipo))
+        if interno is None:
+            return list
+        return lambda valores: [interno(v) for v in valores]
+    return None
+
+
+def codificador(cls: type) -> Callable[[Any], dict]:
+    """Función especializada dataclass -> dict (generada una vez por clase)."""
+    if cls in _codificadores:
+        return _codificadores[cls]
+    _codificadores[cls] = lambda obj: codificador(cls)(obj) # Permite tipos recursivos
+
+    hints = get_type_hints(cls)
+    entorno: Dict[str, Any] = {}
+    partes = []
+    for f in fields(cls):
+        conv = codificador_tipo(hints[f.name])
+        if conv is None:
+            partes.append(f"{f.name!r}: o.{f.name}")
+        else:
+            entorno[f"c_{f.name}"] = conv
+            partes.append(f"{f.name!r}: c_{f.name}(o.{f.name})")
+    codigo = f"def codificar(o):\n    return {{{', '.join(partes)}}}\n"
+    exec(codigo, entorno)
+    _codificadores[cls] = entorno['codificar']
+    return _codificadores[cls]
+
+
+def decodificador(cls: type) -> Callable[[dict], Any]:
+    """Función especializada dict -> dataclass; los campos ausentes toman su valor por defecto."""
+    if cls in _decodificadores:
+        return _decodificadores[cls]
+    _decodificadores[cls] = lambda datos: decodificador(cls)(datos)
+
+    hints = get_type_hints(cls)
+    entorno: Dict[str, Any] = {'cls': cls, 'migrar': _migraciones.get(cls)}
+    lineas = ["def decodificar(d):"]
+    if cls in _migraciones:
+        lineas.append("    d = migrar(d)")
+    lineas.append("    kw = {}")
+    for f in fields(cls):
+        if not f.init:
+            continue
+        conv = decodificador_tipo(hints[f.name])
+        lineas.append(f"    if {f.name!r} in d:")
+        if conv is None:
+            lineas.append(f"        kw[{f.name!r}] = d[{f.name!r}]")
+        else:
+            entorno[f"c_{f.name}"] = conv
+            lineas.append(f"        kw[{f.name!r}] = c_{f.name}(d[{f.name!r}])")
+    lineas.append("    return cls(**kw)")
+    exec("\n".join(lineas) + "\n", entorno)
+    _decodificadores[cls] = entorno['decodificar']
+    return _decodificadores[cls]
+
+
+def _clase_de(obj) -> type:
+    """Clase del dataclass; las vistas de fila columnares declaran su clase en clase_datos."""
+    return getattr(type(obj), 'clase_datos', type(obj))
+
+
+def a_dict(obj) -> dict:
+    return codificador(_clase_de(obj))(obj)
+
+
+def desde_dict(cls: type, datos: dict):
+    return decodificador(cls)(datos)
+
+
+@medir('codec.a_json')
+def a_json(obj, extras: Optional[dict] = None) -> str:
+    datos = a_dict(obj)
+    if extras:
+        datos.update(extras)
+    return json.dumps(datos, separators=(',', ':'))
+
+
+@medir('codec.desde_json')
+def desde_json(cls: type, texto: str) -> Tuple[Any, dict]:
+    """Devuelve (objeto, dict original) para que el llamador lea claves extra."""
+    datos = json.loads(texto)
+    return desde_dict(cls, datos), datos
+
+
+#-----------------------
+# FORMATO BINARIO
+#-----------------------
+# Etiquetas de valor (1 byte)
+_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _LIST, _FLOATS, _OBJ, _MAP = b"NTFidslDom"
+_u32 = struct.Struct("<I")
+_i64 = struct.Struct("<q")
+_f64 = struct.Struct("<d")
+_u16 = struct.Struct("<H")
+
+
+class _Escritor:
+    def __init__(self):
+        self.buf = bytearray()
+        self.clases: Dict[type, Tuple[bytes, List[str]]] = {} # clase -> (índice empaquetado, campos)
+        self.campos: List[Tuple[str, List[str]]] = []
+
+    def _clase(self, cls: type) -> Tuple[bytes, List[str]]:
+        if cls not in self.clases:
+            nombres = [f.name for f in fields(cls)]
+            self.clases[cls] = (_u16.pack(len(self.campos)), nombres)
+            self.campos.append((cls.__name__, nombres))
+        return self.clases[cls]
+
+    def _str(self, texto: str):
+        datos = texto.encode('utf-8')
+        self.buf += _u32.pack(len(datos))
+        self.buf += datos
+
+    def valor(self, v):
+        buf = self.buf
+        if v is None:
+            buf.append(_NONE)
+        elif v is True:
+            buf.append(_TRUE)
+        elif v is False:
+            buf.append(_FALSE)
+        elif isinstance(v, int):
+            buf.append(_INT)
+            buf += _i64.pack(v)
+        elif isinstance(v, float):
+            buf.append(_FLOAT)
+            buf += _f64.pack(v)
+        elif isinstance(v, str):
+            buf.append(_STR)
+            self._str(v)
+        elif isinstance(v, dict):
+            buf.append(_MAP)
+            buf += _u32.pack(len(v))
+            for clave, valor in v.items():
+                self._str(str(clave))
+                self.valor(valor)
+        elif is_dataclass(v):
+            indice, nombres = self._clase(_clase_de(v))
+            buf.append(_OBJ)
+            buf += indice
+            for nombre in nombres:
+                self.valor(getattr(v, nombre))
+        else:
+            valores = list(v)
+            if valores and all(type(x) is float for x in valores):
+                # Listas numéricas: bloque contiguo de float64
+                buf.append(_FLOATS)
+                buf += _u32.pack(len(valores))
+                buf += array('d', valores).tobytes()
+            else:
+                buf.append(_LIST)
+                buf += _u32.pack(len(valores))
+                for x in valores:
+                    self.valor(x)
+
+
+class _Lector:
+    def __init__(self, datos: bytes, tipos: Dict[str, type]):
+        self.datos = bytes(datos)
+        self.pos = 0
+        self.tipos = tipos
+        self.esquema: List[Tuple[Callable, int]] = [] # (constructor, número de campos)
+        self._lectores = {
+            _NONE: lambda: None, _TRUE: lambda: True, _FALSE: lambda: False,
+            _INT: self._int, _FLOAT: self._float, _STR: self._str, _FLOATS: self._floats,
+            _LIST: self._lista, _MAP: self._mapa, _OBJ: self._objeto,
+        }
+
+    def _u32(self) -> int:
+        (n,) = _u32.unpack_from(self.datos, self.pos)
+        self.pos += 4
+        return n
+
+    def _int(self) -> int:
+        (v,) = _i64.unpack_from(self.datos, self.pos)
+        self.pos += 8
+        return v
+
+    def _float(self) -> float:
+        (v,) = _f64.unpack_from(self.datos, self.pos)
+        self.pos += 8
+        return v
+
+    def _str(self) -> str:
+        n = self._u32()
+        inicio = self.pos
+        self.pos += n
+        return self.datos[inicio:self.pos].decode('utf-8')
+
+    def _floats(self) -> List[float]:
+        n = self._u32()
+        valores = array('d')
+        valores.frombytes(self.datos[self.pos:self.pos + 8 * n])
+        self.pos += 8 * n
+        return valores.tolist()
+
+    def _lista(self) -> list:
+        valor = self.valor
+        return [valor() for _ in range(self._u32())]
+
+    def _mapa(self) -> dict:
+        return {self._str(): self.valor() for _ in range(self._u32())}
+
+    def _objeto(self):
+        (indice,) = _u16.unpack_from(self.datos, self.pos)
+        self.pos += 2
+        constructor, n = self.esquema[indice]
+        valor = self.valor
+        return constructor([valor() for _ in range(n)])
+
+    def leer_esquema(self):
+        for _ in range(self._u32()):
+            nombre = self._str()
+            campos = [self._str() for _ in range(self._u32())]
+            self.esquema.append((_constructor(self.tipos.get(nombre), campos), len(campos)))
+
+    def valor(self):
+        etiqueta = self.datos[self.pos]
+        self.pos += 1
+        try:
+            lector = self._lectores[etiqueta]
+        except KeyError:
+            raise ValueError(f"Etiqueta binaria desconocida: {etiqueta!r}") from None
+        return lector()
+
+
+def _constructor(cls: Optional[type], campos: List[str]) -> Callable[[list], Any]:
+    """Construye objetos a partir de los valores en el orden del esquema escrito."""
+    if cls is None:
+        return lambda valores: dict(zip(campos, valores)) # Clase que ya no existe
+    iniciales = [f.name for f in fields(cls) if f.init]
+    if campos == iniciales and cls not in _migraciones:
+        return lambda valores: cls(*valores) # Esquema idéntico al actual: posicional
+    nombres = set(iniciales)
+    migrar = _migraciones.get(cls, lambda d: d)
+
+    def construir(valores):
+        datos = migrar(dict(zip(campos, valores)))
+        return cls(**{k: v for k, v in datos.items() if k in nombres})
+    return construir
+
+
+def _tipos_alcanzables(cls: type, encontrados: Dict[str, type]) -> Dict[str, type]:
+    if cls.__name__ in encontrados:
+        return encontrados
+    encontrados[cls.__name__] = cls
+    for tipo in get_type_hints(cls).values():
+        while _es_lista(tipo):
+            tipo = _elemento(tipo)
+        if is_dataclass(tipo):
+            _tipos_alcanzables(tipo, encontrados)
+    return encontrados
+
+
+@medir('codec.a_binario')
+def a_binario(obj, extras: Optional[dict] = None) -> bytes:
+    escritor = _Escritor()
+    escritor.valor(obj)
+    escritor.valor(extras or {})
+    cuerpo = escritor.buf
+
+    cabecera = _Escritor()
+    cabecera.buf += MAGIC
+    cabecera.buf.append(VERSION_BINARIA)
+    cabecera.buf += _u32.pack(len(escritor.campos))
+    for nombre, campos in escritor.campos:
+        cabecera._str(nombre)
+        cabecera.buf += _u32.pack(len(campos))
+        for campo in campos:
+            cabecera._str(campo)
+    return bytes(cabecera.buf + cuerpo)
+
+
+def es_binario(datos: bytes) -> bool:
+    return datos[:4] == MAGIC
+
+
+@medir('codec.desde_binario')
+def desde_binario(cls: type, datos: bytes) -> Tuple[Any, dict]:
+    """Devuelve (objeto, extras) a partir de un archivo binario."""
+    if not es_binario(datos):
+        raise ValueError("No es un archivo binario de caso.")
+    version = datos[4]
+    if version > VERSION_BINARIA:
+        raise ValueError(f"Versión binaria no soportada: {version}")
+    lector = _Lector(datos, _tipos_alcanzables(cls, {}))
+    lector.pos = 5
+    lector.leer_esquema()
+    obj = lector.valor()
+    extras = lector.valor()
+    return obj, extras
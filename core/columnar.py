@@ -0,0 +1,219 @@
+"""
+Almacenamiento columnar para tablas grandes de ítems (activos, diferida, capital, consumos).
+
+TablaColumnar se comporta como una lista de dataclasses, pero guarda cada campo en una
+columna: arreglos tipados (array 'd' / 'q') para los numéricos y listas de cadenas
+internadas para los textos. Al indexarla devuelve una fila "vista" que lee y escribe
+directamente en las columnas y que conserva los métodos del dataclass (calcular_total).
+Las vistas apuntan a una posición: tras insertar o borrar filas, las vistas anteriores
+pueden referirse a otra fila.
+"""
+from array import array
+from collections.abc import MutableSequence
+from dataclasses import fields
+from typing import Any, Dict, Iterable, List, Tuple, get_type_hints
+import sys
+
+# Tipo del campo -> código de array (los demás tipos se guardan en listas)
+CODIGOS_ARRAY = {float: 'd', int: 'q'}
+
+_esquemas: Dict[type, List[Tuple[str, str]]] = {}
+_clases_fila: Dict[type, type] = {}
+
+
+def esquema_columnar(cls: type) -> List[Tuple[str, str]]:
+    """[(campo, código de array o '')] del dataclass; los textos usan '' (lista internada)."""
+    if cls not in _esquemas:
+        hints = get_type_hints(cls)
+        esquema = []
+        for f in fields(cls):
+            tipo = hints[f.name]
+            if tipo not in CODIGOS_ARRAY and tipo is not str:
+                raise TypeError(f"{cls.__name__}.{f.name}: tipo {tipo} no admitido en una tabla columnar")
+            esquema.append((f.name, CODIGOS_ARRAY.get(tipo, '')))
+        _esquemas[cls] = esquema
+    return _esquemas[cls]
+
+
+def _normalizar(codigo: str, valor):
+    """Ajusta el valor al tipo de la columna (los JSON antiguos pueden traer 3.0 en un int)."""
+    if codigo == 'q' and isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if codigo == 'd' and isinstance(valor, int):
+        return float(valor)
+    if codigo == '' and isinstance(valor, str):
+        return sys.intern(valor)
+    return valor
+
+
+def clase_fila(cls: type) -> type:
+    """Clase de las vistas de fila de cls: propiedades por campo y los métodos del dataclass."""
+    if cls in _clases_fila:
+        return _clases_fila[cls]
+
+    espacio: Dict[str, Any] = {
+        '__slots__': ('_tabla', '_i'),
+        '__dataclass_fields__': cls.__dataclass_fields__, # dataclasses.fields/asdict la aceptan
+        'clase_datos': cls,
+    }
+
+    def propiedad(nombre: str, codigo: str):
+        def leer(self):
+            return self._tabla._columnas[nombre][self._i]
+
+        def escribir(self, valor):
+            self._tabla._columnas[nombre][self._i] = _normalizar(codigo, valor)
+        return property(leer, escribir)
+
+    for nombre, codigo in esquema_columnar(cls):
+        espacio[nombre] = propiedad(nombre, codigo)
+    for nombre, valor in vars(cls).items():
+        if callable(valor) and not nombre.startswith('__'):
+            espacio[nombre] = valor # calcular_total, etc.
+
+    def __init__(self, tabla: 'TablaColumnar', i: int):
+        self._tabla, self._i = tabla, i
+
+    def __repr__(self):
+        valores = ', '.join(f"{n}={getattr(self, n)!r}" for n, _ in esquema_columnar(cls))
+        return f"{cls.__name__}({valores})"
+
+    def __eq__(self, otro):
+        if not hasattr(otro, '__dataclass_fields__'):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(otro, n, None) for n, _ in esquema_columnar(cls))
+
+    espacio.update(__init__=__init__, __repr__=__repr__, __eq__=__eq__, __hash__=None)
+    _clases_fila[cls] = type(f"Fila{cls.__name__}", (), espacio)
+    return _clases_fila[cls]
+
+
+class TablaColumnar(MutableSequence):
+    """Lista de ítems de un dataclass plano almacenada por columnas."""
+
+    def __init__(self, cls: type, items: Iterable = ()):
+        self.clase = cls
+        self._esquema = esquema_columnar(cls)
+        self._fila = clase_fila(cls)
+        self._columnas: Dict[str, Any] = {n: array(c) if c else [] for n, c in self._esquema}
+        self._n = 0
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _indice(self, i: int) -> int:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("índice fuera de rango")
+        return i
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._fila(self, j) for j in range(*i.indices(self._n))]
+        return self._fila(self, self._indice(i))
+
+    def __iter__(self):
+        fila = self._fila
+        for j in range(self._n):
+            yield fila(self, j)
+
+    def __setitem__(self, i, item):
+        if isinstance(i, slice):
+            posiciones = range(*i.indices(self._n))
+            items = list(item)
+            if len(items) != len(posiciones):
+                raise ValueError("la asignación por rebanada debe conservar el tamaño")
+            for j, it in zip(posiciones, items):
+                self[j] = it
+            return
+        i = self._indice(i)
+        for nombre, codigo in self._esquema:
+            self._columnas[nombre][i] = _normalizar(codigo, getattr(item, nombre))
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            posiciones = sorted(range(*i.indices(self._n)), reverse=True)
+        else:
+            posiciones = [self._indice(i)]
+        for j in posiciones:
+            for columna in self._columnas.values():
+                del columna[j]
+            self._n -= 1
+
+    def insert(self, i: int, item):
+        i = min(max(i + self._n if i < 0 else i, 0), self._n)
+        for nombre, codigo in self._esquema:
+            self._columnas[nombre].insert(i, _normalizar(codigo, getattr(item, nombre)))
+        self._n += 1
+
+    def append(self, item):
+        for nombre, codigo in self._esquema:
+            self._columnas[nombre].append(_normalizar(codigo, getattr(item, nombre)))
+        self._n += 1
+
+    def extend(self, items: Iterable):
+        """Añade los ítems columna por columna (una pasada por campo)."""
+        items = list(items)
+        for nombre, codigo in self._esquema:
+            self._columnas[nombre].extend(_normalizar(codigo, getattr(it, nombre)) for it in items)
+        self._n += len(items)
+
+    def columna(self, nombre: str):
+        """Columna de un campo (array tipado o lista); tratarla como solo lectura."""
+        return self._columnas[nombre]
+
+    def suma(self, nombre: str) -> float:
+        return sum(self._columnas[nombre], 0.0)
+
+    def a_dicts(self) -> List[Dict]:
+        """Filas como diccionarios (serialización sin crear vistas)."""
+        nombres = [n for n, _ in self._esquema]
+        columnas = [self._columnas[n] for n in nombres]
+        return [dict(zip(nombres, valores)) for valores in zip(*columnas)]
+
+    def a_lista(self) -> List:
+        """Copia de la tabla como lista de instancias del dataclass."""
+        return [self.clase(**d) for d in self.a_dicts()]
+
+    def bytes_estimados(self) -> int:
+        total = 0
+        for columna in self._columnas.values():
+            if isinstance(columna, array):
+                total += columna.itemsize * len(columna)
+            else:
+                total += 8 * len(columna) # Referencias; las cadenas internadas se comparten
+        return total
+
+    def __repr__(self):
+        return f"TablaColumnar({self.clase.__name__}, {self._n} filas)"
+
+
+def sumar_campo(items, nombre: str) -> float:
+    """Suma un campo de una lista de ítems; en una TablaColumnar suma directamente la columna."""
+    if isinstance(items, TablaColumnar):
+        return items.suma(nombre)
+    return sum((getattr(item, nombre) for item in items), 0)
+
+
+# Tablas de DatosInversion que admiten la representación columnar
+TABLAS_INVERSION = (
+    'activos_fijos', 'inversion_diferida', 'capital_trabajo_items',
+    'consumos_mensuales', 'consumos_diarios',
+)
+
+
+def compactar_inversion(inversion, umbral: int) -> List[str]:
+    """Convierte a TablaColumnar las tablas de la inversión con al menos `umbral` filas."""
+    if umbral <= 0:
+        return []
+    hints = get_type_hints(type(inversion))
+    convertidas = []
+    for nombre in TABLAS_INVERSION:
+        items = getattr(inversion, nombre)
+        if not isinstance(items, TablaColumnar) and len(items) >= umbral:
+            (cls,) = hints[nombre].__args__
+            setattr(inversion, nombre, TablaColumnar(cls, items))
+            convertidas.append(nombre)
+    return convertidas
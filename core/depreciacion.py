@@ -0,0 +1,162 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .models import Caso, ActivoFijo, InversionDiferidaItem
+
+#-----------------------
+# CONFIGURACIÓN DE DEPRECIACIÓN
+#-----------------------
+
+ANIOS_MATRIZ = 20 # Columnas de años que muestra la pestaña
+
+# Porcentaje anual y años de vida útil por tipo de activo
+CONFIG_DEP: Dict[str, Dict[str, int]] = {
+    'Inmuebles': {'pct': 5, 'anos': 20},
+    'Instalaciones': {'pct': 10, 'anos': 10},
+    'Vehiculos': {'pct': 20, 'anos': 5},
+    'Equipos': {'pct': 33, 'anos': 3},
+}
+
+METODO_LINEAL = "lineal"
+METODO_SALDO_DECRECIENTE = "saldo_decreciente"
+METODO_SUMA_DIGITOS = "suma_digitos"
+METODOS_DEPRECIACION = (METODO_LINEAL, METODO_SALDO_DECRECIENTE, METODO_SUMA_DIGITOS)
+
+
+def distribuir_monto(monto: float, anos: int, metodo: str = METODO_LINEAL) -> List[float]:
+    """
+    Reparte el monto depreciable en los años de vida útil según el método, rellenando hasta
+    ANIOS_MATRIZ. Las cuotas se calculan con la vida útil real; si pasa de ANIOS_MATRIZ solo
+    se muestran las primeras columnas.
+    """
+    anos = max(int(anos), 0)
+    if anos == 0:
+        return [0.0] * ANIOS_MATRIZ
+    columnas = min(anos, ANIOS_MATRIZ)
+
+    if metodo == METODO_LINEAL:
+        cuotas = [monto / anos] * columnas
+    elif metodo == METODO_SUMA_DIGITOS:
+        suma = anos * (anos + 1) / 2
+        cuotas = [monto * (anos - k) / suma for k in range(columnas)]
+    elif metodo == METODO_SALDO_DECRECIENTE:
+        # Doble saldo decreciente: cuota k = monto * tasa * (1 - tasa)^k; el último año
+        # absorbe el saldo pendiente para que la suma sea exactamente el monto
+        tasa = min(2 / anos, 1.0)
+        cuotas = [monto * tasa * (1 - tasa) ** k for k in range(min(anos - 1, columnas))]
+        if anos <= ANIOS_MATRIZ:
+            cuotas.append(monto - sum(cuotas))
+    else:
+        raise ValueError(f"Método de depreciación desconocido: {metodo}")
+
+    return cuotas + [0.0] * (ANIOS_MATRIZ - columnas)
+
+
+def fila_depreciacion(activo: ActivoFijo) -> Dict:
+    """Calcula la fila de depreciación de un activo fijo (columnas de la pestaña y los 20 años)."""
+    config = CONFIG_DEP.get(activo.dep_tipo, {'pct': 0, 'anos': 0})
+    valor_residual = activo.valor_total * (activo.dep_porcentaje_residual / 100)
+    base_depreciable = activo.valor_total - valor_residual
+    monto = base_depreciable * (activo.dep_monto_valor_residual_pct / 100)
+    anios = distribuir_monto(monto, config['anos'], activo.dep_metodo)
+    return {
+        'valor_residual': valor_residual,
+        'base_depreciable': base_depreciable,
+        'pct_dep': config['pct'],
+        'anos_dep': config['anos'],
+        'valor_dep': anios[0],
+        'anios': anios,
+    }
+
+
+def fila_amortizacion(item: InversionDiferidaItem) -> Dict:
+    """Calcula la fila de amortización lineal de un ítem de inversión diferida."""
+    anos = item.amort_anios if item.amort_anios > 0 else 1
+    valor_amort = item.total / anos
+    anios = distribuir_monto(item.total, anos)
+    return {
+        'anos': anos,
+        'pct': (valor_amort / item.total) * 100 if item.total else 0.0,
+        'valor_dep': valor_amort,
+        'anios': anios,
+    }
+
+
+def clave_depreciacion(activo: ActivoFijo) -> Tuple:
+    """Entradas de las que depende la fila de depreciación de un activo."""
+    return (activo.valor_total, activo.dep_tipo, activo.dep_porcentaje_residual,
+            activo.dep_monto_valor_residual_pct, activo.dep_metodo)
+
+
+def clave_amortizacion(item: InversionDiferidaItem) -> Tuple:
+    return (item.total, item.amort_anios)
+
+
+class MatrizAnual:
+    """
+    Matriz activos × años con totales por año en caché.
+    Actualizar un activo solo recalcula su fila y ajusta los totales por diferencia.
+    """
+
+    def __init__(self, calcular_fila: Callable[[object], Dict], clave_fila: Callable[[object], Tuple]):
+        self._calcular_fila = calcular_fila
+        self._clave_fila = clave_fila
+        self._items = None # Lista sincronizada (si se reemplaza, la matriz se reconstruye)
+        self._claves: List[Tuple] = []
+        self.revision: Optional[int] = None # Revisión del caso con la que se sincronizó
+        self.filas: List[Dict] = []
+        self.totales: List[float] = [0.0] * ANIOS_MATRIZ
+        self.total_valor_dep: float = 0.0
+
+    def _sumar(self, fila: Dict, signo: int):
+        self.totales = [t + signo * v for t, v in zip(self.totales, fila['anios'])]
+        self.total_valor_dep += signo * fila['valor_dep']
+
+    def sincronizar(self, items: Sequence, revision: Optional[int] = None) -> 'MatrizAnual':
+        """
+        Pone la matriz al día con los ítems: se reconstruye si la lista se reemplazó o se acortó,
+        y si la revisión del caso cambió (o no se indica) recalcula las filas cuyas entradas
+        cambiaron fuera de actualizar(). Después añade las filas de los ítems nuevos.
+        """
+        if items is not self._items or len(items) < len(self.filas):
+            self._items, self._claves = items, []
+            self.filas, self.totales, self.total_valor_dep = [], [0.0] * ANIOS_MATRIZ, 0.0
+        elif revision is None or revision != self.revision:
+            for idx, (item, clave) in enumerate(zip(items, self._claves)):
+                if self._clave_fila(item) != clave:
+                    self.actualizar(idx, item)
+        for item in items[len(self.filas):]:
+            fila = self._calcular_fila(item)
+            self.filas.append(fila)
+            self._claves.append(self._clave_fila(item))
+            self._sumar(fila, 1)
+        self.revision = revision
+        return self
+
+    def actualizar(self, idx: int, item) -> Dict:
+        """Recalcula la fila idx y ajusta los totales en O(años)."""
+        self._sumar(self.filas[idx], -1)
+        fila = self._calcular_fila(item)
+        self.filas[idx] = fila
+        self._claves[idx] = self._clave_fila(item)
+        self._sumar(fila, 1)
+        return fila
+
+    def a_dict(self) -> Dict:
+        return {'filas': self.filas, 'totales': self.totales, 'total_valor_dep': self.total_valor_dep}
+
+
+def matriz_depreciacion(caso: Caso) -> MatrizAnual:
+    """Matriz de depreciación del caso; se construye una vez y se mantiene en memoria junto a la inversión."""
+    matriz = getattr(caso.inversion, '_matriz_depreciacion', None)
+    if matriz is None:
+        matriz = MatrizAnual(fila_depreciacion, clave_depreciacion)
+        caso.inversion._matriz_depreciacion = matriz
+    return matriz.sincronizar(caso.inversion.activos_fijos, caso.revision)
+
+
+def matriz_amortizacion_diferida(caso: Caso) -> MatrizAnual:
+    """Matriz de amortización de la inversión diferida del caso (misma caché que la depreciación)."""
+    matriz = getattr(caso.inversion, '_matriz_amortizacion', None)
+    if matriz is None:
+        matriz = MatrizAnual(fila_amortizacion, clave_amortizacion)
+        caso.inversion._matriz_amortizacion = matriz
+    return matriz.sincronizar(caso.inversion.inversion_diferida, caso.revision)
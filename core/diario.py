@@ -0,0 +1,96 @@
+"""
+Diario de cambios (journal) para la persistencia incremental de casos.
+
+Cada mutación se guarda como una línea JSON compacta [seq, op, ruta, valor]:
+    [12, "append", "inversion.activos_fijos", {...}]
+    [13, "set", "wacc.tabla_utilidad.3.valores_anuales.2", 1500.0]
+    [14, "extend", "inversion.capital_trabajo_items", [{...}, {...}]]
+La ruta recorre atributos e índices desde el Caso. El archivo <caso>.json es la
+instantánea completa y <caso>.json.diario contiene los cambios posteriores a ella.
+"""
+from collections.abc import MutableSequence
+from dataclasses import is_dataclass
+from typing import Any, Iterator, List, get_args, get_origin, get_type_hints
+import json
+import os
+
+from .codec import decodificador_tipo
+
+OP_SET = "set"
+OP_APPEND = "append"
+OP_EXTEND = "extend" # Lote de elementos añadido en una sola operación (importaciones)
+EXTENSION_DIARIO = ".diario"
+CLAVE_SECUENCIA = "_diario_seq" # Último número de secuencia incluido en la instantánea
+
+
+def ruta_diario(filepath: str) -> str:
+    return filepath + EXTENSION_DIARIO
+
+
+def construir(tipo, valor: Any) -> Any:
+    """Convierte un valor JSON al tipo declarado (dataclass, List[dataclass] o primitivo)."""
+    if (is_dataclass(tipo) and isinstance(valor, dict)) or (get_origin(tipo) in (list, List) and isinstance(valor, list)):
+        return decodificador_tipo(tipo)(valor)
+    return valor
+
+
+def _tipo_hijo(tipo, clave: str):
+    if get_origin(tipo) in (list, List):
+        return (get_args(tipo) or (Any,))[0]
+    if is_dataclass(tipo):
+        return get_type_hints(tipo).get(clave, Any)
+    return Any
+
+
+def aplicar_cambio(caso, op: str, ruta: str, valor: Any):
+    """Aplica una mutación del diario sobre el caso en memoria."""
+    partes = ruta.split('.')
+    objeto, tipo = caso, type(caso)
+    for parte in partes[:-1]:
+        objeto = objeto[int(parte)] if isinstance(objeto, MutableSequence) else getattr(objeto, parte)
+        tipo = _tipo_hijo(tipo, parte)
+
+    ultimo = partes[-1]
+    tipo_destino = _tipo_hijo(tipo, ultimo)
+    if op == OP_SET:
+        if isinstance(objeto, MutableSequence):
+            objeto[int(ultimo)] = construir(tipo_destino, valor)
+        else:
+            setattr(objeto, ultimo, construir(tipo_destino, valor))
+    elif op == OP_APPEND:
+        lista = objeto[int(ultimo)] if isinstance(objeto, MutableSequence) else getattr(objeto, ultimo)
+        lista.append(construir(_tipo_hijo(tipo_destino, ''), valor))
+    elif op == OP_EXTEND:
+        lista = objeto[int(ultimo)] if isinstance(objeto, MutableSequence) else getattr(objeto, ultimo)
+        lista.extend(construir(tipo_destino, valor))
+    else:
+        raise ValueError(f"Operación de diario desconocida: {op}")
+
+
+def anexar(filepath: str, operaciones: List[list]):
+    """Añade operaciones al diario del caso y fuerza su escritura a disco."""
+    with open(ruta_diario(filepath), 'a', encoding='utf-8') as f:
+        for operacion in operaciones:
+            f.write(json.dumps(operacion, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def leer(filepath: str) -> Iterator[list]:
+    """Lee las operaciones del diario; ignora una última línea truncada por un corte."""
+    diario = ruta_diario(filepath)
+    if not os.path.exists(diario):
+        return
+    with open(diario, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                break
+
+
+def eliminar(filepath: str):
+    """Borra el diario tras escribir una instantánea completa que ya lo incluye."""
+    diario = ruta_diario(filepath)
+    if os.path.exists(diario):
+        os.remove(diario)
@@ -0,0 +1,361 @@
+"""
+Series de lecturas de energía por intervalo (por ejemplo, cada 15 minutos) y tarifas.
+
+Las lecturas de un caso se guardan en <caso>.json.energia junto al archivo del caso:
+una cabecera fija seguida de los kWh de cada intervalo como float64 contiguos. La hora de
+cada lectura no se guarda: es inicio + índice * intervalo (los huecos del medidor quedan
+en 0). Para los cálculos el archivo se abre con mmap y se lee con un memoryview de
+doubles, así que los acumulados y los costos son sumas sobre rebanadas del archivo
+(hechas en C) y nunca se crea un objeto Python por lectura:
+
+    día d                   -> kwh[inicio_dia : fin_dia]
+    franja q de la semana   -> kwh[desfase_q :: 7 * lecturas_por_dia]   (tarifa horaria)
+
+La hora de cada lectura es el inicio de su intervalo, en hora local sin zona. Las fechas
+con zona (sufijo Z o ±hh:mm) se pasan a la zona de la primera lectura con zona del archivo
+y se guardan sin ella: la rejilla sigue siendo regular aunque el medidor cambie de desfase.
+"""
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
+import csv
+import math
+import mmap
+import os
+import struct
+
+from . import case_manager
+from .models import Caso, DatosEnergia
+from .importacion import MAX_ERRORES_REPORTADOS, _lineas
+
+MAGIC = b"MENG"
+VERSION_SERIE = 1
+# magic, versión, intervalo (minutos), inicio (segundos desde 1970, hora local), número de lecturas
+_cabecera = struct.Struct("<4sB3xIqq4x")
+EXTENSION_ENERGIA = ".energia"
+EPOCA = datetime(1970, 1, 1)
+MINUTOS_DIA = 24 * 60
+TAMANO_BLOQUE = 64 * 1024 # Lecturas por escritura al importar
+MAX_LECTURAS = 50_000_000 # ~400 MB por serie (también limita los huecos que se rellenan)
+
+COLUMNAS_FECHA = ('fecha', 'fecha_hora', 'timestamp')
+COLUMNAS_KWH = ('kwh', 'consumo_kwh')
+TARIFAS = ('plana', 'escalonada', 'horaria')
+DIAS_TARIFA = ('todos', 'laborables', 'fin_de_semana')
+
+
+def ruta_energia(filepath: str) -> str:
+    return filepath + EXTENSION_ENERGIA
+
+
+def ruta_serie(caso: Caso) -> str:
+    return ruta_energia(os.path.join(case_manager.CASES_DIR, caso.filename))
+
+
+#-----------------------
+# ARCHIVO DE LECTURAS (MMAP)
+#-----------------------
+
+class SerieEnergia:
+    """Lecturas de un archivo .energia mapeadas en memoria (usar con `with`)."""
+
+    def __init__(self, ruta: str):
+        self._archivo = open(ruta, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, intervalo, inicio, n = _cabecera.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version > VERSION_SERIE:
+                raise ValueError("No es un archivo de lecturas de energía válido.")
+            if len(self._mmap) < _cabecera.size + 8 * n:
+                raise ValueError("El archivo de lecturas está incompleto.")
+        except BaseException:
+            self._archivo.close()
+            raise
+        self.intervalo_min = intervalo
+        self.inicio = EPOCA + timedelta(seconds=inicio)
+        self.n = n
+        self.kwh = memoryview(self._mmap)[_cabecera.size:_cabecera.size + 8 * n].cast('d')
+
+    @property
+    def por_dia(self) -> int:
+        return MINUTOS_DIA // self.intervalo_min
+
+    @property
+    def franja_inicial(self) -> int:
+        """Franja del día (0 .. por_dia-1) de la primera lectura."""
+        return (self.inicio.hour * 60 + self.inicio.minute) // self.intervalo_min
+
+    @property
+    def dias(self) -> float:
+        return self.n * self.intervalo_min / MINUTOS_DIA
+
+    def cerrar(self):
+        self.kwh.release()
+        self._mmap.close()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+@dataclass
+class ResultadoSerie:
+    lecturas: int = 0
+    huecos: int = 0 # Intervalos sin lectura (rellenados con 0)
+    errores: List[Dict] = field(default_factory=list)
+    num_errores: int = 0
+
+    def agregar_error(self, fila: int, mensaje: str):
+        self.num_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({'fila': fila, 'mensaje': mensaje})
+
+
+def _columna(cabecera: List[str], nombres: Tuple[str, ...]) -> int:
+    normalizada = [c.strip().lower() for c in cabecera]
+    for nombre in nombres:
+        if nombre in normalizada:
+            return normalizada.index(nombre)
+    raise ValueError(f"Falta la columna '{nombres[0]}'.")
+
+
+def leer_lecturas(flujo, resultado: ResultadoSerie) -> Iterator[Tuple[int, datetime, float]]:
+    """(fila, fecha, kWh) de un CSV con columnas fecha y kwh; las filas inválidas se informan."""
+    lineas = _lineas(flujo)
+    cabecera = next(lineas, '')
+    separador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+    columnas = next(csv.reader([cabecera], delimiter=separador), [])
+    i_fecha, i_kwh = _columna(columnas, COLUMNAS_FECHA), _columna(columnas, COLUMNAS_KWH)
+    decimal_coma = separador == ';'
+    zona = None # Zona de la primera fecha con zona; las demás se convierten a ella
+
+    for numero, fila in enumerate(csv.reader(lineas, delimiter=separador), start=1):
+        if not fila:
+            continue
+        try:
+            valor = fila[i_kwh].strip()
+            if decimal_coma:
+                valor = valor.replace(',', '.')
+            kwh = float(valor)
+            if not math.isfinite(kwh):
+                raise ValueError(f"kWh no finito: {valor!r}")
+            fecha = datetime.fromisoformat(fila[i_fecha].strip())
+        except (IndexError, ValueError) as e:
+            resultado.agregar_error(numero, f"Fila inválida: {e}")
+            continue
+        if fecha.tzinfo is not None:
+            zona = zona or fecha.tzinfo
+            fecha = fecha.astimezone(zona).replace(tzinfo=None)
+        yield numero, fecha, kwh
+
+
+def importar_serie(flujo, ruta: str, intervalo_min: Optional[int] = None) -> ResultadoSerie:
+    """
+    Escribe la serie del CSV en `ruta` (reemplaza la anterior). Sin `intervalo_min`, el
+    intervalo es la diferencia entre las dos primeras lecturas. Las lecturas deben venir en
+    orden; las repetidas, desordenadas o fuera de la rejilla del intervalo se informan.
+    """
+    resultado = ResultadoSerie()
+    lecturas = leer_lecturas(flujo, resultado)
+    primeras = []
+    for lectura in lecturas:
+        primeras.append(lectura)
+        if intervalo_min or len(primeras) == 2:
+            break
+    if not primeras:
+        raise ValueError("El archivo no tiene lecturas.")
+    inicio = primeras[0][1]
+    if not intervalo_min:
+        if len(primeras) < 2:
+            raise ValueError("Se necesitan al menos dos lecturas para deducir el intervalo.")
+        intervalo_min = int((primeras[1][1] - inicio).total_seconds() // 60)
+    if intervalo_min <= 0 or MINUTOS_DIA % intervalo_min:
+        raise ValueError("El intervalo debe ser un divisor de 24 horas (en minutos).")
+    if inicio.second or inicio.microsecond or (inicio.hour * 60 + inicio.minute) % intervalo_min:
+        raise ValueError("La primera lectura no está alineada con el intervalo.")
+
+    temporal = f"{ruta}.tmp"
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    try:
+        _escribir_serie(temporal, inicio, intervalo_min, chain(primeras, lecturas), resultado)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    os.replace(temporal, ruta)
+    return resultado
+
+
+def _escribir_serie(ruta: str, inicio: datetime, intervalo_min: int, lecturas, resultado: ResultadoSerie):
+    paso = intervalo_min * 60
+    with open(ruta, 'wb') as f:
+        f.write(bytes(_cabecera.size))
+        bloque = array('d')
+        escritas = 0
+        for numero, fecha, kwh in lecturas:
+            indice, resto = divmod(int((fecha - inicio).total_seconds()), paso)
+            if resto or indice < escritas:
+                resultado.agregar_error(numero, "Lectura repetida, desordenada o fuera del intervalo.")
+                continue
+            if indice >= MAX_LECTURAS:
+                raise ValueError(f"La serie supera el máximo de {MAX_LECTURAS} lecturas.")
+            if indice > escritas:
+                resultado.huecos += indice - escritas
+                bloque.frombytes(bytes(8 * (indice - escritas)))
+            bloque.append(kwh)
+            escritas = indice + 1
+            if len(bloque) >= TAMANO_BLOQUE:
+                bloque.tofile(f)
+                bloque = array('d')
+        bloque.tofile(f)
+
+        f.seek(0)
+        f.write(_cabecera.pack(MAGIC, VERSION_SERIE, intervalo_min, int((inicio - EPOCA).total_seconds()), escritas))
+        f.flush()
+        os.fsync(f.fileno())
+    resultado.lecturas = escritas - resultado.huecos
+
+
+#-----------------------
+# ACUMULADOS
+#-----------------------
+
+def consumo_diario(serie: SerieEnergia) -> Iterator[Tuple[date, float]]:
+    """kWh de cada día cubierto por la serie (el primero y el último pueden ser parciales)."""
+    dia = serie.inicio.date()
+    i, fin = 0, serie.por_dia - serie.franja_inicial
+    while i < serie.n:
+        j = min(fin, serie.n)
+        yield dia, sum(serie.kwh[i:j])
+        i, fin, dia = j, fin + serie.por_dia, dia + timedelta(days=1)
+
+
+def acumulados(serie: SerieEnergia, con_diario: bool = False) -> Dict:
+    """kWh por mes y por año (y por día si se pide)."""
+    diario, mensual, anual = [], {}, {}
+    for dia, kwh in consumo_diario(serie):
+        if con_diario:
+            diario.append({'fecha': dia.isoformat(), 'kwh': kwh})
+        mes = f"{dia.year}-{dia.month:02d}"
+        mensual[mes] = mensual.get(mes, 0.0) + kwh
+        anual[dia.year] = anual.get(dia.year, 0.0) + kwh
+    resultado = {
+        'mensual': [{'mes': m, 'kwh': v} for m, v in mensual.items()],
+        'anual': [{'anio': a, 'kwh': v} for a, v in anual.items()],
+    }
+    if con_diario:
+        resultado['diario'] = diario
+    return resultado
+
+
+def consumo_semanal(serie: SerieEnergia) -> List[float]:
+    """kWh de toda la serie por franja de la semana: índice = día_semana * por_dia + franja."""
+    total = 7 * serie.por_dia
+    base = serie.inicio.weekday() * serie.por_dia + serie.franja_inicial
+    return [sum(serie.kwh[(q - base) % total::total]) for q in range(total)]
+
+
+#-----------------------
+# TARIFAS
+#-----------------------
+
+def validar_tarifa(datos: DatosEnergia):
+    """Lanza ValueError si la tarifa no es válida."""
+    if datos.tarifa not in TARIFAS:
+        raise ValueError(f"Tarifa desconocida: {datos.tarifa}")
+    if datos.precio_kwh < 0 or datos.cargo_fijo_mensual < 0:
+        raise ValueError("Los precios y cargos no pueden ser negativos.")
+    limites = [t.hasta_kwh for t in datos.tramos]
+    acotados = limites[:-1] if limites and limites[-1] == 0 else limites
+    if any(l <= 0 for l in acotados) or any(b <= a for a, b in zip(acotados, acotados[1:])):
+        raise ValueError("Los tramos deben tener límites crecientes (solo el último puede ser 0 = sin límite).")
+    for periodo in datos.periodos:
+        if periodo.dias not in DIAS_TARIFA:
+            raise ValueError(f"Días de periodo desconocidos: {periodo.dias}")
+        if not 0 <= periodo.hora_desde < periodo.hora_hasta <= 24:
+            raise ValueError("Cada periodo debe cumplir 0 <= hora_desde < hora_hasta <= 24.")
+    if datos.tarifa == 'escalonada' and not datos.tramos:
+        raise ValueError("La tarifa escalonada requiere al menos un tramo.")
+    if datos.tarifa == 'horaria' and not datos.periodos:
+        raise ValueError("La tarifa horaria requiere al menos un periodo.")
+
+
+def costo_tramos(kwh: float, datos: DatosEnergia) -> float:
+    """Costo de un mes con tarifa escalonada; lo que exceda el último tramo usa precio_kwh."""
+    costo, anterior = 0.0, 0.0
+    for tramo in datos.tramos:
+        limite = tramo.hasta_kwh if tramo.hasta_kwh > 0 else float('inf')
+        if kwh <= anterior:
+            break
+        costo += (min(kwh, limite) - anterior) * tramo.precio
+        anterior = limite
+    if kwh > anterior:
+        costo += (kwh - anterior) * datos.precio_kwh
+    return costo
+
+
+def precios_semanales(datos: DatosEnergia, intervalo_min: int) -> List[float]:
+    """Precio por kWh de cada franja de la semana (el primer periodo que coincide; si no, precio_kwh)."""
+    por_dia = MINUTOS_DIA // intervalo_min
+    precios = []
+    for dia_semana in range(7):
+        laborable = dia_semana < 5
+        for franja in range(por_dia):
+            hora = franja * intervalo_min / 60
+            precio = datos.precio_kwh
+            for periodo in datos.periodos:
+                if periodo.dias == 'laborables' and not laborable:
+                    continue
+                if periodo.dias == 'fin_de_semana' and laborable:
+                    continue
+                if periodo.hora_desde <= hora < periodo.hora_hasta:
+                    precio = periodo.precio
+                    break
+            precios.append(precio)
+    return precios
+
+
+def costo_serie(serie: SerieEnergia, datos: DatosEnergia, mensual: Optional[List[Dict]] = None) -> Dict:
+    """Consumo y costo de toda la serie y su equivalente anual (más el cargo fijo mensual)."""
+    kwh_total = sum(serie.kwh)
+    if datos.tarifa == 'escalonada':
+        mensual = mensual if mensual is not None else acumulados(serie)['mensual']
+        costo_energia = sum(costo_tramos(m['kwh'], datos) for m in mensual)
+    elif datos.tarifa == 'horaria':
+        costo_energia = sum(e * p for e, p in zip(consumo_semanal(serie), precios_semanales(datos, serie.intervalo_min)))
+    else:
+        costo_energia = kwh_total * datos.precio_kwh
+
+    dias = serie.dias
+    anualizar = 365 / dias if dias else 0.0
+    return {
+        'dias': dias,
+        'kwh_total': kwh_total,
+        'kwh_anual': kwh_total * anualizar,
+        'costo_energia': costo_energia,
+        'costo_anual': costo_energia * anualizar + datos.cargo_fijo_mensual * 12,
+    }
+
+
+def actualizar_resumen(caso: Caso, con_diario: bool = False) -> Optional[Dict]:
+    """
+    Recalcula el resumen de caso.energia a partir de su archivo de lecturas.
+    Devuelve los acumulados y el costo, o None si el caso no tiene lecturas.
+    """
+    datos = caso.energia
+    ruta = ruta_serie(caso)
+    if not caso.filename or not os.path.exists(ruta):
+        datos.lecturas, datos.intervalo_min, datos.inicio = 0, 0, ""
+        datos.kwh_total = datos.kwh_anual = datos.costo_anual = 0.0
+        return None
+    with SerieEnergia(ruta) as serie:
+        rollups = acumulados(serie, con_diario)
+        costo = costo_serie(serie, datos, rollups['mensual'])
+        datos.lecturas, datos.intervalo_min, datos.inicio = serie.n, serie.intervalo_min, serie.inicio.isoformat()
+    datos.kwh_total, datos.kwh_anual, datos.costo_anual = costo['kwh_total'], costo['kwh_anual'], costo['costo_anual']
+    return {**rollups, **costo}
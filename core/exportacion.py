@@ -0,0 +1,257 @@
+"""
+Exportación del reporte completo de un caso en CSV o HTML independiente.
+
+El reporte es una secuencia de secciones (título, cabecera, filas) producidas por
+generadores: cada tabla se recorre fila a fila y los escritores agrupan el texto en
+bloques de ~64 KB que se entregan en cuanto están listos. Así el documento nunca se
+arma completo en memoria y la respuesta empieza a llegar de inmediato.
+"""
+from html import escape
+from typing import Iterable, Iterator, List, NamedTuple, Sequence
+import csv
+import io
+
+from .models import Caso
+from .calculations import (
+    inversion_total_activos, inversion_total_diferida,
+    inversion_total_capital_trabajo, inversion_total_general
+)
+from .amortizacion import monto_prestamo, tabla_amortizacion_caso
+from .depreciacion import ANIOS_MATRIZ, matriz_depreciacion, matriz_amortizacion_diferida
+from .flujo import CONCEPTOS_FLUJO, evaluar_escenarios
+from .payback import evaluar_payback
+from .wacc import matriz_roe
+
+TAMANO_BLOQUE = 64 * 1024
+
+FORMATO_CSV = "csv"
+FORMATO_HTML = "html"
+FORMATOS_EXPORTACION = {
+    FORMATO_CSV: ("text/csv; charset=utf-8", ".csv"),
+    FORMATO_HTML: ("text/html; charset=utf-8", ".html"),
+}
+
+
+class Seccion(NamedTuple):
+    titulo: str
+    cabecera: Sequence[str]
+    filas: Iterable[Sequence]
+
+
+#-----------------------
+# SECCIONES DEL REPORTE
+#-----------------------
+
+def cuadro_resumen(caso: Caso) -> List[Sequence]:
+    """Indicadores principales: inversión, financiamiento y VAN/TIR/payback por escenario."""
+    total = inversion_total_general(caso.inversion)
+    filas = [
+        ("Inversión en activos fijos", inversion_total_activos(caso.inversion)),
+        ("Inversión diferida", inversion_total_diferida(caso.inversion)),
+        ("Capital de trabajo", inversion_total_capital_trabajo(caso.inversion)),
+        ("Inversión total", total),
+        (f"Financiamiento propio ({caso.financiamiento.porcentaje_propio:g}%)",
+         total * caso.financiamiento.porcentaje_propio / 100),
+        (f"Financiamiento externo ({caso.financiamiento.porcentaje_externo:g}%)", monto_prestamo(caso)),
+        ("Rol de pagos (total proyectado)", caso.rol_pagos.gran_total_general),
+    ]
+    evaluacion = evaluar_escenarios(caso)
+    paybacks = evaluar_payback(caso, evaluacion)['escenarios']
+    for escenario, payback in zip(evaluacion['escenarios'], paybacks):
+        nombre = escenario['nombre']
+        filas += [
+            (f"VAN {nombre} ({evaluacion['tasa_descuento']:g}%)", escenario['van']),
+            (f"TIR {nombre} (%)", escenario['tir']),
+            (f"PayBack {nombre} (años)", payback['payback']),
+            (f"PayBack descontado {nombre} (años)", payback['payback_descontado']),
+        ]
+    return filas
+
+
+def _items(items, campos: Sequence[str]) -> Iterator[Sequence]:
+    for item in items:
+        yield [getattr(item, c) for c in campos]
+
+
+def _amortizacion(caso: Caso) -> Iterator[Sequence]:
+    tabla = tabla_amortizacion_caso(caso)
+    yield from zip(tabla['mes'], tabla['capital'], tabla['interes'], tabla['amortizacion'],
+                   tabla['pago'], tabla['deuda_final'])
+
+
+def _matriz(matriz, items, columnas: Sequence[str]) -> Iterator[Sequence]:
+    for item, fila in zip(items, matriz.filas):
+        yield [item.descripcion] + [fila[c] for c in columnas] + fila['anios']
+    yield ["TOTAL"] + [""] * (len(columnas) - 1) + [matriz.total_valor_dep] + matriz.totales
+
+
+def _rol_anio(caso: Caso, anio: int) -> Iterator[Sequence]:
+    # Se proyecta cada cargo al vuelo, sin llenar la caché de años del Rol de Pagos
+    rol = caso.rol_pagos
+    for cargo in rol.cargos:
+        item = rol.proyectar_cargo(cargo, anio)
+        yield [item.cargo, item.sueldo_nominal, item.dias_trabajados, item.sueldo, item.remuneracion,
+               item.decimo_tercer_sueldo, item.decimo_cuarto_sueldo, item.total_ingresos, item.ap_personal,
+               item.l_recibir, item.ap_patronal, item.vacaciones, item.pago_empleador]
+    total = rol.totales_anuales[anio] if anio < len(rol.totales_anuales) else 0.0
+    yield ["TOTAL AÑO"] + [""] * 11 + [total]
+
+
+def _wacc(tabla, num_cols: int) -> Iterator[Sequence]:
+    for item in tabla:
+        valores = list(item.valores_anuales[:num_cols])
+        yield [item.nombre] + valores + [0.0] * (num_cols - len(valores))
+
+
+def _roe(caso: Caso) -> Iterator[Sequence]:
+    matriz = matriz_roe(caso)
+    for item, fila in zip(caso.wacc.tabla_utilidad, matriz.roe):
+        yield [item.nombre] + fila
+    yield ["PROMEDIO"] + matriz.promedios
+    yield ["PROMEDIO FINAL", matriz.promedio_final]
+
+
+def secciones(caso: Caso) -> Iterator[Seccion]:
+    """Secciones del reporte en orden; las filas de cada una se generan al recorrerlas."""
+    inversion = caso.inversion
+    n = caso.proyeccion.num_proyeccion
+    anios_dep = [f"Año {k}" for k in range(1, ANIOS_MATRIZ + 1)]
+
+    yield Seccion("Datos generales", ("Campo", "Valor"), [
+        ("Nombre", caso.nombre), ("Archivo", caso.filename), ("Fecha de creación", caso.fecha_creacion),
+        ("Años de proyección", n),
+    ])
+    yield Seccion("Cuadro resumen", ("Indicador", "Valor"), cuadro_resumen(caso))
+    yield Seccion("Proyección de la demanda", ("Año", "Demanda"),
+                  enumerate(caso.proyeccion.resultados_proyeccion, start=1))
+
+    campos = ('descripcion', 'medidas', 'valor_unitario', 'cantidad', 'valor_total', 'dep_tipo', 'comentario')
+    yield Seccion("Anexo 1: Maquinarias y equipos", campos, _items(inversion.activos_fijos, campos))
+    campos = ('descripcion', 'valor_unitario', 'cantidad', 'total', 'amort_anios', 'comentario')
+    yield Seccion("Anexo 2: Inversión diferida", campos, _items(inversion.inversion_diferida, campos))
+    campos = ('descripcion', 'valor_unitario', 'cantidad', 'total')
+    yield Seccion("Anexo 3: Capital de trabajo", campos, _items(inversion.capital_trabajo_items, campos))
+    campos = ('consumo_kwh', 'costo_usd')
+    yield Seccion("Anexo 4: Consumo eléctrico mensual", campos, _items(inversion.consumos_mensuales, campos))
+    campos = ('consumo_diario', 'anual', 'costo_kwh', 'total')
+    yield Seccion("Anexo 5: Consumo eléctrico diario", campos, _items(inversion.consumos_diarios, campos))
+
+    yield Seccion(
+        f"Tabla de amortización del préstamo ({caso.amortizacion.anios} años, {caso.amortizacion.metodo})",
+        ("Mes", "Capital", "Interés", "Amortización", "Pago", "Deuda final"), _amortizacion(caso)
+    )
+    yield Seccion(
+        "Depreciación de activos fijos",
+        ["Activo", "Valor residual", "Base depreciable", "% anual", "Años", "Depreciación año 1"] + anios_dep,
+        _matriz(matriz_depreciacion(caso), inversion.activos_fijos,
+                ('valor_residual', 'base_depreciable', 'pct_dep', 'anos_dep', 'valor_dep'))
+    )
+    yield Seccion(
+        "Amortización de la inversión diferida",
+        ["Ítem", "Años", "% anual", "Amortización año 1"] + anios_dep,
+        _matriz(matriz_amortizacion_diferida(caso), inversion.inversion_diferida, ('anos', 'pct', 'valor_dep'))
+    )
+
+    cabecera_rol = ("Cargo", "Sueldo nominal", "Días trabajados", "Sueldo", "Remuneración", "Décimo tercer",
+                    "Décimo cuarto", "Total ingresos", "AP. Personal", "L. Recibir", "AP. Patronal",
+                    "Vacaciones", "Pago empleador (mes)")
+    for anio in range(len(caso.rol_pagos.proyeccion_anual)):
+        yield Seccion(f"Rol de pagos - Año {anio + 1}", cabecera_rol, _rol_anio(caso, anio))
+
+    anios_wacc = [f"Año {k}" for k in range(1, n + 1)]
+    yield Seccion("WACC - Utilidad", ["Empresa"] + anios_wacc, _wacc(caso.wacc.tabla_utilidad, n))
+    yield Seccion("WACC - Patrimonio", ["Empresa"] + anios_wacc, _wacc(caso.wacc.tabla_patrimonio, n))
+    yield Seccion("WACC - ROE", ["Empresa"] + anios_wacc, _roe(caso))
+
+    evaluacion = evaluar_escenarios(caso)
+    cabecera_flujo = ["Concepto"] + [f"Año {a}" for a in evaluacion['anios']]
+    for escenario in evaluacion['escenarios']:
+        columnas = escenario['columnas']
+        yield Seccion(
+            f"Flujo de caja {escenario['nombre']}", cabecera_flujo,
+            ([etiqueta] + ([] if clave == 'flujo' else [""]) + columnas[clave] for clave, etiqueta in CONCEPTOS_FLUJO)
+        )
+
+
+#-----------------------
+# ESCRITORES EN FLUJO
+#-----------------------
+
+def _agrupar(partes: Iterable[str], tamano: int = TAMANO_BLOQUE) -> Iterator[str]:
+    """Junta fragmentos pequeños en bloques de ~tamano caracteres."""
+    bloque, largo = [], 0
+    for parte in partes:
+        bloque.append(parte)
+        largo += len(parte)
+        if largo >= tamano:
+            yield ''.join(bloque)
+            bloque, largo = [], 0
+    if bloque:
+        yield ''.join(bloque)
+
+
+def _filas_csv(caso: Caso) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    def linea(fila) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerow(fila)
+        return buffer.getvalue()
+
+    yield '\ufeff' # BOM para que Excel detecte UTF-8
+    for seccion in secciones(caso):
+        yield linea([seccion.titulo])
+        yield linea(seccion.cabecera)
+        for fila in seccion.filas:
+            yield linea(fila)
+        yield linea([])
+
+
+def exportar_csv(caso: Caso) -> Iterator[str]:
+    """Reporte completo en CSV (una tabla por sección separadas por una línea vacía)."""
+    return _agrupar(_filas_csv(caso))
+
+
+def _celda_html(valor) -> str:
+    if isinstance(valor, float):
+        return f'<td class="num">{valor:,.2f}</td>'
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return f'<td class="num">{valor}</td>'
+    return f'<td>{escape("" if valor is None else str(valor))}</td>'
+
+
+ESTILO_HTML = """
+body { font-family: Arial, sans-serif; margin: 20px; color: #333; }
+h1 { margin-bottom: 0; }
+h2 { margin-top: 30px; font-size: 1.1em; }
+table { border-collapse: collapse; margin-bottom: 10px; font-size: 0.85em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; }
+th { background: #e9ecef; }
+td.num { text-align: right; }
+"""
+
+
+def _filas_html(caso: Caso) -> Iterator[str]:
+    yield (
+        '<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="UTF-8">\n'
+        f'<title>Reporte {escape(caso.nombre)} | mercuriOS</title>\n<style>{ESTILO_HTML}</style>\n</head>\n<body>\n'
+        f'<h1>{escape(caso.nombre)}</h1>\n'
+    )
+    for seccion in secciones(caso):
+        yield f'<h2>{escape(seccion.titulo)}</h2>\n<table>\n<thead><tr>'
+        yield ''.join(f'<th>{escape(str(c))}</th>' for c in seccion.cabecera)
+        yield '</tr></thead>\n<tbody>\n'
+        for fila in seccion.filas:
+            yield '<tr>' + ''.join(_celda_html(v) for v in fila) + '</tr>\n'
+        yield '</tbody>\n</table>\n'
+    yield '</body>\n</html>\n'
+
+
+def exportar_html(caso: Caso) -> Iterator[str]:
+    """Reporte completo como página HTML independiente (estilos en línea, sin recursos externos)."""
+    return _agrupar(_filas_html(caso))
+
+
+EXPORTADORES = {FORMATO_CSV: exportar_csv, FORMATO_HTML: exportar_html}
@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional, Sequence
+from .models import Caso, Escenario
+from .calculations import inversion_total_general, inversion_total_capital_trabajo
+from .amortizacion import monto_prestamo, totales_anuales_amortizacion
+from .depreciacion import matriz_depreciacion, matriz_amortizacion_diferida
+
+#-----------------------
+# FLUJO DE CAJA POR ESCENARIOS
+#-----------------------
+# Todas las columnas son matrices escenario × año (listas de filas). Las partes que no
+# dependen del escenario (depreciación, préstamo, Rol de Pagos) se calculan una sola vez
+# y cada escenario solo aplica sus factores sobre esos vectores.
+
+TIR_MIN = -0.99
+TIR_MAX = 10.0 # 1000 % anual
+TIR_TOLERANCIA = 1e-10
+TIR_MAX_ITERACIONES = 200
+
+# Conceptos del estado de flujo en el orden en que se muestran
+CONCEPTOS_FLUJO = (
+    ('ingresos', 'Ingresos'),
+    ('costos_variables', 'Costos variables'),
+    ('costo_personal', 'Rol de pagos'),
+    ('gastos_fijos', 'Gastos fijos'),
+    ('depreciacion', 'Depreciación'),
+    ('amortizacion_diferida', 'Amortización intangibles'),
+    ('intereses', 'Intereses del préstamo'),
+    ('utilidad_antes_participacion', 'Utilidad antes de participación'),
+    ('participacion', 'Participación trabajadores'),
+    ('utilidad_antes_impuestos', 'Utilidad antes de impuestos'),
+    ('impuesto', 'Impuesto a la renta'),
+    ('utilidad_neta', 'Utilidad neta'),
+    ('amortizacion_prestamo', 'Amortización del préstamo'),
+    ('recuperacion_capital', 'Recuperación capital de trabajo'),
+    ('flujo', 'Flujo neto'),
+)
+
+
+def _ajustar(valores: Sequence[float], n: int) -> List[float]:
+    """Recorta o completa con ceros hasta n años."""
+    return list(valores[:n]) + [0.0] * (n - len(valores[:n]))
+
+
+def bases_flujo(caso: Caso) -> Dict:
+    """Vectores anuales (años 1..N) que no dependen del escenario."""
+    n = caso.proyeccion.num_proyeccion
+    prestamo = totales_anuales_amortizacion(caso)
+    capital_trabajo = inversion_total_capital_trabajo(caso.inversion)
+    return {
+        'anios': n,
+        'demanda': _ajustar([float(d) for d in caso.proyeccion.resultados_proyeccion], n),
+        'costo_personal': _ajustar(caso.rol_pagos.totales_anuales, n),
+        'depreciacion': _ajustar(matriz_depreciacion(caso).totales, n),
+        'amortizacion_diferida': _ajustar(matriz_amortizacion_diferida(caso).totales, n),
+        'intereses': _ajustar(prestamo['interes'], n),
+        'amortizacion_prestamo': _ajustar(prestamo['amortizacion'], n),
+        'recuperacion_capital': [0.0] * (n - 1) + [capital_trabajo] if n else [],
+        'inversion': inversion_total_general(caso.inversion),
+        'prestamo': monto_prestamo(caso),
+    }
+
+
+def calcular_flujos(caso: Caso, escenarios: Optional[Sequence[Escenario]] = None) -> Dict[str, List[List[float]]]:
+    """
+    Estado de flujo de todos los escenarios a la vez: {concepto: matriz escenario × año}.
+    La columna 'flujo' incluye el año 0 (aporte propio: inversión menos préstamo).
+    """
+    datos = caso.flujo
+    escenarios = datos.escenarios if escenarios is None else escenarios
+    base = bases_flujo(caso)
+    demanda = base['demanda']
+    pct_part = datos.participacion_trabajadores / 100
+    pct_imp = datos.impuesto_renta / 100
+
+    def por_escenario(vector, factor):
+        return [[v * factor(e) for v in vector] for e in escenarios]
+
+    def repetido(vector):
+        return [list(vector) for _ in escenarios]
+
+    def menos(a, *restas):
+        return [[x - sum(r[k][j] for r in restas) for j, x in enumerate(fila)] for k, fila in enumerate(a)]
+
+    ingresos = por_escenario(demanda, lambda e: datos.precio_unitario * e.factor_demanda * e.factor_precio)
+    costos_variables = por_escenario(demanda, lambda e: datos.costo_unitario * e.factor_demanda * e.factor_costos)
+    costo_personal = por_escenario(base['costo_personal'], lambda e: e.factor_costos)
+    gastos_fijos = por_escenario([datos.gastos_fijos_anuales] * base['anios'], lambda e: e.factor_costos)
+    depreciacion = repetido(base['depreciacion'])
+    amortizacion_diferida = repetido(base['amortizacion_diferida'])
+    intereses = repetido(base['intereses'])
+
+    uap = menos(ingresos, costos_variables, costo_personal, gastos_fijos, depreciacion, amortizacion_diferida, intereses)
+    participacion = [[max(u, 0.0) * pct_part for u in fila] for fila in uap]
+    uai = menos(uap, participacion)
+    impuesto = [[max(u, 0.0) * pct_imp for u in fila] for fila in uai]
+    utilidad_neta = menos(uai, impuesto)
+
+    amortizacion_prestamo = repetido(base['amortizacion_prestamo'])
+    recuperacion = repetido(base['recuperacion_capital'])
+    anio_cero = base['prestamo'] - base['inversion']
+    flujo = [
+        [anio_cero] + [
+            un + dep + amd - amp + rec
+            for un, dep, amd, amp, rec in zip(utilidad_neta[k], depreciacion[k], amortizacion_diferida[k],
+                                              amortizacion_prestamo[k], recuperacion[k])
+        ]
+        for k in range(len(escenarios))
+    ]
+
+    return {
+        'ingresos': ingresos,
+        'costos_variables': costos_variables,
+        'costo_personal': costo_personal,
+        'gastos_fijos': gastos_fijos,
+        'depreciacion': depreciacion,
+        'amortizacion_diferida': amortizacion_diferida,
+        'intereses': intereses,
+        'utilidad_antes_participacion': uap,
+        'participacion': participacion,
+        'utilidad_antes_impuestos': uai,
+        'impuesto': impuesto,
+        'utilidad_neta': utilidad_neta,
+        'amortizacion_prestamo': amortizacion_prestamo,
+        'recuperacion_capital': recuperacion,
+        'flujo': flujo,
+    }
+
+
+#-----------------------
+# VAN Y TIR POR LOTES
+#-----------------------
+
+def van_lote(flujos: Sequence[Sequence[float]], tasa: float) -> List[float]:
+    """VAN de varios flujos (año 0 sin descontar) con una misma tasa en %; los factores se calculan una vez."""
+    n = max((len(f) for f in flujos), default=0)
+    factores = [(1 + tasa / 100) ** -t for t in range(n)]
+    return [sum((v * d for v, d in zip(f, factores)), 0.0) for f in flujos]
+
+
+def _van_tasas(flujos: Sequence[Sequence[float]], tasas: Sequence[float]) -> List[float]:
+    """VAN de cada flujo con su propia tasa (fracción)."""
+    resultado = []
+    for f, r in zip(flujos, tasas):
+        factor, total = 1.0, 0.0
+        for v in f:
+            total += v * factor
+            factor /= (1 + r)
+        resultado.append(total)
+    return resultado
+
+
+def tir_lote(flujos: Sequence[Sequence[float]]) -> List[Optional[float]]:
+    """
+    TIR (en %) de varios flujos con bisección simultánea: cada iteración evalúa todos los
+    escenarios a la vez. Devuelve None si el VAN no cambia de signo en [TIR_MIN, TIR_MAX].
+    """
+    k = len(flujos)
+    bajo, alto = [TIR_MIN] * k, [TIR_MAX] * k
+    van_bajo = _van_tasas(flujos, bajo)
+    van_alto = _van_tasas(flujos, alto)
+    activos = [vb * va < 0 for vb, va in zip(van_bajo, van_alto)]
+    resultado: List[Optional[float]] = [None] * k
+    for i, (vb, va) in enumerate(zip(van_bajo, van_alto)):
+        if not any(flujos[i]):
+            activos[i] = False # Flujo nulo: la TIR no está definida
+        elif vb == 0:
+            resultado[i], activos[i] = bajo[i] * 100, False
+        elif va == 0:
+            resultado[i], activos[i] = alto[i] * 100, False
+
+    for _ in range(TIR_MAX_ITERACIONES):
+        pendientes = [i for i in range(k) if activos[i]]
+        if not pendientes:
+            break
+        medios = [(bajo[i] + alto[i]) / 2 for i in pendientes]
+        van_medio = _van_tasas([flujos[i] for i in pendientes], medios)
+        for i, medio, vm in zip(pendientes, medios, van_medio):
+            if vm * van_bajo[i] > 0:
+                bajo[i], van_bajo[i] = medio, vm
+            else:
+                alto[i] = medio
+            if alto[i] - bajo[i] < TIR_TOLERANCIA or vm == 0:
+                resultado[i], activos[i] = medio * 100, False
+    return resultado
+
+
+def evaluar_escenarios(caso: Caso) -> Dict:
+    """Flujos, VAN y TIR de todos los escenarios del caso."""
+    escenarios = caso.flujo.escenarios
+    columnas = calcular_flujos(caso, escenarios)
+    van = van_lote(columnas['flujo'], caso.flujo.tasa_descuento)
+    tir = tir_lote(columnas['flujo'])
+    return {
+        'anios': list(range(caso.proyeccion.num_proyeccion + 1)),
+        'tasa_descuento': caso.flujo.tasa_descuento,
+        'escenarios': [
+            {
+                'nombre': e.nombre,
+                'columnas': {concepto: matriz[k] for concepto, matriz in columnas.items()},
+                'van': van[k],
+                'tir': tir[k],
+            }
+            for k, e in enumerate(escenarios)
+        ],
+    }
+
+
+def flujo_escenario(caso: Caso, nombre: str) -> Optional[Dict]:
+    """Resultado de un escenario por nombre (para las pestañas Flujo Real/Pesimista/Optimista)."""
+    resultado = evaluar_escenarios(caso)
+    for escenario in resultado['escenarios']:
+        if escenario['nombre'].lower() == nombre.lower():
+            return {'anios': resultado['anios'], 'tasa_descuento': resultado['tasa_descuento'], **escenario}
+    return None
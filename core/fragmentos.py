@@ -0,0 +1,72 @@
+"""
+Caché de pestañas renderizadas y validadores HTTP (ETag / Last-Modified).
+
+Cada Caso tiene una revisión que aumenta con cada cambio registrado; el HTML de una
+pestaña solo depende del caso y de la pestaña, así que se guarda con la clave
+(instancia del caso, revisión, pestaña, sub-pestaña). Las entradas de revisiones
+anteriores dejan de usarse y salen por LRU.
+"""
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+import hashlib
+import threading
+
+from .models import Caso
+
+MAX_ENTRADAS = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def clave_pestana(caso: Caso, tab: str, sub_tab: Optional[str]) -> Tuple:
+    return (caso._instancia, caso.revision, tab, sub_tab or '')
+
+
+def etag_pestana(caso: Caso, tab: str, sub_tab: Optional[str]) -> str:
+    """ETag de la pestaña: cambia con la revisión del caso o al recargarlo desde disco."""
+    clave = '|'.join(str(v) for v in clave_pestana(caso, tab, sub_tab))
+    return hashlib.sha1(clave.encode('utf-8')).hexdigest()
+
+
+class CacheFragmentos:
+    """LRU de fragmentos HTML limitado por número de entradas y por tamaño total."""
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS, max_bytes: int = MAX_BYTES):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: Hashable, renderizar: Callable[[], str]) -> str:
+        """Devuelve el fragmento de la caché o lo renderiza y lo guarda."""
+        with self._lock:
+            fragmento = self._entradas.get(clave)
+            if fragmento is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return fragmento
+            self.fallos += 1
+
+        fragmento = renderizar()
+        if self.max_entradas <= 0 or len(fragmento) > self.max_bytes:
+            return fragmento
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._entradas[clave] = fragmento
+            self._bytes += len(fragmento)
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, viejo = self._entradas.popitem(last=False)
+                self._bytes -= len(viejo)
+        return fragmento
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+
+fragmentos = CacheFragmentos()
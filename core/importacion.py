@@ -0,0 +1,231 @@
+"""
+Importación masiva de ítems de inversión, capital de trabajo, consumo energético y cargos del Rol de Pagos.
+
+Acepta CSV (con cabecera) o JSON (arreglo de objetos o un objeto por línea) y lo lee
+como flujo: cada fila se valida y se calcula al vuelo, y el lote completo se añade al
+caso en una sola operación. Los errores se informan por número de fila.
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, get_type_hints
+import codecs
+import csv
+import json
+import math
+
+from .models import (
+    ActivoFijo, InversionDiferidaItem, CapitalTrabajoItem,
+    RegistroConsumoMensual, RegistroConsumoDiario, ItemRolPagos
+)
+from .depreciacion import CONFIG_DEP, METODOS_DEPRECIACION
+
+TAMANO_BLOQUE = 64 * 1024
+MAX_ERRORES_REPORTADOS = 100
+
+
+#-----------------------
+# CÁLCULO POR TIPO DE ÍTEM
+#-----------------------
+
+def _calcular_consumo_mensual(registro: RegistroConsumoMensual):
+    registro.costo_usd = registro.consumo_kwh * 100
+
+
+def _calcular_consumo_diario(registro: RegistroConsumoDiario):
+    registro.anual = registro.consumo_diario * 365
+    registro.total = registro.anual * registro.costo_kwh
+
+
+@dataclass
+class TipoImportacion:
+    clase: type
+    tabla: str # Atributo de DatosInversion que recibe los ítems
+    campos: Tuple[str, ...] # Campos de entrada aceptados
+    calcular: Callable
+    campo_total: str
+    requiere_descripcion: bool = True
+    campo_descripcion: str = 'descripcion'
+    opciones: Dict[str, Tuple[str, ...]] = field(default_factory=dict) # Valores permitidos por campo (vacío = por defecto)
+
+
+TIPOS_IMPORTACION: Dict[str, TipoImportacion] = {
+    'activos': TipoImportacion(
+        ActivoFijo, 'activos_fijos',
+        ('descripcion', 'medidas', 'valor_unitario', 'cantidad', 'comentario',
+         'dep_tipo', 'dep_porcentaje_residual', 'dep_monto_valor_residual_pct', 'dep_metodo'),
+        ActivoFijo.calcular_total, 'valor_total',
+        opciones={'dep_tipo': tuple(CONFIG_DEP), 'dep_metodo': METODOS_DEPRECIACION}
+    ),
+    'diferida': TipoImportacion(
+        InversionDiferidaItem, 'inversion_diferida',
+        ('descripcion', 'valor_unitario', 'cantidad', 'comentario', 'amort_anios'),
+        InversionDiferidaItem.calcular_total, 'total'
+    ),
+    'capital': TipoImportacion(
+        CapitalTrabajoItem, 'capital_trabajo_items',
+        ('descripcion', 'valor_unitario', 'cantidad'),
+        CapitalTrabajoItem.calcular_total, 'total'
+    ),
+    'consumo-mensual': TipoImportacion(
+        RegistroConsumoMensual, 'consumos_mensuales', ('consumo_kwh',),
+        _calcular_consumo_mensual, 'costo_usd', requiere_descripcion=False
+    ),
+    'consumo-diario': TipoImportacion(
+        RegistroConsumoDiario, 'consumos_diarios', ('consumo_diario', 'costo_kwh'),
+        _calcular_consumo_diario, 'total', requiere_descripcion=False
+    ),
+}
+
+
+# Plantilla de personal (Rol de Pagos): los cargos van a DatosRolPagos.cargos, no a la inversión
+IMPORTACION_CARGOS = TipoImportacion(
+    ItemRolPagos, 'cargos',
+    ('cargo', 'sueldo_nominal', 'dias_trabajados', 'no_he', 'no_hs', 'no_jn',
+     'comisiones', 'anticipos', 'descuentos', 'quincenas'),
+    ItemRolPagos.calcular_rol, 'pago_empleador', campo_descripcion='cargo'
+)
+
+
+@dataclass
+class ResultadoImportacion:
+    items: List = field(default_factory=list)
+    errores: List[Dict] = field(default_factory=list)
+    num_errores: int = 0
+    total_lote: float = 0.0
+
+    def agregar_error(self, fila: int, mensaje: str):
+        self.num_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({'fila': fila, 'mensaje': mensaje})
+
+
+#-----------------------
+# LECTURA EN FLUJO
+#-----------------------
+
+def _texto(flujo, codificacion: str = 'utf-8-sig') -> Iterator[str]:
+    """Decodifica un flujo binario por bloques (tolera caracteres partidos entre bloques)."""
+    decodificador = codecs.getincrementaldecoder(codificacion)()
+    while True:
+        bloque = flujo.read(TAMANO_BLOQUE)
+        if not bloque:
+            break
+        yield decodificador.decode(bloque)
+    yield decodificador.decode(b'', final=True)
+
+
+def _lineas(flujo) -> Iterator[str]:
+    pendiente = ''
+    for texto in _texto(flujo):
+        pendiente += texto
+        *lineas, pendiente = pendiente.split('\n')
+        for linea in lineas:
+            yield linea + '\n'
+    if pendiente:
+        yield pendiente
+
+
+def leer_csv(flujo) -> Iterator[Dict]:
+    """Filas de un CSV con cabecera (separador ',' o ';', detectado en la cabecera)."""
+    lineas = _lineas(flujo)
+    cabecera = next(lineas, '')
+    separador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+
+    def todas():
+        yield cabecera
+        yield from lineas
+    for fila in csv.DictReader(todas(), delimiter=separador):
+        yield {(k or '').strip(): v for k, v in fila.items()}
+
+
+def leer_json(flujo) -> Iterator[Dict]:
+    """Objetos de un arreglo JSON o de JSON por líneas, sin cargar todo el documento."""
+    decodificador = json.JSONDecoder()
+    buffer = ''
+    for texto in _texto(flujo):
+        buffer += texto
+        pos = 0
+        while True:
+            # Saltar espacios y separadores del arreglo
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            try:
+                objeto, fin = decodificador.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break # Objeto incompleto: esperar el siguiente bloque
+            yield objeto
+            pos = fin
+        buffer = buffer[pos:]
+    if buffer.strip(' \t\r\n,[]'):
+        raise ValueError("JSON incompleto o mal formado al final del archivo.")
+
+
+#-----------------------
+# VALIDACIÓN DEL LOTE
+#-----------------------
+
+def _convertir(tipo, valor):
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if tipo is str:
+        return '' if valor is None else str(valor)
+    if valor is None or valor == '':
+        return None # Se usa el valor por defecto
+    if tipo is int:
+        numero = float(str(valor).replace(',', '.')) if isinstance(valor, str) else float(valor)
+        if not numero.is_integer():
+            raise ValueError(f"se esperaba un entero, se recibió {valor!r}")
+        return int(numero)
+    numero = float(str(valor).replace(',', '.')) if isinstance(valor, str) else float(valor)
+    if not math.isfinite(numero):
+        raise ValueError(f"se esperaba un número finito, se recibió {valor!r}")
+    return numero
+
+
+def importar_filas(tipo: TipoImportacion, filas: Iterable[Dict]) -> ResultadoImportacion:
+    """Valida y calcula cada fila; las filas con error se informan y no se importan."""
+    hints = get_type_hints(tipo.clase)
+    resultado = ResultadoImportacion()
+    for numero, fila in enumerate(filas, start=1):
+        if not isinstance(fila, dict):
+            resultado.agregar_error(numero, "La fila debe ser un objeto.")
+            continue
+        valores = {}
+        try:
+            for campo in tipo.campos:
+                if campo in fila:
+                    valor = _convertir(hints[campo], fila[campo])
+                    if campo in tipo.opciones:
+                        if valor == '':
+                            continue # Se usa el valor por defecto
+                        if valor not in tipo.opciones[campo]:
+                            raise ValueError(f"debe ser uno de {', '.join(tipo.opciones[campo])}, se recibió {valor!r}")
+                    if valor is not None:
+                        valores[campo] = valor
+        except (TypeError, ValueError) as e:
+            resultado.agregar_error(numero, f"Valor inválido en '{campo}': {e}")
+            continue
+        if tipo.requiere_descripcion and not valores.get(tipo.campo_descripcion):
+            resultado.agregar_error(numero, "Falta la descripción.")
+            continue
+
+        item = tipo.clase(**valores)
+        tipo.calcular(item)
+        resultado.items.append(item)
+        resultado.total_lote += getattr(item, tipo.campo_total)
+    return resultado
+
+
+def leer_lote(flujo, formato: str, tipo: TipoImportacion) -> ResultadoImportacion:
+    """Lee y valida un archivo completo ('csv' o 'json') del flujo."""
+    lector = leer_csv if formato == 'csv' else leer_json
+    return importar_filas(tipo, lector(flujo))
+
+
+def detectar_formato(content_type: Optional[str], nombre_archivo: Optional[str] = None) -> str:
+    if nombre_archivo and nombre_archivo.lower().endswith('.csv'):
+        return 'csv'
+    if content_type and 'csv' in content_type:
+        return 'csv'
+    return 'json'
@@ -0,0 +1,215 @@
+"""
+Instrumentación del servidor: histogramas de latencia por ruta y por tramo (span) con
+nombre, contadores, y registro de peticiones lentas con perfil cProfile opcional.
+
+    @medir('calculations.calcular_proyeccion')    # tramo alrededor de una función
+    with tramo('plantilla:nuevo_caso.html'): ...   # tramo alrededor de un bloque
+
+metricas.texto_prometheus() devuelve todo en el formato de texto de Prometheus (/metrics).
+Los valores son del proceso actual: con varios workers cada uno lleva sus propias métricas.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+# Límites (segundos) de los buckets de los histogramas
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICA_PETICIONES = 'mercurios_peticion_segundos'
+METRICA_TRAMOS = 'mercurios_tramo_segundos'
+
+DIRECTORIO_LOGS = os.path.join(os.path.dirname(__file__), '..', 'resources', 'logs')
+UMBRAL_LENTAS_MS = 1000
+
+
+class Histograma:
+    __slots__ = ('cuentas', 'suma', 'total')
+
+    def __init__(self, buckets: int):
+        self.cuentas = [0] * (buckets + 1) # El último bucket es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas: Tuple[Tuple[str, str], ...], le: Optional[str] = None) -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas]
+    if le is not None:
+        partes.append(f'le="{le}"')
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metricas:
+    """Registro de histogramas, contadores y medidores del proceso (seguro entre hilos)."""
+
+    def __init__(self, limites: Tuple[float, ...] = LIMITES_SEGUNDOS):
+        self.activo = True
+        self.limites = tuple(limites)
+        self._histogramas: Dict[str, Dict[Tuple, Histograma]] = {}
+        self._contadores: Dict[str, Dict[Tuple, float]] = {}
+        self._medidores: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+        self._ayudas: Dict[str, str] = {
+            METRICA_PETICIONES: 'Latencia de las peticiones por ruta y método',
+            METRICA_TRAMOS: 'Duración de los tramos instrumentados (cálculos, guardado, plantillas)',
+        }
+        self._lock = threading.Lock()
+
+    def describir(self, nombre: str, ayuda: str):
+        self._ayudas[nombre] = ayuda
+
+    def observar(self, nombre: str, segundos: float, **etiquetas):
+        if not self.activo:
+            return
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            series = self._histogramas.setdefault(nombre, {})
+            histograma = series.get(clave)
+            if histograma is None:
+                histograma = series[clave] = Histograma(len(self.limites))
+            histograma.cuentas[bisect_left(self.limites, segundos)] += 1
+            histograma.suma += segundos
+            histograma.total += 1
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas):
+        if not self.activo:
+            return
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            series = self._contadores.setdefault(nombre, {})
+            series[clave] = series.get(clave, 0) + valor
+
+    def agregar_medidor(self, nombre: str, ayuda: str, funcion: Callable[[], float], tipo: str = 'gauge'):
+        """Valor que se lee en el momento de exportar (p. ej. casos abiertos o un contador existente)."""
+        self._medidores[nombre] = (ayuda, tipo, funcion)
+
+    @contextmanager
+    def tramo(self, nombre: str):
+        if not self.activo:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(METRICA_TRAMOS, time.perf_counter() - inicio, tramo=nombre)
+
+    def medir(self, nombre: str):
+        """Decorador: registra la duración de cada llamada como el tramo `nombre`."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activo:
+                    return funcion(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    self.observar(METRICA_TRAMOS, time.perf_counter() - inicio, tramo=nombre)
+            return envoltura
+        return decorador
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+
+    def texto_prometheus(self) -> str:
+        """Todas las métricas en el formato de exposición de texto de Prometheus (0.0.4)."""
+        with self._lock:
+            histogramas = {n: {k: (list(h.cuentas), h.suma, h.total) for k, h in s.items()}
+                           for n, s in self._histogramas.items()}
+            contadores = {n: dict(s) for n, s in self._contadores.items()}
+        lineas = []
+        for nombre in sorted(histogramas):
+            lineas.append(f"# HELP {nombre} {self._ayudas.get(nombre, nombre)}")
+            lineas.append(f"# TYPE {nombre} histogram")
+            for clave, (cuentas, suma, total) in sorted(histogramas[nombre].items()):
+                acumulado = 0
+                for limite, cuenta in zip(self.limites, cuentas):
+                    acumulado += cuenta
+                    lineas.append(f"{nombre}_bucket{_etiquetas(clave, str(limite))} {acumulado}")
+                lineas.append(f"{nombre}_bucket{_etiquetas(clave, '+Inf')} {total}")
+                lineas.append(f"{nombre}_sum{_etiquetas(clave)} {_numero(suma)}")
+                lineas.append(f"{nombre}_count{_etiquetas(clave)} {total}")
+        for nombre in sorted(contadores):
+            lineas.append(f"# HELP {nombre} {self._ayudas.get(nombre, nombre)}")
+            lineas.append(f"# TYPE {nombre} counter")
+            for clave, valor in sorted(contadores[nombre].items()):
+                lineas.append(f"{nombre}{_etiquetas(clave)} {_numero(valor)}")
+        for nombre, (ayuda, tipo, funcion) in sorted(self._medidores.items()):
+            try:
+                valor = funcion()
+            except Exception:
+                continue # Un medidor que falla no impide exportar el resto
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.append(f"{nombre} {_numero(valor)}")
+        return '\n'.join(lineas) + '\n'
+
+
+class RegistroLentas:
+    """
+    Registro (JSON por línea) de las peticiones que superan umbral_ms. Con `perfilar`, cada
+    petición se ejecuta bajo cProfile y el perfil de las lentas se guarda en un archivo .prof
+    (se abre con pstats o snakeviz); perfilar todas las peticiones tiene un costo apreciable.
+    """
+
+    def __init__(self, archivo: Optional[str] = None, umbral_ms: float = UMBRAL_LENTAS_MS,
+                 perfilar: bool = False, directorio_perfiles: Optional[str] = None):
+        self.archivo = archivo or os.path.join(DIRECTORIO_LOGS, 'peticiones_lentas.jsonl')
+        self.umbral_ms = umbral_ms
+        self.perfilar = perfilar
+        self.directorio_perfiles = directorio_perfiles or os.path.join(DIRECTORIO_LOGS, 'perfiles')
+        self._lock = threading.Lock()
+
+    def iniciar_perfil(self) -> Optional[cProfile.Profile]:
+        if not self.perfilar:
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            return None # Ya hay otro perfilador activo en este hilo
+        return perfil
+
+    def registrar(self, entrada: dict, milisegundos: float, perfil: Optional[cProfile.Profile] = None) -> bool:
+        """Detiene el perfil y, si la petición fue lenta, la anota (con su perfil). Devuelve si fue lenta."""
+        if perfil is not None:
+            perfil.disable()
+        if self.umbral_ms is None or milisegundos < self.umbral_ms:
+            return False
+        ahora = datetime.now()
+        entrada = {'fecha': ahora.isoformat(timespec='milliseconds'), 'ms': round(milisegundos, 3), **entrada}
+        try:
+            if perfil is not None:
+                os.makedirs(self.directorio_perfiles, exist_ok=True)
+                nombre = f"{ahora:%Y%m%d%H%M%S}_{entrada.get('endpoint') or 'peticion'}_{int(milisegundos)}ms_{uuid.uuid4().hex[:6]}.prof"
+                ruta = os.path.join(self.directorio_perfiles, nombre)
+                perfil.dump_stats(ruta)
+                entrada['perfil'] = ruta
+            os.makedirs(os.path.dirname(os.path.abspath(self.archivo)), exist_ok=True)
+            with self._lock, open(self.archivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"Error registrando petición lenta: {e}")
+        return True
+
+
+metricas = Metricas()
+medir = metricas.medir
+tramo = metricas.tramo
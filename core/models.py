@@ -1,6 +1,9 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
-from datetime import datetime
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime, timezone
+import uuid
+
+from .metricas import medir
 
 #-----------------------
 #CONSTANTES
@@ -10,6 +13,10 @@ SUELDO_BASE_REFERENCIA = 470 # Referencia para Décimo Cuarto Sueldo
 DIAS_ANIO_REFERENCIA = 360 # Días laborales del año (para décimo cuarto)
 IESS_PERSONAL = 0.0945 # 9.45%
 IESS_PATRONAL = 0.1215 # 12.15%
+INCREMENTO_SALARIAL_ANUAL = 1.03 # Incremento del sueldo nominal a partir del Año 2
+MAX_ANIOS_PROYECCION_LOTE = 100 # Horizonte máximo para la proyección por lotes (multiproducto)
+PARTICIPACION_TRABAJADORES = 15.0 # % de la utilidad para los trabajadores
+IMPUESTO_RENTA = 25.0 # % sobre la utilidad después de participación
 
 
 @dataclass
@@ -19,6 +26,13 @@ class DatosProyeccion:
     num_proyeccion: int = 5
     resultados_proyeccion: List[float] = field(default_factory=list) 
 
+    # Series multiproducto en formato columnar (una lista por campo, índice = producto)
+    productos: List[str] = field(default_factory=list)
+    demandas_iniciales: List[float] = field(default_factory=list)
+    tasas_crecimiento: List[float] = field(default_factory=list)
+    horizontes: List[int] = field(default_factory=list)
+    resultados_productos: List[List[int]] = field(default_factory=list)
+
 
 @dataclass
 class ActivoFijo:
@@ -34,6 +48,7 @@ class ActivoFijo:
     dep_tipo: str = "" 
     dep_porcentaje_residual: float = 10.0
     dep_monto_valor_residual_pct: float = 100.0
+    dep_metodo: str = "lineal" # lineal, saldo_decreciente o suma_digitos
     
     def calcular_total(self):
         self.valor_total = self.valor_unitario * self.cantidad
@@ -121,6 +136,19 @@ class Caso:
     
     wacc: 'DatosWacc' = field(default_factory=lambda: DatosWacc())
     amortizacion: 'DatosAmortizacion' = field(default_factory=lambda: DatosAmortizacion())
+    flujo: 'DatosFlujo' = field(default_factory=lambda: DatosFlujo())
+    simulacion: 'DatosSimulacion' = field(default_factory=lambda: DatosSimulacion())
+    energia: 'DatosEnergia' = field(default_factory=lambda: DatosEnergia())
+    revision: int = 0 # Aumenta con cada cambio registrado (caché de pestañas y ETag)
+
+    def __post_init__(self):
+        # Identifica esta instancia en memoria: al recargar el archivo las revisiones no se confunden
+        self._instancia = uuid.uuid4().hex
+        self._modificado_en = datetime.now(timezone.utc)
+
+    def incrementar_revision(self):
+        self.revision += 1
+        self._modificado_en = datetime.now(timezone.utc)
 
 
 @dataclass
@@ -189,10 +217,117 @@ class AnioRolPagos:
 
 @dataclass
 class DatosRolPagos:
+    """
+    Rol de Pagos proyectado. Solo se persisten los cargos base (Año 1), la regla de
+    incremento y los totales anuales; los años proyectados se calculan bajo demanda.
+    """
     num_proyeccion: int = 5 
-    proyeccion_anual: List[AnioRolPagos] = field(default_factory=list)
+    cargos: List[ItemRolPagos] = field(default_factory=list)
+    factor_incremento: float = INCREMENTO_SALARIAL_ANUAL
+    totales_anuales: List[float] = field(default_factory=list)
     gran_total_general: float = 0.0
 
+    def __post_init__(self):
+        # Caché de años ya materializados (no es un campo, no se serializa)
+        self._anios_cache: Dict[int, AnioRolPagos] = {}
+
+    @property
+    def proyeccion_anual(self) -> Sequence[AnioRolPagos]:
+        """Vista perezosa de los años proyectados (vacía mientras no haya cargos)."""
+        return _ProyeccionAnualRol(self)
+
+    def proyectar_cargo(self, cargo: ItemRolPagos, anio: int) -> ItemRolPagos:
+        """Clona el cargo base aplicando el incremento acumulado factor^anio y calcula su rol."""
+        clon = replace(cargo, sueldo_nominal=cargo.sueldo_nominal * self.factor_incremento ** anio)
+        clon.calcular_rol()
+        return clon
+
+    def _sincronizar_anios(self):
+        if len(self.totales_anuales) != self.num_proyeccion:
+            self.ajustar_anios(self.num_proyeccion)
+
+    def anio(self, anio: int) -> AnioRolPagos:
+        """Devuelve (y guarda en caché) el año proyectado solicitado."""
+        self._sincronizar_anios()
+        if anio not in self._anios_cache:
+            self._anios_cache[anio] = AnioRolPagos(
+                items=[self.proyectar_cargo(cargo, anio) for cargo in self.cargos],
+                total_anual=self.totales_anuales[anio]
+            )
+        return self._anios_cache[anio]
+
+    def _aplicar_cargo(self, cargo: ItemRolPagos, signo: int, posicion: Optional[int] = None):
+        """Suma (o resta) la contribución de un cargo a los totales y a los años en caché: O(años)."""
+        for anio in range(self.num_proyeccion):
+            item = self.proyectar_cargo(cargo, anio)
+            total = signo * item.pago_empleador * 12
+            self.totales_anuales[anio] += total
+            self.gran_total_general += total
+            cache = self._anios_cache.get(anio)
+            if cache is not None:
+                if signo > 0 and posicion is None:
+                    cache.items.append(item)
+                elif signo > 0:
+                    cache.items[posicion] = item
+                cache.total_anual = self.totales_anuales[anio]
+
+    def agregar_cargo(self, cargo: ItemRolPagos):
+        """Añade un cargo base y actualiza solo sus filas anuales y los totales."""
+        self._sincronizar_anios()
+        self.cargos.append(cargo)
+        self._aplicar_cargo(cargo, 1)
+
+    def agregar_cargos(self, cargos: Sequence[ItemRolPagos]):
+        """Añade un lote de cargos (importación) y recalcula los totales por columnas."""
+        self.cargos.extend(cargos)
+        self.recalcular_totales()
+
+    def actualizar_cargo(self, idx: int, cargo: ItemRolPagos):
+        """Reemplaza el cargo base idx ajustando los totales por diferencia."""
+        self._sincronizar_anios()
+        self._aplicar_cargo(self.cargos[idx], -1)
+        self.cargos[idx] = cargo
+        self._aplicar_cargo(cargo, 1, posicion=idx)
+
+    @medir('DatosRolPagos.ajustar_anios')
+    def ajustar_anios(self, num_proyeccion: int):
+        """Cambia el horizonte calculando solo los años nuevos (o recortando los sobrantes)."""
+        if num_proyeccion < len(self.totales_anuales):
+            del self.totales_anuales[num_proyeccion:]
+            self._anios_cache = {a: v for a, v in self._anios_cache.items() if a < num_proyeccion}
+        self.num_proyeccion = num_proyeccion
+        if num_proyeccion > len(self.totales_anuales):
+            # Por columnas (core/nomina.py): mismos totales que proyectar_cargo sin clonar cada cargo
+            from .nomina import totales_anuales
+            self.totales_anuales.extend(totales_anuales(self.cargos, self.factor_incremento, num_proyeccion, desde=len(self.totales_anuales)))
+        self.gran_total_general = sum(self.totales_anuales, 0.0)
+
+    @medir('DatosRolPagos.recalcular_totales')
+    def recalcular_totales(self):
+        """Recalcula todos los totales desde los cargos base (por ejemplo, al cargar un archivo)."""
+        self._anios_cache = {}
+        self.totales_anuales = []
+        self.ajustar_anios(self.num_proyeccion)
+
+
+class _ProyeccionAnualRol(Sequence):
+    """Secuencia de AnioRolPagos que materializa cada año solo cuando se accede a él."""
+
+    def __init__(self, datos: DatosRolPagos):
+        self._datos = datos
+
+    def __len__(self):
+        return self._datos.num_proyeccion
+
+    def __getitem__(self, anio):
+        if isinstance(anio, slice):
+            return [self[i] for i in range(*anio.indices(len(self)))]
+        if anio < 0:
+            anio += len(self)
+        if not 0 <= anio < len(self):
+            raise IndexError(anio)
+        return self._datos.anio(anio)
+
 
 @dataclass
 class ItemWacc:
@@ -211,4 +346,83 @@ class DatosWacc:
 class DatosAmortizacion:
     interes_anual: float = 0.0
     institucion: str = ""
-    anios: int = 5
\ No newline at end of file
+    anios: int = 5
+    metodo: str = "aleman" # "aleman" (amortización constante) o "frances" (cuota constante)
+    meses_gracia: int = 0 # Meses iniciales en los que solo se pagan intereses
+
+
+@dataclass
+class Escenario:
+    nombre: str = ""
+    factor_demanda: float = 1.0 # Multiplica la demanda proyectada
+    factor_precio: float = 1.0 # Multiplica el precio unitario
+    factor_costos: float = 1.0 # Multiplica costos variables y Rol de Pagos
+
+
+def escenarios_por_defecto() -> List[Escenario]:
+    return [
+        Escenario(nombre="Real"),
+        Escenario(nombre="Pesimista", factor_demanda=0.9, factor_precio=0.95, factor_costos=1.05),
+        Escenario(nombre="Optimista", factor_demanda=1.1, factor_precio=1.05, factor_costos=0.95),
+    ]
+
+
+@dataclass
+class DatosFlujo:
+    precio_unitario: float = 0.0
+    costo_unitario: float = 0.0 # Costo variable por unidad vendida
+    gastos_fijos_anuales: float = 0.0 # Gastos administrativos y de ventas (sin Rol de Pagos)
+    tasa_descuento: float = 12.0 # % anual para el VAN
+    participacion_trabajadores: float = PARTICIPACION_TRABAJADORES
+    impuesto_renta: float = IMPUESTO_RENTA
+    escenarios: List[Escenario] = field(default_factory=escenarios_por_defecto)
+
+
+@dataclass
+class Distribucion:
+    parametro: str = "" # demanda_inicial, tasa_crecimiento, interes_anual, factor_costos_items, precio_unitario o costo_unitario
+    tipo: str = "normal" # normal, triangular o uniforme
+    media: float = 0.0 # normal
+    desviacion: float = 0.0 # normal
+    minimo: float = 0.0 # triangular y uniforme
+    moda: float = 0.0 # triangular
+    maximo: float = 0.0 # triangular y uniforme
+
+
+@dataclass
+class DatosSimulacion:
+    distribuciones: List[Distribucion] = field(default_factory=list)
+    trayectorias: int = 10000
+    semilla: int = 1
+
+
+@dataclass
+class TramoTarifa:
+    hasta_kwh: float = 0.0 # Límite superior del tramo en kWh del mes (0 = sin límite)
+    precio: float = 0.0 # USD por kWh
+
+
+@dataclass
+class PeriodoTarifa:
+    dias: str = "todos" # todos, laborables o fin_de_semana
+    hora_desde: float = 0.0 # Hora del día (0-24), incluida
+    hora_hasta: float = 24.0 # Hora del día (0-24), excluida
+    precio: float = 0.0 # USD por kWh
+
+
+@dataclass
+class DatosEnergia:
+    # Tarifa: plana (precio_kwh), escalonada (tramos sobre el consumo mensual) u horaria (periodos)
+    tarifa: str = "plana"
+    precio_kwh: float = 0.0
+    cargo_fijo_mensual: float = 0.0
+    tramos: List[TramoTarifa] = field(default_factory=list)
+    periodos: List[PeriodoTarifa] = field(default_factory=list)
+
+    # Resumen de la serie de lecturas (el archivo <caso>.energia guarda las lecturas)
+    lecturas: int = 0
+    intervalo_min: int = 0
+    inicio: str = ""
+    kwh_total: float = 0.0
+    kwh_anual: float = 0.0
+    costo_anual: float = 0.0
@@ -0,0 +1,124 @@
+"""
+Rol de Pagos por columnas para nóminas grandes (miles de cargos durante muchos años).
+
+ItemRolPagos.calcular_rol calcula un empleado-mes sobre una instancia del dataclass, y la
+proyección anual clona cada cargo por año. Aquí los cargos base se leen una vez como
+columnas (una lista por campo de entrada) y cada año se calcula campo por campo sobre
+todas las filas, sin crear instancias. Cada valor se obtiene con las mismas operaciones y
+en el mismo orden que calcular_rol, y los totales se suman en el orden de los cargos, así
+que los resultados coinciden exactamente con el cálculo por instancia:
+
+    sueldo_nominal(año) = sueldo_nominal * factor ** año        (DatosRolPagos.proyectar_cargo)
+    total_anual(año)    = suma de pago_empleador * 12           (DatosRolPagos.ajustar_anios)
+"""
+from typing import Dict, List, Optional, Sequence
+
+from .models import (
+    ItemRolPagos, SUELDO_BASE_REFERENCIA, DIAS_ANIO_REFERENCIA, IESS_PERSONAL, IESS_PATRONAL
+)
+
+# Campos de entrada de cada cargo y campos calculados por calcular_rol
+CAMPOS_ENTRADA = (
+    'sueldo_nominal', 'dias_trabajados', 'no_he', 'no_hs', 'no_jn', 'comisiones',
+    'descuentos', 'quincenas', 'fondos_reserva',
+)
+CAMPOS_ROL = (
+    'sueldo', 'remuneracion', 'decimo_tercer_sueldo', 'decimo_cuarto_sueldo', 'ap_personal',
+    'total_ingresos', 'l_recibir', 'ap_patronal', 'vacaciones', 'pago_empleador',
+)
+MESES = 12
+
+
+def columnas_cargos(cargos: Sequence[ItemRolPagos]) -> Dict[str, list]:
+    """Campos de entrada de los cargos como columnas (una pasada por campo)."""
+    return {campo: [getattr(c, campo) for c in cargos] for campo in CAMPOS_ENTRADA}
+
+
+def calcular_anio(columnas: Dict[str, list], factor_anio: float) -> Dict[str, List[float]]:
+    """Todos los campos de calcular_rol para todos los cargos con sueldo_nominal * factor_anio."""
+    dias = columnas['dias_trabajados']
+    sueldo = [b * factor_anio / 30 * d for b, d in zip(columnas['sueldo_nominal'], dias)]
+    remuneracion = [
+        s + he + hs + jn + co
+        for s, he, hs, jn, co in zip(sueldo, columnas['no_he'], columnas['no_hs'], columnas['no_jn'], columnas['comisiones'])
+    ]
+    decimo_tercero = [r / 12 for r in remuneracion]
+    referencia = SUELDO_BASE_REFERENCIA / DIAS_ANIO_REFERENCIA
+    decimo_cuarto = [referencia * d for d in dias]
+    ap_personal = [r * IESS_PERSONAL for r in remuneracion]
+    total_ingresos = [
+        r + d13 + d14 + fr
+        for r, d13, d14, fr in zip(remuneracion, decimo_tercero, decimo_cuarto, columnas['fondos_reserva'])
+    ]
+    l_recibir = [
+        ti - ap - de - qu
+        for ti, ap, de, qu in zip(total_ingresos, ap_personal, columnas['descuentos'], columnas['quincenas'])
+    ]
+    ap_patronal = [r * IESS_PATRONAL for r in remuneracion]
+    vacaciones = [r / 24 for r in remuneracion]
+    pago_empleador = [
+        s + d13 + d14 + fr + app + va
+        for s, d13, d14, fr, app, va in zip(sueldo, decimo_tercero, decimo_cuarto, columnas['fondos_reserva'], ap_patronal, vacaciones)
+    ]
+    return {
+        'sueldo': sueldo,
+        'remuneracion': remuneracion,
+        'decimo_tercer_sueldo': decimo_tercero,
+        'decimo_cuarto_sueldo': decimo_cuarto,
+        'ap_personal': ap_personal,
+        'total_ingresos': total_ingresos,
+        'l_recibir': l_recibir,
+        'ap_patronal': ap_patronal,
+        'vacaciones': vacaciones,
+        'pago_empleador': pago_empleador,
+    }
+
+
+def _total_anio(columnas: Dict[str, list], factor_anio: float) -> float:
+    """Suma de pago_empleador * 12 del año sin guardar los campos intermedios."""
+    referencia = SUELDO_BASE_REFERENCIA / DIAS_ANIO_REFERENCIA
+    return sum((
+        ((s := b * factor_anio / 30 * d) + (r := s + he + hs + jn + co) / 12 + referencia * d + fr
+         + r * IESS_PATRONAL + r / 24) * 12
+        for b, d, he, hs, jn, co, fr in zip(
+            columnas['sueldo_nominal'], columnas['dias_trabajados'], columnas['no_he'], columnas['no_hs'],
+            columnas['no_jn'], columnas['comisiones'], columnas['fondos_reserva'])
+    ), 0.0)
+
+
+def totales_anuales(cargos: Sequence[ItemRolPagos], factor: float, num_anios: int, desde: int = 0) -> List[float]:
+    """Total anual (pago_empleador * 12 de todos los cargos) de los años desde..num_anios-1."""
+    columnas = columnas_cargos(cargos)
+    return [_total_anio(columnas, factor ** anio) for anio in range(desde, num_anios)]
+
+
+def calcular_nomina(cargos: Sequence[ItemRolPagos], factor: float, num_anios: int,
+                    mensual: bool = False, campos: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Rol completo por años: para cada año, los campos pedidos (por defecto todos los de
+    calcular_rol) como columnas alineadas con los cargos, más los totales anuales. Con
+    `mensual`, añade el pago del empleador de cada mes (el rol es igual los 12 meses del año).
+    """
+    campos = tuple(campos) if campos is not None else CAMPOS_ROL
+    desconocidos = set(campos) - set(CAMPOS_ROL)
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    columnas = columnas_cargos(cargos)
+    anios, totales, mensuales = [], [], []
+    for anio in range(num_anios):
+        rol = calcular_anio(columnas, factor ** anio)
+        totales.append(sum((p * 12 for p in rol['pago_empleador']), 0.0))
+        mensuales.append(sum(rol['pago_empleador'], 0.0))
+        anios.append({campo: rol[campo] for campo in campos})
+
+    resultado = {
+        'num_cargos': len(cargos),
+        'anios': anios,
+        'totales_anuales': totales,
+        'gran_total_general': sum(totales, 0.0),
+    }
+    if mensual:
+        resultado['totales_mensuales'] = [[mes] * MESES for mes in mensuales]
+    return resultado
+
@@ -0,0 +1,85 @@
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence
+from .models import Caso
+from .flujo import evaluar_escenarios
+
+#-----------------------
+# PERIODO DE RECUPERACIÓN (PAYBACK)
+#-----------------------
+# El payback es el primer año en que el flujo acumulado deja de ser negativo, interpolado
+# linealmente dentro de ese año. El acumulado no es monótono (puede haber años con flujo
+# negativo), así que se busca sobre su máximo corrido, que sí lo es: el primer índice donde
+# el máximo corrido llega a 0 es el primer índice donde el acumulado llega a 0.
+
+
+def descontar(flujos: Sequence[Sequence[float]], tasa: float) -> List[List[float]]:
+    """Flujos descontados al año 0 con la tasa en %; los factores se calculan una vez."""
+    n = max((len(f) for f in flujos), default=0)
+    factores = [(1 + tasa / 100) ** -t for t in range(n)]
+    return [[v * d for v, d in zip(f, factores)] for f in flujos]
+
+
+def _payback(acumulado: List[float]) -> Optional[float]:
+    maximos = list(accumulate(acumulado, max))
+    t = bisect_left(maximos, 0.0)
+    if t == len(acumulado):
+        return None # No se recupera dentro del horizonte
+    if t == 0:
+        return 0.0
+    anterior = acumulado[t - 1]
+    return (t - 1) + (-anterior) / (acumulado[t] - anterior)
+
+
+def payback_lote(flujos: Sequence[Sequence[float]], tasa: Optional[float] = None) -> List[Optional[float]]:
+    """
+    Payback (años con fracción) de varios flujos con año 0 incluido. Con `tasa` (en %) se
+    calcula el payback descontado. None si la inversión no se recupera en el horizonte.
+    """
+    if tasa is not None:
+        flujos = descontar(flujos, tasa)
+    return [_payback(list(accumulate(f))) for f in flujos]
+
+
+def evaluar_payback(caso: Caso, evaluacion: Optional[Dict] = None) -> Dict:
+    """Flujos acumulados (simples y descontados) y payback de todos los escenarios del caso."""
+    evaluacion = evaluar_escenarios(caso) if evaluacion is None else evaluacion
+    tasa = evaluacion['tasa_descuento']
+    flujos = [e['columnas']['flujo'] for e in evaluacion['escenarios']]
+    descontados = descontar(flujos, tasa)
+    simples = payback_lote(flujos)
+    con_descuento = payback_lote(descontados)
+    return {
+        'anios': evaluacion['anios'],
+        'tasa_descuento': tasa,
+        'escenarios': [
+            {
+                'nombre': e['nombre'],
+                'flujo': flujos[k],
+                'acumulado': list(accumulate(flujos[k])),
+                'flujo_descontado': descontados[k],
+                'acumulado_descontado': list(accumulate(descontados[k])),
+                'payback': simples[k],
+                'payback_descontado': con_descuento[k],
+            }
+            for k, e in enumerate(evaluacion['escenarios'])
+        ],
+    }
+
+
+def payback_escenario(caso: Caso, nombre: str) -> Optional[Dict]:
+    """Payback de un escenario por nombre (para las pestañas PayBack Real/Pesimista/Optimista)."""
+    resultado = evaluar_payback(caso)
+    for escenario in resultado['escenarios']:
+        if escenario['nombre'].lower() == nombre.lower():
+            return {'anios': resultado['anios'], 'tasa_descuento': resultado['tasa_descuento'], **escenario}
+    return None
+
+
+def formato_periodo(anios: Optional[float]) -> str:
+    """Texto 'N años y M meses' de un payback en años."""
+    if anios is None:
+        return "No se recupera"
+    meses_totales = round(anios * 12)
+    anios_enteros, meses = divmod(meses_totales, 12)
+    return f"{anios_enteros} años y {meses} meses"
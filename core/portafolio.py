@@ -0,0 +1,137 @@
+"""
+Comparación de portafolio: métricas de varios casos guardados sin activarlos.
+
+Los archivos se leen en paralelo con un ThreadPoolExecutor (lectura de disco y
+decodificación) y las métricas de cada uno se guardan en memoria con la clave
+(archivo, mtime del caso, mtime de su diario): mientras el archivo no cambie, volver a
+abrir la comparación no relee nada.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+import threading
+
+from . import case_manager, diario
+from .models import Caso
+from .catalogo import resumen_caso
+from .flujo import evaluar_escenarios
+from .payback import evaluar_payback
+
+MAX_HILOS = 8
+MAX_CACHE = 1024 # Casos cuyas métricas se guardan en memoria
+
+# Métricas numéricas que se totalizan y promedian en el portafolio
+METRICAS_AGREGADAS = (
+    'inversion_activos', 'inversion_diferida', 'inversion_capital', 'inversion_total_general',
+    'monto_propio', 'monto_externo', 'gran_total_rol', 'van',
+)
+
+
+def metricas_caso(caso: Caso) -> Dict:
+    """Métricas del catálogo más VAN, TIR y payback del primer escenario (Real)."""
+    metricas = resumen_caso(caso)
+    metricas.pop('actualizado', None)
+    metricas['num_items_inversion'] = (
+        len(caso.inversion.activos_fijos) + len(caso.inversion.inversion_diferida)
+        + len(caso.inversion.capital_trabajo_items)
+    )
+    evaluacion = evaluar_escenarios(caso)
+    payback = evaluar_payback(caso, evaluacion)
+    real = evaluacion['escenarios'][0] if evaluacion['escenarios'] else None
+    metricas['escenario'] = real['nombre'] if real else None
+    metricas['van'] = real['van'] if real else None
+    metricas['tir'] = real['tir'] if real else None
+    metricas['payback'] = payback['escenarios'][0]['payback'] if real else None
+    metricas['payback_descontado'] = payback['escenarios'][0]['payback_descontado'] if real else None
+    return metricas
+
+
+class CachePortafolio:
+    """Métricas por archivo con clave de mtime (LRU, segura entre hilos)."""
+
+    def __init__(self, max_entradas: int = MAX_CACHE):
+        self.max_entradas = max_entradas
+        self._entradas: 'OrderedDict[str, Tuple[Tuple, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _version(ruta: str) -> Optional[Tuple]:
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            return None
+        try:
+            mtime_diario = os.stat(diario.ruta_diario(ruta)).st_mtime_ns
+        except OSError:
+            mtime_diario = None
+        return mtime, mtime_diario
+
+    def metricas(self, filename: str) -> Dict:
+        """Métricas del archivo (de la caché si no cambió en disco)."""
+        ruta = os.path.abspath(os.path.join(case_manager.CASES_DIR, filename))
+        version = self._version(ruta)
+        if version is None:
+            return {'filename': filename, 'error': 'El archivo no existe.'}
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            if entrada is not None and entrada[0] == version:
+                self._entradas.move_to_end(ruta)
+                self.aciertos += 1
+                return entrada[1]
+            self.fallos += 1
+
+        leido = case_manager.leer_caso(filename)
+        if leido is None:
+            return {'filename': filename, 'error': 'No se pudo leer el caso.'}
+        metricas = metricas_caso(leido[0])
+        with self._lock:
+            self._entradas[ruta] = (version, metricas)
+            self._entradas.move_to_end(ruta)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return metricas
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+cache = CachePortafolio()
+
+
+def validar_archivos(filenames: Sequence[str]) -> List[str]:
+    """Quita duplicados y rechaza nombres que no son archivos de caso de la carpeta."""
+    vistos = []
+    for filename in filenames:
+        if os.path.basename(filename) != filename or not case_manager.es_archivo_caso(filename):
+            raise ValueError(f"Archivo de caso inválido: {filename}")
+        if filename not in vistos:
+            vistos.append(filename)
+    return vistos
+
+
+def cargar_portafolio(filenames: Sequence[str], max_hilos: int = MAX_HILOS) -> Dict:
+    """Métricas de cada caso (en el orden pedido) y totales del portafolio."""
+    filenames = validar_archivos(filenames)
+    hilos = max(min(max_hilos, len(filenames)), 1)
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        casos = list(ejecutor.map(cache.metricas, filenames))
+    return {'casos': casos, 'totales': totales_portafolio(casos)}
+
+
+def totales_portafolio(casos: Sequence[Dict]) -> Dict:
+    """Suma, promedio, mínimo y máximo de cada métrica entre los casos leídos sin error."""
+    validos = [c for c in casos if 'error' not in c]
+    totales = {'num_casos': len(validos), 'num_errores': len(casos) - len(validos)}
+    for metrica in METRICAS_AGREGADAS:
+        valores = [c[metrica] for c in validos if c.get(metrica) is not None]
+        totales[metrica] = {
+            'suma': sum(valores, 0.0),
+            'promedio': sum(valores, 0.0) / len(valores) if valores else None,
+            'minimo': min(valores, default=None),
+            'maximo': max(valores, default=None),
+        }
+    return totales
@@ -0,0 +1,237 @@
+"""
+Análisis de sensibilidad: barrido en rejilla sobre parámetros del caso y diagrama tornado.
+
+Cada punto de la rejilla se evalúa con el mismo modelo que la simulación Monte Carlo
+(escenario Real de core/flujo.py). Las partes del modelo que dependen de un solo grupo de
+parámetros se calculan una vez por valor distinto y se reutilizan en todos los puntos:
+
+    demanda proyectada      <- demanda_inicial, tasa_crecimiento
+    cronograma del préstamo <- interes_anual (el monto escala con porcentaje_propio)
+    Rol de Pagos anual      <- factor_incremento
+    factores de descuento   <- tasa_descuento
+
+Depreciación, amortización de intangibles e inversión no dependen de ningún parámetro
+barrido y salen del modelo base. La rejilla se reparte por rebanadas (un valor del primer
+parámetro cada una) entre procesos.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+import os
+
+from .models import Caso, DatosRolPagos
+from .calculations import calcular_proyeccion_lote
+from .flujo import _ajustar
+from .payback import payback_lote
+from .simulacion import modelo_base, cronograma_prestamo, contexto_procesos, flujo_neto
+
+MAX_PUNTOS = 250_000
+MAX_VALORES_PARAMETRO = 1000
+VARIACION_TORNADO = 10.0 # ± % sobre el valor base
+
+PARAMETROS_SENSIBILIDAD = (
+    ('demanda_inicial', 'Demanda inicial'),
+    ('tasa_crecimiento', 'Tasa de crecimiento (%)'),
+    ('interes_anual', 'Interés anual del préstamo (%)'),
+    ('porcentaje_propio', 'Financiamiento propio (%)'),
+    ('factor_incremento', 'Incremento salarial (factor anual)'),
+    ('precio_unitario', 'Precio unitario'),
+    ('costo_unitario', 'Costo unitario'),
+    ('tasa_descuento', 'Tasa de descuento (%)'),
+)
+
+
+#-----------------------
+# VALORES BASE Y SUBRESULTADOS COMPARTIDOS
+#-----------------------
+
+def valores_base(caso: Caso) -> Dict[str, float]:
+    """Valor actual de cada parámetro en el caso."""
+    return {
+        'demanda_inicial': caso.proyeccion.demanda_inicial,
+        'tasa_crecimiento': caso.proyeccion.tasa_crecimiento,
+        'interes_anual': caso.amortizacion.interes_anual,
+        'porcentaje_propio': 100 - caso.financiamiento.porcentaje_externo,
+        'factor_incremento': caso.rol_pagos.factor_incremento,
+        'precio_unitario': caso.flujo.precio_unitario,
+        'costo_unitario': caso.flujo.costo_unitario,
+        'tasa_descuento': caso.flujo.tasa_descuento,
+    }
+
+
+def validar_parametro(nombre: str, valores: Sequence[float]):
+    """Lanza ValueError si el parámetro o sus valores no son válidos."""
+    etiquetas = dict(PARAMETROS_SENSIBILIDAD)
+    if nombre not in etiquetas:
+        raise ValueError(f"Parámetro desconocido: {nombre}")
+    if not valores:
+        raise ValueError(f"{etiquetas[nombre]}: se requiere al menos un valor.")
+    if len(valores) > MAX_VALORES_PARAMETRO:
+        raise ValueError(f"{etiquetas[nombre]}: máximo {MAX_VALORES_PARAMETRO} valores.")
+    if nombre == 'porcentaje_propio' and not all(0 <= v <= 100 for v in valores):
+        raise ValueError(f"{etiquetas[nombre]}: los valores deben estar entre 0 y 100.")
+    if nombre == 'tasa_descuento' and not all(v > -100 for v in valores):
+        raise ValueError(f"{etiquetas[nombre]}: los valores deben ser mayores que -100.")
+
+
+def _preparar_tablas(caso: Caso, modelo: Dict, valores: Dict[str, Sequence[float]]) -> Dict:
+    """Subresultados por valor distinto de cada grupo de parámetros."""
+    n = modelo['anios']
+    demandas_iniciales = sorted(set(valores['demanda_inicial']))
+    tasas = sorted(set(valores['tasa_crecimiento']))
+    pares = list(product(demandas_iniciales, tasas))
+    series = calcular_proyeccion_lote([d for d, _ in pares], [t for _, t in pares], [n] * len(pares))
+
+    personal = {}
+    for factor in set(valores['factor_incremento']):
+        if factor == caso.rol_pagos.factor_incremento:
+            personal[factor] = modelo['costo_personal']
+        else:
+            rol = DatosRolPagos(num_proyeccion=caso.rol_pagos.num_proyeccion, cargos=list(caso.rol_pagos.cargos), factor_incremento=factor)
+            rol.recalcular_totales()
+            personal[factor] = _ajustar(rol.totales_anuales, n)
+
+    return {
+        'demandas': dict(zip(pares, series)),
+        'cronogramas': {i: cronograma_prestamo(modelo, i) for i in set(valores['interes_anual'])},
+        'personal': personal,
+        'descuentos': {t: [(1 + t / 100) ** -k for k in range(n + 1)] for t in set(valores['tasa_descuento'])},
+    }
+
+
+#-----------------------
+# EVALUACIÓN POR REBANADAS
+#-----------------------
+
+def _evaluar_puntos(modelo: Dict, tablas: Dict, nombres: Sequence[str],
+                    puntos: Sequence[Sequence[float]], base: Dict[str, float]) -> Tuple[List, List, List]:
+    """VAN, payback y payback descontado de cada punto (valores en el orden de `nombres`)."""
+    modelos: Dict[Tuple[float, float], Dict] = {}
+    flujos, descontados, van = [], [], []
+    for punto in puntos:
+        p = dict(base)
+        p.update(zip(nombres, punto))
+        clave = (p['porcentaje_propio'], p['factor_incremento'])
+        variante = modelos.get(clave)
+        if variante is None:
+            variante = modelos[clave] = {
+                **modelo,
+                'pct_externo': (100 - p['porcentaje_propio']) / 100,
+                'costo_personal': tablas['personal'][p['factor_incremento']],
+            }
+        cronograma = tablas['cronogramas'][p['interes_anual']]
+        flujo = flujo_neto(variante, tablas['demandas'][(p['demanda_inicial'], p['tasa_crecimiento'])],
+                           p['precio_unitario'], p['costo_unitario'], 1.0,
+                           cronograma['interes'], cronograma['amortizacion'])
+        descontado = [v * d for v, d in zip(flujo, tablas['descuentos'][p['tasa_descuento']])]
+        flujos.append(flujo)
+        descontados.append(descontado)
+        van.append(sum(descontado, 0.0))
+    return van, payback_lote(flujos), payback_lote(descontados)
+
+
+def _evaluar_rebanada(tarea) -> Tuple[List, List, List]:
+    modelo, tablas, nombres, valores, base, primero = tarea
+    puntos = ((primero,) + resto for resto in product(*valores[1:]))
+    return _evaluar_puntos(modelo, tablas, nombres, list(puntos), base)
+
+
+def valores_rango(minimo: float, maximo: float, pasos: int) -> List[float]:
+    """`pasos` valores equiespaciados de minimo a maximo (ambos incluidos)."""
+    if pasos < 1 or pasos > MAX_VALORES_PARAMETRO:
+        raise ValueError(f"El número de pasos debe estar entre 1 y {MAX_VALORES_PARAMETRO}.")
+    if pasos == 1:
+        return [minimo]
+    paso = (maximo - minimo) / (pasos - 1)
+    return [minimo + paso * k for k in range(pasos - 1)] + [maximo]
+
+
+def barrido(caso: Caso, parametros: Sequence[Tuple[str, Sequence[float]]], procesos: Optional[int] = None) -> Dict:
+    """
+    Evalúa todas las combinaciones de la rejilla. Los resultados son listas planas en orden
+    de fila (el último parámetro varía más rápido), alineadas con el producto de `valores`.
+    """
+    nombres = [nombre for nombre, _ in parametros]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("Cada parámetro puede aparecer una sola vez en la rejilla.")
+    total = 1
+    for nombre, valores in parametros:
+        validar_parametro(nombre, valores)
+        total *= len(valores)
+    if total > MAX_PUNTOS:
+        raise ValueError(f"La rejilla tiene {total} puntos; el máximo es {MAX_PUNTOS}.")
+
+    base = valores_base(caso)
+    modelo = modelo_base(caso)
+    valores = [list(v) for _, v in parametros]
+    todos = {nombre: [base[nombre]] for nombre in base}
+    todos.update(zip(nombres, valores))
+    tablas = _preparar_tablas(caso, modelo, todos)
+
+    tareas = [(modelo, tablas, nombres, valores, base, v) for v in valores[0]] if nombres else []
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos <= 1:
+        resultados = list(map(_evaluar_rebanada, tareas))
+    else:
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos()) as ejecutor:
+            resultados = list(ejecutor.map(_evaluar_rebanada, tareas))
+
+    return {
+        'parametros': [{'nombre': n, 'valores': v} for n, v in zip(nombres, valores)],
+        'puntos': total if nombres else 0,
+        'van': [v for r in resultados for v in r[0]],
+        'payback': [v for r in resultados for v in r[1]],
+        'payback_descontado': [v for r in resultados for v in r[2]],
+    }
+
+
+#-----------------------
+# DIAGRAMA TORNADO
+#-----------------------
+
+def tornado(caso: Caso, rangos: Optional[Dict[str, Tuple[float, float]]] = None,
+            variacion: float = VARIACION_TORNADO) -> Dict:
+    """
+    Varía cada parámetro por separado entre su valor bajo y alto (por defecto ±variacion %
+    del valor base) y ordena los parámetros por el rango de VAN que producen.
+    """
+    base = valores_base(caso)
+    if rangos is None:
+        rangos = {nombre: (base[nombre] * (1 - variacion / 100), base[nombre] * (1 + variacion / 100))
+                  for nombre, _ in PARAMETROS_SENSIBILIDAD}
+        bajo, alto = rangos['porcentaje_propio']
+        rangos['porcentaje_propio'] = (max(bajo, 0.0), min(alto, 100.0))
+    for nombre, (bajo, alto) in rangos.items():
+        validar_parametro(nombre, [bajo, alto])
+
+    modelo = modelo_base(caso)
+    todos = {nombre: [base[nombre]] for nombre in base}
+    for nombre, (bajo, alto) in rangos.items():
+        todos[nombre] = [base[nombre], bajo, alto]
+    tablas = _preparar_tablas(caso, modelo, todos)
+
+    nombres = list(rangos)
+    puntos = [[base[n] for n in nombres]]
+    for k, nombre in enumerate(nombres):
+        for extremo in rangos[nombre]:
+            punto = [base[n] for n in nombres]
+            punto[k] = extremo
+            puntos.append(punto)
+    van, _, _ = _evaluar_puntos(modelo, tablas, nombres, puntos, base)
+
+    etiquetas = dict(PARAMETROS_SENSIBILIDAD)
+    barras = [
+        {
+            'parametro': nombre,
+            'etiqueta': etiquetas[nombre],
+            'base': base[nombre],
+            'bajo': rangos[nombre][0],
+            'alto': rangos[nombre][1],
+            'van_bajo': van[1 + 2 * k],
+            'van_alto': van[2 + 2 * k],
+            'rango': abs(van[2 + 2 * k] - van[1 + 2 * k]),
+        }
+        for k, nombre in enumerate(nombres)
+    ]
+    barras.sort(key=lambda b: b['rango'], reverse=True)
+    return {'van_base': van[0], 'barras': barras}
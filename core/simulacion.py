@@ -0,0 +1,394 @@
+"""
+Simulación Monte Carlo del VAN y la TIR del proyecto.
+
+Cada trayectoria toma valores de las distribuciones del caso (demanda inicial, tasa de
+crecimiento, interés del préstamo, factor de costo de los ítems de inversión, precio y
+costo unitario) y evalúa el mismo modelo que el escenario Real del flujo de caja
+(core/flujo.py), con la demanda proyectada como en calcular_proyeccion.
+
+Las trayectorias se procesan por bloques de tamaño fijo; cada bloque tiene su propia
+semilla derivada de (semilla, número de bloque), de modo que el resultado no depende de
+cuántos procesos se usen. Con varios procesos los bloques se reparten en un
+ProcessPoolExecutor (ver contexto_procesos). Cada bloque devuelve un resumen acotado de sus VAN y de su muestra
+de TIR (conteo, suma, momento de segundo orden, extremos y hasta MAX_PUNTOS_BLOQUE
+valores ordenados con su peso) y el resultado se obtiene fusionando esos resúmenes: la
+memoria no crece con el número de trayectorias. Media, desviación, extremos y
+probabilidad de pérdida son exactos; percentiles e histograma son exactos mientras cada
+bloque quepa en MAX_PUNTOS_BLOQUE y, si no, se interpolan entre los puntos de cada bloque.
+"""
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import math
+import multiprocessing
+import os
+import random
+
+from .models import Caso, DatosSimulacion, Distribucion
+from .calculations import calcular_proyeccion_lote, inversion_total_general, inversion_total_capital_trabajo
+from .amortizacion import METODO_ALEMAN, calcular_tabla_amortizacion, resumir_por_anio
+from .depreciacion import matriz_depreciacion, matriz_amortizacion_diferida
+from .flujo import _ajustar, tir_lote
+
+MAX_TRAYECTORIAS = 5_000_000
+TAMANO_BLOQUE = 50_000
+MUESTRA_TIR_POR_BLOQUE = 500 # La TIR (bisección) se calcula sobre una muestra de cada bloque
+MAX_PUNTOS_BLOQUE = 2000 # Valores ordenados (con peso) que cada bloque aporta a percentiles e histograma
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+NUM_CLASES_HISTOGRAMA = 40
+
+TIPOS_DISTRIBUCION = ('normal', 'triangular', 'uniforme')
+PARAMETROS_SIMULACION = (
+    ('demanda_inicial', 'Demanda inicial'),
+    ('tasa_crecimiento', 'Tasa de crecimiento (%)'),
+    ('interes_anual', 'Interés anual del préstamo (%)'),
+    ('factor_costos_items', 'Factor de costo de los ítems de inversión'),
+    ('precio_unitario', 'Precio unitario'),
+    ('costo_unitario', 'Costo unitario'),
+)
+# Parámetros que no pueden ser negativos (la muestra se recorta en 0)
+_NO_NEGATIVOS = {'demanda_inicial', 'factor_costos_items', 'precio_unitario', 'costo_unitario'}
+
+
+#-----------------------
+# DISTRIBUCIONES
+#-----------------------
+
+def validar_distribucion(d: Distribucion):
+    """Lanza ValueError si la distribución no es válida."""
+    nombres = dict(PARAMETROS_SIMULACION)
+    if d.parametro not in nombres:
+        raise ValueError(f"Parámetro desconocido: {d.parametro}")
+    if d.tipo not in TIPOS_DISTRIBUCION:
+        raise ValueError(f"Tipo de distribución desconocido: {d.tipo}")
+    if d.tipo == 'normal' and d.desviacion < 0:
+        raise ValueError(f"{nombres[d.parametro]}: la desviación no puede ser negativa.")
+    if d.tipo == 'uniforme' and d.minimo > d.maximo:
+        raise ValueError(f"{nombres[d.parametro]}: el mínimo es mayor que el máximo.")
+    if d.tipo == 'triangular' and not d.minimo <= d.moda <= d.maximo:
+        raise ValueError(f"{nombres[d.parametro]}: se requiere mínimo <= moda <= máximo.")
+
+
+def _muestrear(rnd: random.Random, d: Distribucion, n: int) -> List[float]:
+    if d.tipo == 'normal':
+        if d.desviacion == 0:
+            valores = [d.media] * n
+        else:
+            gauss, media, desviacion = rnd.gauss, d.media, d.desviacion
+            valores = [gauss(media, desviacion) for _ in range(n)]
+    elif d.tipo == 'triangular':
+        if d.minimo == d.maximo:
+            valores = [d.minimo] * n
+        else:
+            triangular, bajo, alto, moda = rnd.triangular, d.minimo, d.maximo, d.moda
+            valores = [triangular(bajo, alto, moda) for _ in range(n)]
+    else:
+        uniforme, bajo, alto = rnd.uniform, d.minimo, d.maximo
+        valores = [uniforme(bajo, alto) for _ in range(n)]
+    if d.parametro in _NO_NEGATIVOS:
+        valores = [v if v > 0 else 0.0 for v in valores]
+    return valores
+
+
+#-----------------------
+# MODELO BASE DEL CASO
+#-----------------------
+
+def modelo_base(caso: Caso) -> Dict:
+    """
+    Entradas del caso que no se muestrean, en un diccionario simple (se envía a los procesos).
+    Depreciación, amortización de intangibles, capital de trabajo, inversión y préstamo
+    escalan linealmente con el factor de costo de los ítems.
+    """
+    n = caso.proyeccion.num_proyeccion
+    flujo = caso.flujo
+    amortizacion = caso.amortizacion
+    inversion = inversion_total_general(caso.inversion)
+    return {
+        'anios': n,
+        'demanda_inicial': caso.proyeccion.demanda_inicial,
+        'tasa_crecimiento': caso.proyeccion.tasa_crecimiento,
+        'interes_anual': amortizacion.interes_anual,
+        'factor_costos_items': 1.0,
+        'precio_unitario': flujo.precio_unitario,
+        'costo_unitario': flujo.costo_unitario,
+        'gastos_fijos': flujo.gastos_fijos_anuales,
+        'tasa_descuento': flujo.tasa_descuento,
+        'pct_participacion': flujo.participacion_trabajadores / 100,
+        'pct_impuesto': flujo.impuesto_renta / 100,
+        'costo_personal': _ajustar(caso.rol_pagos.totales_anuales, n),
+        'depreciacion': _ajustar(matriz_depreciacion(caso).totales, n),
+        'amortizacion_diferida': _ajustar(matriz_amortizacion_diferida(caso).totales, n),
+        'capital_trabajo': inversion_total_capital_trabajo(caso.inversion),
+        'inversion': inversion,
+        'pct_externo': caso.financiamiento.porcentaje_externo / 100,
+        'plazo': amortizacion.anios,
+        'metodo': amortizacion.metodo,
+        'meses_gracia': amortizacion.meses_gracia,
+    }
+
+
+def _cronograma_unitario(modelo: Dict, interes: float) -> Dict[str, List[float]]:
+    """Intereses y amortización anuales de un préstamo de 1 (se escala por el monto de cada trayectoria)."""
+    anual = resumir_por_anio(calcular_tabla_amortizacion(
+        1.0, interes, modelo['plazo'], modelo['metodo'], modelo['meses_gracia']
+    ))
+    n = modelo['anios']
+    return {'interes': _ajustar(anual['interes'], n), 'amortizacion': _ajustar(anual['amortizacion'], n)}
+
+
+def _cronograma_frances(modelo: Dict, interes: float) -> Dict[str, List[float]]:
+    """
+    Igual que _cronograma_unitario con cuota constante, pero acumula los totales anuales
+    mes a mes sin construir la tabla mensual completa (cada trayectoria tiene su propia tasa).
+    """
+    pagos = max(int(modelo['plazo']), 0) * 12
+    gracia = min(max(int(modelo['meses_gracia']), 0), pagos)
+    meses_amortizacion = pagos - gracia
+    i = (interes / 100) / 12
+    if meses_amortizacion == 0 or i == 0:
+        return _cronograma_unitario(modelo, interes)
+
+    cuota = i / (1 - (1 + i) ** -meses_amortizacion)
+    intereses, amortizaciones = [], []
+    for inicio in range(0, pagos, 12):
+        total_interes = total_amortizacion = 0
+        for mes in range(inicio, min(inicio + 12, pagos)):
+            potencia = (1 + i) ** max(mes - gracia, 0)
+            capital = potencia - cuota * (potencia - 1) / i
+            total_interes += capital * i
+            if mes >= gracia:
+                total_amortizacion += cuota - capital * i
+        intereses.append(total_interes)
+        amortizaciones.append(total_amortizacion)
+    n = modelo['anios']
+    return {'interes': _ajustar(intereses, n), 'amortizacion': _ajustar(amortizaciones, n)}
+
+
+def cronograma_prestamo(modelo: Dict, interes: float) -> Dict[str, List[float]]:
+    """Intereses y amortización anuales de un préstamo de 1 con el método del caso."""
+    if modelo['metodo'] == METODO_ALEMAN:
+        return _cronograma_unitario(modelo, interes)
+    return _cronograma_frances(modelo, interes)
+
+
+def flujo_neto(modelo: Dict, demanda: Sequence[float], precio: float, costo: float,
+                       factor: float, interes: Sequence[float], amortizacion: Sequence[float]) -> List[float]:
+    """
+    Flujo neto (año 0..N) del escenario Real con la misma secuencia de operaciones que
+    calcular_flujos; `interes` y `amortizacion` son el cronograma de un préstamo de 1.
+    """
+    prestamo = modelo['inversion'] * factor * modelo['pct_externo']
+    pct_part, pct_imp = modelo['pct_participacion'], modelo['pct_impuesto']
+    gastos = modelo['gastos_fijos']
+    n = modelo['anios']
+    flujo = [prestamo - modelo['inversion'] * factor]
+    for t, (d, personal, dep, amd) in enumerate(zip(demanda, modelo['costo_personal'],
+                                                   modelo['depreciacion'], modelo['amortizacion_diferida'])):
+        dep, amd, it = dep * factor, amd * factor, interes[t] * prestamo
+        uap = d * precio - (0.0 + d * costo + personal + gastos + dep + amd + it)
+        uai = uap - (0.0 + max(uap, 0.0) * pct_part)
+        un = uai - (0.0 + max(uai, 0.0) * pct_imp)
+        recuperacion = modelo['capital_trabajo'] * factor if t == n - 1 else 0.0
+        flujo.append(un + dep + amd - amortizacion[t] * prestamo + recuperacion)
+    return flujo
+
+
+def _simular_bloque(tarea) -> tuple:
+    """Evalúa un bloque de trayectorias; devuelve (resumen de los VAN, resumen de la muestra de TIR en %)."""
+    modelo, distribuciones, semilla, indice, n = tarea
+    rnd = random.Random(semilla * 1_000_003 + indice)
+    muestras = {d.parametro: _muestrear(rnd, d, n) for d in distribuciones}
+
+    def valores(parametro):
+        return muestras.get(parametro) or [modelo[parametro]] * n
+
+    anios = modelo['anios']
+    demandas = calcular_proyeccion_lote(valores('demanda_inicial'), valores('tasa_crecimiento'), [anios] * n)
+    precios, costos = valores('precio_unitario'), valores('costo_unitario')
+    factores, intereses = valores('factor_costos_items'), valores('interes_anual')
+
+    cronogramas: Dict[float, Dict] = {}
+    lineal = modelo['metodo'] == METODO_ALEMAN and 'interes_anual' in muestras
+    if lineal:
+        # Con amortización constante el interés es proporcional a la tasa: basta un cronograma
+        base = _cronograma_unitario(modelo, 1.0)
+
+    tasa = modelo['tasa_descuento'] / 100
+    descuentos = [(1 + tasa) ** -t for t in range(anios + 1)]
+    van = []
+    paso_tir = max(n // MUESTRA_TIR_POR_BLOQUE, 1)
+    flujos_tir = []
+    for k in range(n):
+        interes = intereses[k]
+        if lineal:
+            cronograma = {'interes': [v * interes for v in base['interes']], 'amortizacion': base['amortizacion']}
+        else:
+            cronograma = cronogramas.get(interes)
+            if cronograma is None:
+                cronograma = cronogramas[interes] = cronograma_prestamo(modelo, interes)
+        flujo = flujo_neto(modelo, demandas[k], precios[k], costos[k], factores[k],
+                                   cronograma['interes'], cronograma['amortizacion'])
+        van.append(sum((v * d for v, d in zip(flujo, descuentos)), 0.0))
+        if k % paso_tir == 0:
+            flujos_tir.append(flujo)
+    tir = [t for t in tir_lote(flujos_tir) if t is not None]
+    return _resumir_bloque(van), _resumir_bloque(tir)
+
+
+#-----------------------
+# RESÚMENES POR BLOQUE
+#-----------------------
+
+def _resumir_bloque(valores: Sequence[float]) -> Dict:
+    """
+    Resumen acotado de los valores de un bloque. Los valores ordenados se agrupan de `paso`
+    en `paso` y cada grupo se representa por su valor central con peso = tamaño del grupo.
+    """
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    suma = math.fsum(ordenados)
+    media = suma / n if n else 0.0
+    paso = max(-(-n // MAX_PUNTOS_BLOQUE), 1)
+    puntos, pesos = [], []
+    for inicio in range(0, n, paso):
+        peso = min(paso, n - inicio)
+        puntos.append(ordenados[inicio + (peso - 1) // 2])
+        pesos.append(peso)
+    return {
+        'n': n,
+        'suma': suma,
+        'm2': math.fsum((v - media) ** 2 for v in ordenados),
+        'minimo': ordenados[0] if n else None,
+        'maximo': ordenados[-1] if n else None,
+        'negativos': bisect_left(ordenados, 0.0),
+        'puntos': puntos,
+        'pesos': pesos,
+    }
+
+
+def _fusionar(bloques: Sequence[Dict]) -> Dict:
+    """Une los resúmenes de varios bloques (varianza combinada y puntos ordenados por valor)."""
+    bloques = [b for b in bloques if b['n']]
+    n = sum(b['n'] for b in bloques)
+    suma = math.fsum(b['suma'] for b in bloques)
+    media = suma / n if n else 0.0
+    m2 = math.fsum(b['m2'] + b['n'] * (b['suma'] / b['n'] - media) ** 2 for b in bloques)
+    puntos = sorted((v, w) for b in bloques for v, w in zip(b['puntos'], b['pesos']))
+    return {
+        'n': n,
+        'suma': suma,
+        'm2': m2,
+        'minimo': min((b['minimo'] for b in bloques), default=None),
+        'maximo': max((b['maximo'] for b in bloques), default=None),
+        'negativos': sum(b['negativos'] for b in bloques),
+        'puntos': [v for v, _ in puntos],
+        'pesos': [w for _, w in puntos],
+    }
+
+
+#-----------------------
+# EJECUCIÓN Y RESUMEN
+#-----------------------
+
+def _percentil(resumen: Dict, p: float) -> Optional[float]:
+    """
+    Percentil con interpolación lineal por rango. Cada punto está en el rango central de su
+    grupo y los extremos anclan los rangos 0 y n-1; con pesos 1 es el percentil exacto.
+    """
+    n = resumen['n']
+    if not n:
+        return None
+    rangos, valores, acumulado = [0.0], [resumen['minimo']], 0
+    for v, w in zip(resumen['puntos'], resumen['pesos']):
+        rangos.append(acumulado + (w - 1) / 2)
+        valores.append(v)
+        acumulado += w
+    rangos.append(n - 1.0)
+    valores.append(resumen['maximo'])
+
+    posicion = (n - 1) * p / 100
+    k = min(max(bisect_right(rangos, posicion), 1), len(rangos) - 1)
+    bajo, alto = rangos[k - 1], rangos[k]
+    if alto <= bajo:
+        return valores[k]
+    return valores[k - 1] + (valores[k] - valores[k - 1]) * (posicion - bajo) / (alto - bajo)
+
+
+def _histograma(resumen: Dict, clases: int) -> Dict:
+    if not resumen['n']:
+        return {'limites': [], 'frecuencias': []}
+    minimo, maximo = resumen['minimo'], resumen['maximo']
+    ancho = (maximo - minimo) / clases if maximo > minimo else 1.0
+    frecuencias = [0] * clases
+    for v, w in zip(resumen['puntos'], resumen['pesos']):
+        frecuencias[min(int((v - minimo) / ancho), clases - 1)] += w
+    return {'limites': [minimo + ancho * i for i in range(clases + 1)], 'frecuencias': frecuencias}
+
+
+def _resumen(resumen: Dict) -> Dict:
+    n = resumen['n']
+    return {
+        'n': n,
+        'media': resumen['suma'] / n if n else None,
+        'desviacion': math.sqrt(resumen['m2'] / (n - 1)) if n > 1 else 0.0,
+        'minimo': resumen['minimo'],
+        'maximo': resumen['maximo'],
+        'percentiles': {str(p): _percentil(resumen, p) for p in PERCENTILES},
+        'histograma': _histograma(resumen, NUM_CLASES_HISTOGRAMA),
+    }
+
+
+def contexto_procesos():
+    """
+    Contexto de multiprocessing para los pools de cálculo. Con fork, el hijo heredaría los
+    bloqueos que otros hilos del servidor (peticiones, autoguardado, métricas) tuvieran
+    tomados en ese instante y podría quedarse esperando para siempre; el proceso de
+    forkserver arranca limpio, sin esos hilos. Donde no existe (Windows) se usa spawn.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    contexto = multiprocessing.get_context('forkserver')
+    contexto.set_forkserver_preload([__name__]) # Precarga el motor de cálculo, no el __main__ de la app
+    return contexto
+
+
+def simular(caso: Caso, datos: Optional[DatosSimulacion] = None, procesos: Optional[int] = None) -> Dict:
+    """
+    Ejecuta la simulación del caso. `procesos` = 1 evalúa en el proceso actual; por defecto
+    usa un proceso por núcleo cuando hay más de un bloque.
+    """
+    datos = caso.simulacion if datos is None else datos
+    for d in datos.distribuciones:
+        validar_distribucion(d)
+    total = datos.trayectorias
+    if not 1 <= total <= MAX_TRAYECTORIAS:
+        raise ValueError(f"El número de trayectorias debe estar entre 1 y {MAX_TRAYECTORIAS}.")
+
+    modelo = modelo_base(caso)
+    tareas = [
+        (modelo, list(datos.distribuciones), datos.semilla, i, min(TAMANO_BLOQUE, total - inicio))
+        for i, inicio in enumerate(range(0, total, TAMANO_BLOQUE))
+    ]
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos <= 1:
+        resultados = map(_simular_bloque, tareas)
+        return _consolidar(resultados, datos, modelo)
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos()) as ejecutor:
+        return _consolidar(ejecutor.map(_simular_bloque, tareas), datos, modelo)
+
+
+def _consolidar(resultados, datos: DatosSimulacion, modelo: Dict) -> Dict:
+    bloques_van, bloques_tir = [], []
+    for van_bloque, tir_bloque in resultados:
+        bloques_van.append(van_bloque)
+        bloques_tir.append(tir_bloque)
+    van, tir = _fusionar(bloques_van), _fusionar(bloques_tir)
+    return {
+        'trayectorias': van['n'],
+        'semilla': datos.semilla,
+        'tasa_descuento': modelo['tasa_descuento'],
+        'van': _resumen(van),
+        'tir': _resumen(tir),
+        'probabilidad_perdida': van['negativos'] / van['n'] if van['n'] else None,
+    }
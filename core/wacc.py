@@ -0,0 +1,104 @@
+from typing import Dict, List, Sequence, Tuple
+import math
+from .models import Caso, DatosWacc
+
+#-----------------------
+# MATRIZ ROE (UTILIDAD / PATRIMONIO)
+#-----------------------
+
+TABLAS_WACC = {'utilidad': 'tabla_utilidad', 'patrimonio': 'tabla_patrimonio'}
+
+
+def _valor(valores: Sequence[float], col: int) -> float:
+    return valores[col] if col < len(valores) else 0.0
+
+
+def calcular_roe(utilidad: float, patrimonio: float) -> float:
+    """ROE de una celda; 0 cuando el patrimonio es 0 (igual que la pestaña)."""
+    return utilidad / patrimonio if patrimonio != 0 else 0.0
+
+
+class MatrizRoe:
+    """
+    ROE por empresa y año con promedios por columna y promedio final.
+    El promedio de cada año divide entre todas las empresas; el final promedia los años.
+    Al editar celdas solo se recalculan las celdas y columnas afectadas.
+    """
+
+    def __init__(self, wacc: DatosWacc, num_cols: int):
+        self.num_cols = num_cols
+        self.roe: List[List[float]] = []
+        self.promedios: List[float] = [0.0] * num_cols
+        self.promedio_final: float = 0.0
+        self.reconstruir(wacc)
+
+    def _celda(self, wacc: DatosWacc, fila: int, col: int) -> float:
+        patrimonio = wacc.tabla_patrimonio[fila].valores_anuales if fila < len(wacc.tabla_patrimonio) else ()
+        return calcular_roe(_valor(wacc.tabla_utilidad[fila].valores_anuales, col), _valor(patrimonio, col))
+
+    def reconstruir(self, wacc: DatosWacc):
+        self.roe = [[self._celda(wacc, f, c) for c in range(self.num_cols)] for f in range(len(wacc.tabla_utilidad))]
+        self._recalcular_columnas(range(self.num_cols))
+
+    def _recalcular_columnas(self, cols) -> Dict[int, float]:
+        filas = len(self.roe)
+        cambiados = {}
+        for col in cols:
+            promedio = sum((fila[col] for fila in self.roe), 0.0) / filas if filas else 0.0
+            if promedio != self.promedios[col]:
+                cambiados[col] = promedio
+            self.promedios[col] = promedio
+        self.promedio_final = sum(self.promedios, 0.0) / self.num_cols if self.num_cols else 0.0
+        return cambiados
+
+    def actualizar_celdas(self, wacc: DatosWacc, celdas: Sequence[Tuple[int, int]]) -> Dict:
+        """Recalcula las celdas (fila, col) editadas y devuelve solo los agregados que cambiaron."""
+        roe_cambiados = []
+        cols = set()
+        for fila, col in set(celdas):
+            if not (0 <= fila < len(self.roe) and 0 <= col < self.num_cols):
+                continue
+            valor = self._celda(wacc, fila, col)
+            if valor != self.roe[fila][col]:
+                self.roe[fila][col] = valor
+                roe_cambiados.append({'fila': fila, 'col': col, 'valor': valor})
+                cols.add(col)
+        anterior = self.promedio_final
+        promedios = self._recalcular_columnas(sorted(cols))
+        return {
+            'roe': roe_cambiados,
+            'promedios': promedios,
+            'promedio_final': self.promedio_final,
+            'promedio_final_cambio': self.promedio_final != anterior,
+        }
+
+
+def matriz_roe(caso: Caso) -> MatrizRoe:
+    """Matriz ROE del caso, guardada en memoria junto al WACC; se reconstruye si cambian sus dimensiones."""
+    wacc = caso.wacc
+    num_cols = caso.proyeccion.num_proyeccion
+    matriz = getattr(wacc, '_matriz_roe', None)
+    if matriz is None or matriz.num_cols != num_cols or len(matriz.roe) != len(wacc.tabla_utilidad):
+        matriz = MatrizRoe(wacc, num_cols)
+        wacc._matriz_roe = matriz
+    return matriz
+
+
+def leer_cambio(cambio: Dict, wacc: DatosWacc, num_cols: int) -> Tuple[str, int, int, object]:
+    """
+    Valida un cambio {tipo, fila, col, valor}; col 0 es el nombre y 1..num_cols los años de
+    la proyección. Lanza ValueError si es inválido.
+    """
+    tipo = cambio.get('tipo', 'utilidad')
+    if tipo not in TABLAS_WACC:
+        raise ValueError(f"Tabla desconocida: {tipo}")
+    fila, col = int(cambio['fila']), int(cambio['col'])
+    if not 0 <= fila < len(getattr(wacc, TABLAS_WACC[tipo])) or not 0 <= col <= num_cols:
+        raise ValueError(f"Celda fuera de rango: fila {fila}, columna {col}")
+    valor = str(cambio.get('valor', '')).strip()
+    if col == 0:
+        return tipo, fila, col, valor
+    numero = float(valor.replace(',', '')) if valor else 0.0
+    if not math.isfinite(numero):
+        raise ValueError(f"Valor no finito: {valor!r}")
+    return tipo, fila, col, numero
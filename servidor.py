@@ -0,0 +1,163 @@
+"""
+Servidor de producción de MercuriOS con varios procesos (workers).
+
+La app se importa una sola vez en el proceso principal (precarga) y cada worker es un
+proceso hijo que atiende peticiones con varios hilos. El caso activo de cada sesión se
+comparte entre workers con el almacén de core/almacen.py, así que cualquier worker puede
+atender cualquier petición y, si uno muere, el caso sigue disponible para los demás.
+
+    python servidor.py --workers 4 --host 0.0.0.0 --port 8000
+
+Si gunicorn está instalado se usa gunicorn (worker gthread, preload_app); si no, un
+servidor pre-fork con werkzeug que relanza los workers que terminan. En Windows (sin fork)
+se sirve con un solo proceso.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from core.almacen import DIRECTORIO_ALMACEN
+
+SESIONES_INACTIVAS_SEG = 7 * 24 * 3600 # Sesiones sin cambios pendientes que se purgan al arrancar
+
+
+def _cargar_app():
+    """Importa la app (una vez, antes de crear los workers) con el almacén compartido activado."""
+    os.environ.setdefault('MERCURIOS_ALMACEN', os.path.abspath(DIRECTORIO_ALMACEN))
+    from app import app, registro
+    # Casos que un arranque anterior publicó pero no llegó a guardar en disco
+    recuperados = registro.recuperar_pendientes()
+    if recuperados:
+        print(f"Casos pendientes recuperados del almacén: {recuperados}")
+    registro.almacen.purgar(SESIONES_INACTIVAS_SEG)
+    return app, registro
+
+
+#-----------------------
+# GUNICORN
+#-----------------------
+
+def _servir_gunicorn(app, registro, host: str, port: int, workers: int, hilos: int):
+    from gunicorn.app.base import BaseApplication
+
+    def child_exit(server, worker):
+        registro.recuperar_pendientes()
+
+    class AplicacionGunicorn(BaseApplication):
+        def load_config(self):
+            opciones = {
+                'bind': f"{host}:{port}",
+                'workers': workers,
+                'threads': hilos,
+                'worker_class': 'gthread',
+                'preload_app': True,
+                'child_exit': child_exit,
+            }
+            for clave, valor in opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            return app
+
+    AplicacionGunicorn().run()
+
+
+#-----------------------
+# PRE-FORK CON WERKZEUG
+#-----------------------
+
+def _worker(app, sock: socket.socket, host: str, port: int):
+    from werkzeug.serving import make_server
+
+    # SIGTERM termina el worker ordenadamente (atexit vacía el autoguardado)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    servidor = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    servidor.serve_forever()
+
+
+def _servir_prefork(app, registro, host: str, port: int, workers: int):
+    sock = socket.create_server((host, port), backlog=128)
+    sock.set_inheritable(True)
+    hijos = set()
+    deteniendo = False
+
+    def lanzar():
+        pid = os.fork()
+        if pid == 0:
+            codigo = 0
+            try:
+                _worker(app, sock, host, port)
+            except SystemExit as e:
+                codigo = e.code or 0
+            except BaseException as e:
+                print(f"Error en el worker {os.getpid()}: {e}")
+                codigo = 1
+            finally:
+                from core.autoguardado import autoguardado
+                autoguardado.detener()
+                os._exit(codigo)
+        hijos.add(pid)
+
+    def detener(*_):
+        nonlocal deteniendo
+        deteniendo = True
+        for pid in list(hijos):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, detener)
+    signal.signal(signal.SIGINT, detener)
+
+    for _ in range(workers):
+        lanzar()
+    print(f"Servidor en http://{host}:{port}/ con {workers} workers (pid {os.getpid()})")
+
+    while hijos:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        hijos.discard(pid)
+        if deteniendo:
+            continue
+        print(f"El worker {pid} terminó (estado {estado}); se relanza.")
+        registro.recuperar_pendientes()
+        time.sleep(0.5) # Evita relanzar en bucle si el worker falla al arrancar
+        lanzar()
+    sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de MercuriOS con varios workers.")
+    parser.add_argument('--host', default=os.environ.get('MERCURIOS_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('MERCURIOS_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('MERCURIOS_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--hilos', type=int, default=int(os.environ.get('MERCURIOS_HILOS', 4)),
+                        help="Hilos por worker (solo con gunicorn; werkzeug crea un hilo por petición)")
+    args = parser.parse_args(argv)
+
+    app, registro = _cargar_app()
+    try:
+        import gunicorn # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None:
+        _servir_gunicorn(app, registro, args.host, args.port, args.workers, args.hilos)
+    elif hasattr(os, 'fork'):
+        _servir_prefork(app, registro, args.host, args.port, max(args.workers, 1))
+    else:
+        print(f"Sin fork en esta plataforma: un solo proceso en http://{args.host}:{args.port}/")
+        app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import case_manager
+from core.autoguardado import autoguardado
+
+
+@pytest.fixture
+def directorio_casos(tmp_path, monkeypatch):
+    """Carpeta de casos temporal (los guardados no tocan resources/reports)."""
+    monkeypatch.setattr(case_manager, 'CASES_DIR', str(tmp_path))
+    yield tmp_path
+    autoguardado.vaciar() # Lo pendiente se guarda antes de restaurar CASES_DIR
+
+
+@pytest.fixture
+def cliente(directorio_casos, monkeypatch):
+    """Test client de app.py con la carpeta de casos temporal (sin registro de peticiones lentas)."""
+    from app import app, lentas
+    monkeypatch.setattr(lentas, 'umbral_ms', None)
+    app.config['TESTING'] = True
+    return app.test_client()
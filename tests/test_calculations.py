@@ -0,0 +1,30 @@
+import random
+
+from core.calculations import calcular_proyeccion, calcular_proyeccion_lote
+from core.models import DatosProyeccion
+
+
+def proyeccion_iterativa(demanda, tasa, horizonte):
+    """Versión original: cada año multiplica el anterior por (1 + tasa) y redondea al final."""
+    valores, actual = [], demanda
+    for anio in range(horizonte):
+        if anio:
+            actual = actual * (1 + tasa / 100)
+        valores.append(round(actual))
+    return valores
+
+
+def test_forma_cerrada_coincide_con_la_iterativa():
+    rnd = random.Random(7)
+    demandas = [rnd.uniform(0, 100000) for _ in range(2000)]
+    tasas = [rnd.choice([0, 2.5, 5, rnd.uniform(-20, 30)]) for _ in range(2000)]
+    horizontes = [rnd.randint(0, 30) for _ in range(2000)]
+    lote = calcular_proyeccion_lote(demandas, tasas, horizontes)
+    for fila, d, t, h in zip(lote, demandas, tasas, horizontes):
+        assert fila == proyeccion_iterativa(d, t, h)
+
+
+def test_calcular_proyeccion_un_producto():
+    datos = DatosProyeccion(demanda_inicial=1000, tasa_crecimiento=5, num_proyeccion=4)
+    assert calcular_proyeccion(datos) == [1000, 1050, 1102, 1158]
+    assert calcular_proyeccion(DatosProyeccion(num_proyeccion=0)) == []
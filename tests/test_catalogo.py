@@ -0,0 +1,50 @@
+import os
+import shutil
+
+from core.case_manager import CaseManager, obtener_catalogo
+
+
+def guardar_caso(nombre):
+    gestor = CaseManager()
+    caso = gestor.inicializar_nuevo_caso(nombre)
+    gestor.marcar_modificado()
+    assert gestor.guardar_caso_actual()[0]
+    return gestor, caso
+
+
+def nombres(gestor, **filtros):
+    casos, _ = gestor.consultar_casos(**filtros)
+    return sorted(c['nombre'] for c in casos)
+
+
+def test_guardar_actualiza_catalogo_sin_recorrer_carpeta(directorio_casos, monkeypatch):
+    obtener_catalogo() # Sincronización inicial (carpeta vacía)
+    monkeypatch.setattr(type(obtener_catalogo()), 'sincronizar_directorio', None) # Falla si se llama
+    gestor, _ = guardar_caso('Panadería')
+    assert nombres(gestor) == ['Panadería']
+
+
+def test_consulta_solo_ve_archivos_externos_al_refrescar(directorio_casos):
+    gestor, caso = guardar_caso('Original')
+    shutil.copy(os.path.join(directorio_casos, caso.filename), os.path.join(directorio_casos, 'copia.json'))
+    assert nombres(gestor) == ['Original']
+    assert nombres(gestor, refrescar=True) == ['Original', 'Original']
+
+    os.remove(os.path.join(directorio_casos, 'copia.json'))
+    assert nombres(gestor, refrescar=True) == ['Original']
+
+
+def test_cargar_archivo_borrado_lo_quita_del_catalogo(directorio_casos):
+    gestor, caso = guardar_caso('Efímero')
+    os.remove(os.path.join(directorio_casos, caso.filename))
+    assert not gestor.cargar_caso_desde_archivo(caso.filename)
+    assert nombres(gestor) == []
+
+
+def test_busqueda_trata_comodines_como_texto(directorio_casos):
+    gestor, _ = guardar_caso('Descuento 50%')
+    guardar_caso('Descuento 500')
+    guardar_caso('caso_a')
+    guardar_caso('casoXa')
+    assert nombres(gestor, texto='50%') == ['Descuento 50%']
+    assert nombres(gestor, texto='o_a') == ['caso_a']
@@ -0,0 +1,28 @@
+from benchmarks.generador import caso_sintetico
+from core import codec
+from core.models import Caso
+
+
+def test_json_ida_y_vuelta():
+    caso = caso_sintetico(items=50, cargos=20, anios=8, empresas=5)
+    texto = codec.a_json(caso, {'_diario_seq': 7})
+    leido, extras = codec.desde_json(Caso, texto)
+    assert codec.a_dict(leido) == codec.a_dict(caso)
+    assert extras['_diario_seq'] == 7
+
+
+def test_binario_ida_y_vuelta():
+    caso = caso_sintetico(items=50, cargos=20, anios=8, empresas=5)
+    datos = codec.a_binario(caso, {'_diario_seq': 3})
+    assert codec.es_binario(datos)
+    leido, extras = codec.desde_binario(Caso, datos)
+    assert codec.a_dict(leido) == codec.a_dict(caso)
+    assert extras['_diario_seq'] == 3
+
+
+def test_migracion_rol_pagos_antiguo():
+    import core.case_manager  # noqa: F401  (registra las migraciones)
+    texto = '{"nombre": "Antiguo", "rol_pagos": {"proyeccion_anual": [{"items": [{"cargo": "Gerente", "sueldo_nominal": 1500}]}, {"items": []}]}}'
+    caso, _ = codec.desde_json(Caso, texto)
+    assert [c.cargo for c in caso.rol_pagos.cargos] == ['Gerente']
+    assert caso.rol_pagos.num_proyeccion == 2
@@ -0,0 +1,72 @@
+import pytest
+
+from core.depreciacion import (
+    ANIOS_MATRIZ, METODOS_DEPRECIACION, distribuir_monto, matriz_amortizacion_diferida,
+    matriz_depreciacion
+)
+from core.models import ActivoFijo, Caso, InversionDiferidaItem
+
+
+def activo(valor, tipo='Vehiculos', metodo='lineal'):
+    item = ActivoFijo(descripcion='Activo', valor_unitario=valor, cantidad=1, dep_tipo=tipo, dep_metodo=metodo)
+    item.calcular_total()
+    return item
+
+
+def diferida(total, anios):
+    item = InversionDiferidaItem(descripcion='Diferida', valor_unitario=total, cantidad=1, amort_anios=anios)
+    item.calcular_total()
+    return item
+
+
+@pytest.mark.parametrize('metodo', METODOS_DEPRECIACION)
+@pytest.mark.parametrize('anos', [1, 3, 5, 10, 20])
+def test_cuotas_suman_el_monto(metodo, anos):
+    cuotas = distribuir_monto(1000.0, anos, metodo)
+    assert len(cuotas) == ANIOS_MATRIZ
+    assert sum(cuotas) == pytest.approx(1000.0)
+    assert all(c == 0.0 for c in cuotas[anos:])
+
+
+def test_vida_util_mayor_que_la_matriz():
+    # 30 años: cada columna es la cuota real (monto / 30), no el monto repartido en 20 columnas
+    assert distribuir_monto(3000.0, 30) == [100.0] * ANIOS_MATRIZ
+    suma_digitos = distribuir_monto(465.0, 30, 'suma_digitos')
+    assert suma_digitos[0] == pytest.approx(30.0)
+    assert suma_digitos[-1] == pytest.approx(11.0)
+
+
+def test_metodo_desconocido():
+    with pytest.raises(ValueError):
+        distribuir_monto(100.0, 5, 'otro')
+
+
+def test_matriz_coincide_con_el_calculo_completo():
+    caso = Caso(nombre='Depreciación')
+    caso.inversion.activos_fijos.extend(activo(1000 * (i + 1), metodo=m) for i, m in enumerate(METODOS_DEPRECIACION * 3))
+    matriz = matriz_depreciacion(caso)
+    esperado = [sum(fila['anios'][k] for fila in matriz.filas) for k in range(ANIOS_MATRIZ)]
+    assert matriz.totales == pytest.approx(esperado)
+
+
+def test_matriz_detecta_cambios_en_el_lugar():
+    caso = Caso(nombre='Depreciación')
+    caso.inversion.activos_fijos.append(activo(1000))
+    assert matriz_depreciacion(caso).totales[0] == pytest.approx(180.0)
+
+    # Edición directa de un ítem (sin MatrizAnual.actualizar), con la revisión del caso al día
+    caso.inversion.activos_fijos[0].valor_total = 2000.0
+    caso.incrementar_revision()
+    assert matriz_depreciacion(caso).totales[0] == pytest.approx(360.0)
+
+    # Lista reemplazada por otra de igual longitud
+    caso.inversion.activos_fijos = [activo(500, tipo='Equipos')]
+    assert matriz_depreciacion(caso).totales[0] == pytest.approx(150.0)
+
+
+def test_amortizacion_30_anios():
+    caso = Caso(nombre='Amortización')
+    caso.inversion.inversion_diferida.append(diferida(3000.0, 30))
+    matriz = matriz_amortizacion_diferida(caso)
+    assert matriz.filas[0]['valor_dep'] == pytest.approx(100.0)
+    assert matriz.totales == [100.0] * ANIOS_MATRIZ
@@ -0,0 +1,113 @@
+import io
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from core import diario
+from core.case_manager import CaseManager, MODO_DIARIO, leer_caso
+from core.energia import SerieEnergia, acumulados, costo_serie, costo_tramos, importar_serie
+from core.models import DatosEnergia, PeriodoTarifa, TramoTarifa
+
+INICIO = datetime(2024, 1, 29, 22, 0) # Lunes, dos días antes de fin de mes
+
+
+def lecturas(n, intervalo_min=30, semilla=5):
+    rnd = random.Random(semilla)
+    return [(INICIO + timedelta(minutes=intervalo_min * i), round(rnd.uniform(0, 3), 3)) for i in range(n)]
+
+
+def importar(tmp_path, filas, intervalo_min=None):
+    csv = "fecha,kwh\n" + "".join(f"{fecha.isoformat()},{kwh}\n" for fecha, kwh in filas)
+    ruta = str(tmp_path / 'caso.json.energia')
+    return ruta, importar_serie(io.BytesIO(csv.encode('utf-8')), ruta, intervalo_min)
+
+
+def precio_lectura(fecha, datos):
+    hora = fecha.hour + fecha.minute / 60
+    laborable = fecha.weekday() < 5
+    for periodo in datos.periodos:
+        if periodo.dias == 'todos' or (periodo.dias == 'laborables') == laborable:
+            if periodo.hora_desde <= hora < periodo.hora_hasta:
+                return periodo.precio
+    return datos.precio_kwh
+
+
+def test_tarifa_horaria_igual_a_lectura_por_lectura(tmp_path):
+    filas = lecturas(3 * 7 * 48 + 17)
+    ruta, resultado = importar(tmp_path, filas)
+    assert (resultado.lecturas, resultado.num_errores) == (len(filas), 0)
+    datos = DatosEnergia(tarifa='horaria', precio_kwh=0.10, periodos=[
+        PeriodoTarifa(dias='laborables', hora_desde=8, hora_hasta=18, precio=0.20),
+        PeriodoTarifa(dias='fin_de_semana', hora_desde=0, hora_hasta=24, precio=0.05),
+        PeriodoTarifa(dias='todos', hora_desde=18, hora_hasta=22.5, precio=0.15),
+    ])
+    with SerieEnergia(ruta) as serie:
+        costo = costo_serie(serie, datos)
+    assert costo['kwh_total'] == pytest.approx(sum(k for _, k in filas))
+    assert costo['costo_energia'] == pytest.approx(sum(k * precio_lectura(f, datos) for f, k in filas))
+
+
+def test_tarifa_escalonada_por_mes(tmp_path):
+    filas = lecturas(5 * 48)
+    ruta, _ = importar(tmp_path, filas)
+    datos = DatosEnergia(tarifa='escalonada', precio_kwh=0.30, tramos=[
+        TramoTarifa(hasta_kwh=50, precio=0.08), TramoTarifa(hasta_kwh=150, precio=0.12),
+    ])
+    por_mes = {}
+    for fecha, kwh in filas:
+        por_mes[fecha.month] = por_mes.get(fecha.month, 0.0) + kwh
+    with SerieEnergia(ruta) as serie:
+        mensual = acumulados(serie)['mensual']
+        costo = costo_serie(serie, datos)
+    assert [m['kwh'] for m in mensual] == pytest.approx([por_mes[1], por_mes[2]])
+    assert costo['costo_energia'] == pytest.approx(sum(costo_tramos(k, datos) for k in por_mes.values()))
+
+
+def test_costo_tramos():
+    datos = DatosEnergia(tarifa='escalonada', precio_kwh=0.30, tramos=[
+        TramoTarifa(hasta_kwh=100, precio=0.10), TramoTarifa(hasta_kwh=200, precio=0.20),
+    ])
+    assert costo_tramos(50, datos) == pytest.approx(5.0)
+    assert costo_tramos(150, datos) == pytest.approx(20.0)
+    assert costo_tramos(250, datos) == pytest.approx(45.0) # 100*0.10 + 100*0.20 + 50*0.30
+
+
+def test_fechas_con_zona_y_huecos(tmp_path):
+    filas = [
+        ("2024-03-01T10:00:00+01:00", 1.0),
+        ("2024-03-01T09:15:00Z", 2.0), # 10:15 en la zona de la primera lectura
+        ("2024-03-01T10:30:00+01:00", 3.0),
+        ("2024-03-01T11:15:00+01:00", 4.0), # Faltan las lecturas de las 10:45 y las 11:00
+        ("sin fecha", 5.0),
+    ]
+    csv = "fecha,kwh\n" + "".join(f"{f},{k}\n" for f, k in filas)
+    ruta = str(tmp_path / 'caso.json.energia')
+    resultado = importar_serie(io.BytesIO(csv.encode('utf-8')), ruta)
+    assert (resultado.lecturas, resultado.huecos, resultado.num_errores) == (4, 2, 1)
+    with SerieEnergia(ruta) as serie:
+        assert serie.inicio == datetime(2024, 3, 1, 10, 0)
+        assert serie.intervalo_min == 15
+        assert list(serie.kwh) == [1.0, 2.0, 3.0, 0.0, 0.0, 4.0]
+
+
+def test_lecturas_sin_item_de_consumo_se_reproducen_del_diario(cliente, directorio_casos, monkeypatch):
+    monkeypatch.setattr(CaseManager, 'modo_persistencia', MODO_DIARIO)
+    cliente.post('/iniciar-caso', data={'nombre_caso': 'Energía diario'})
+    cliente.post('/api/energia/tarifa', json={'tarifa': 'plana', 'precio_kwh': 0.1})
+    cliente.get('/guardar-caso') # Instantánea inicial; lo siguiente va al diario
+    filename, = [f for f in os.listdir(directorio_casos) if f.endswith('.json')]
+
+    csv = "fecha,kwh\n" + "".join(f"2024-03-01T{h:02d}:00:00,{1 + h % 3}\n" for h in range(24))
+    respuesta = cliente.post('/api/energia/lecturas', data=csv.encode('utf-8'), content_type='text/csv')
+    assert respuesta.status_code == 200
+    cliente.get('/guardar-caso')
+    assert os.path.exists(diario.ruta_diario(os.path.join(directorio_casos, filename)))
+
+    leido = leer_caso(filename)
+    assert leido is not None
+    caso = leido[0]
+    item, = [i for i in caso.inversion.capital_trabajo_items if i.descripcion == "Consumo electrico"]
+    assert item.total == pytest.approx(caso.energia.costo_anual)
+    assert caso.inversion.capital_trabajo == pytest.approx(item.total)
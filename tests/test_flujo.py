@@ -0,0 +1,47 @@
+import pytest
+
+from core.flujo import TIR_TOLERANCIA, tir_lote, van_lote
+from core.payback import descontar, payback_lote
+
+FLUJOS = [
+    [-1000.0, 300.0, 400.0, 500.0, 200.0],
+    [-500.0, -200.0, 400.0, 400.0, 400.0],
+    [-1000.0, 100.0, 100.0, 100.0],
+]
+
+
+def van_manual(flujo, tasa):
+    return sum(v / (1 + tasa / 100) ** t for t, v in enumerate(flujo))
+
+
+def test_van_coincide_con_el_calculo_directo():
+    for tasa in (0.0, 8.0, 12.5):
+        assert van_lote(FLUJOS, tasa) == pytest.approx([van_manual(f, tasa) for f in FLUJOS])
+
+
+def test_van_en_la_tir_es_cero():
+    tires = tir_lote(FLUJOS)
+    for flujo, tir in zip(FLUJOS[:2], tires):
+        assert tir is not None
+        assert van_manual(flujo, tir) == pytest.approx(0.0, abs=1e-6 * sum(abs(v) for v in flujo) + TIR_TOLERANCIA)
+
+
+def test_tir_sin_cambio_de_signo():
+    assert tir_lote([[100.0, 50.0], [0.0, 0.0]]) == [None, None]
+
+
+def test_payback():
+    simple = payback_lote(FLUJOS)
+    assert simple[0] == pytest.approx(2.6) # -1000 + 300 + 400 = -300; faltan 300 de 500
+    assert simple[1] == pytest.approx(2.75)
+    assert simple[2] is None
+    # Un año negativo después de recuperarse no cambia el primer año de recuperación
+    assert payback_lote([[-100.0, 150.0, -80.0, 50.0]]) == [pytest.approx(100 / 150)]
+
+
+def test_payback_descontado():
+    tasa = 10.0
+    descontados = descontar(FLUJOS, tasa)
+    assert descontados[0] == pytest.approx([v / 1.1 ** t for t, v in enumerate(FLUJOS[0])])
+    assert payback_lote(FLUJOS, tasa) == payback_lote(descontados)
+    assert payback_lote(FLUJOS, tasa)[0] > payback_lote(FLUJOS)[0]
@@ -0,0 +1,44 @@
+import io
+
+from core.importacion import IMPORTACION_CARGOS, TIPOS_IMPORTACION, importar_filas, leer_lote
+
+
+def test_csv_valido():
+    csv = "descripcion,valor_unitario,cantidad,dep_tipo,dep_metodo\nTorno,1500,2,Equipos,suma_digitos\nMesa,\"12,5\",4,,\n"
+    resultado = leer_lote(io.BytesIO(csv.encode('utf-8')), 'csv', TIPOS_IMPORTACION['activos'])
+    assert resultado.num_errores == 0
+    torno, mesa = resultado.items
+    assert (torno.valor_total, torno.dep_tipo, torno.dep_metodo) == (3000.0, 'Equipos', 'suma_digitos')
+    assert (mesa.valor_total, mesa.dep_metodo) == (50.0, 'lineal') # Vacío = valor por defecto
+    assert resultado.total_lote == 3050.0
+
+
+def test_json_valido():
+    datos = b'[{"descripcion": "Licencia", "valor_unitario": 900, "cantidad": 1, "amort_anios": 3}]'
+    resultado = leer_lote(io.BytesIO(datos), 'json', TIPOS_IMPORTACION['diferida'])
+    assert [(i.descripcion, i.total, i.amort_anios) for i in resultado.items] == [('Licencia', 900.0, 3)]
+
+
+def test_filas_invalidas_se_informan():
+    filas = [
+        {'descripcion': 'Bien', 'valor_unitario': '10', 'cantidad': '1'},
+        {'descripcion': 'Texto', 'valor_unitario': 'diez'},
+        {'descripcion': 'Fracción', 'cantidad': '1.5'},
+        {'descripcion': 'No finito', 'valor_unitario': 'nan'},
+        {'descripcion': 'Infinito', 'valor_unitario': 'inf'},
+        {'descripcion': 'Método', 'dep_metodo': 'acelerado'},
+        {'descripcion': 'Tipo', 'dep_tipo': 'Barcos'},
+        {'valor_unitario': '5'},
+        'no es un objeto',
+    ]
+    resultado = importar_filas(TIPOS_IMPORTACION['activos'], filas)
+    assert [i.descripcion for i in resultado.items] == ['Bien']
+    assert [e['fila'] for e in resultado.errores] == [2, 3, 4, 5, 6, 7, 8, 9]
+    assert resultado.num_errores == 8
+
+
+def test_cargos_calculan_su_rol():
+    resultado = importar_filas(IMPORTACION_CARGOS, [{'cargo': 'Operario', 'sueldo_nominal': '600'}])
+    cargo, = resultado.items
+    assert cargo.sueldo == 600.0
+    assert resultado.total_lote == cargo.pago_empleador
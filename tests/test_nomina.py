@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from core.models import DatosRolPagos, ItemRolPagos
+from core.nomina import CAMPOS_ROL, calcular_nomina, totales_anuales
+
+
+def cargos_aleatorios(n, semilla=3):
+    rnd = random.Random(semilla)
+    return [
+        ItemRolPagos(cargo=f"Cargo {i}", sueldo_nominal=rnd.uniform(460, 6000), dias_trabajados=rnd.randint(1, 30),
+                     no_he=rnd.randint(0, 40), no_hs=rnd.randint(0, 20), no_jn=rnd.randint(0, 10),
+                     comisiones=rnd.uniform(0, 300), descuentos=rnd.uniform(0, 50), quincenas=rnd.uniform(0, 200))
+        for i in range(n)
+    ]
+
+
+def test_campos_identicos_a_calcular_rol():
+    cargos = cargos_aleatorios(200)
+    datos = DatosRolPagos(num_proyeccion=6, cargos=cargos)
+    nomina = calcular_nomina(cargos, datos.factor_incremento, 6)
+    for anio, columnas in enumerate(nomina['anios']):
+        for k, cargo in enumerate(cargos):
+            referencia = datos.proyectar_cargo(cargo, anio)
+            for campo in CAMPOS_ROL:
+                assert columnas[campo][k] == getattr(referencia, campo), (anio, k, campo)
+
+
+def test_totales_identicos_a_la_suma_por_instancia():
+    cargos = cargos_aleatorios(300)
+    datos = DatosRolPagos(num_proyeccion=10, cargos=cargos)
+    esperado = [
+        sum((datos.proyectar_cargo(c, anio).pago_empleador * 12 for c in cargos), 0.0)
+        for anio in range(10)
+    ]
+    assert totales_anuales(cargos, datos.factor_incremento, 10) == esperado
+    assert calcular_nomina(cargos, datos.factor_incremento, 10)['totales_anuales'] == esperado
+    datos.recalcular_totales()
+    assert datos.totales_anuales == esperado
+
+
+def test_campos_desconocidos():
+    with pytest.raises(ValueError):
+        calcular_nomina(cargos_aleatorios(1), 1.0, 1, campos=['sueldo', 'otro'])
+
+
+def test_proyeccion_sin_cargos_tiene_todos_los_anios():
+    datos = DatosRolPagos(num_proyeccion=5)
+    anios = list(datos.proyeccion_anual)
+    assert len(anios) == 5
+    assert all(anio.items == [] and anio.total_anual == 0.0 for anio in anios)
+    assert datos.proyeccion_anual[-1] is anios[-1]
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+from core import case_manager, diario
+from core.autoguardado import autoguardado
+from core.case_manager import CaseManager, MODO_DIARIO, leer_caso
+from core.codec import a_dict
+from core.models import ActivoFijo
+
+
+def gestor_diario(nombre='Diario'):
+    gestor = CaseManager()
+    gestor.modo_persistencia = MODO_DIARIO
+    gestor.inicializar_nuevo_caso(nombre).rol_pagos.recalcular_totales() # Como queda al leerlo
+    gestor.marcar_modificado()
+    assert gestor.guardar_caso_actual()[0] # Instantánea inicial
+    return gestor
+
+
+def agregar_activo(gestor, descripcion, valor):
+    activo = ActivoFijo(descripcion=descripcion, valor_unitario=valor, cantidad=1)
+    activo.calcular_total()
+    gestor.obtener_caso_actual().inversion.activos_fijos.append(activo)
+    gestor.registrar_cambio('append', 'inversion.activos_fijos', a_dict(activo))
+
+
+def test_diario_se_reproduce_al_leer(directorio_casos):
+    gestor = gestor_diario()
+    caso = gestor.obtener_caso_actual()
+    agregar_activo(gestor, 'Torno', 1500.0)
+    agregar_activo(gestor, 'Fresadora', 2500.0)
+    caso.financiamiento.porcentaje_propio = 70.0
+    gestor.registrar_cambio('set', 'financiamiento.porcentaje_propio', 70.0)
+    assert gestor.guardar_caso_actual()[0]
+
+    filepath = os.path.join(directorio_casos, caso.filename)
+    assert len(list(diario.leer(filepath))) == 3 # Solo se anexaron las operaciones
+    leido, seq, lineas = leer_caso(caso.filename)
+    assert a_dict(leido) == a_dict(caso)
+    assert (seq, lineas) == (3, 3)
+
+
+def test_linea_truncada_se_ignora(directorio_casos):
+    gestor = gestor_diario()
+    caso = gestor.obtener_caso_actual()
+    agregar_activo(gestor, 'Torno', 1500.0)
+    assert gestor.guardar_caso_actual()[0]
+    with open(diario.ruta_diario(os.path.join(directorio_casos, caso.filename)), 'a', encoding='utf-8') as f:
+        f.write('[2,"append","inversion.activos_fijos",{"descripcion":"Cor') # Corte a mitad de escritura
+
+    leido, seq, _ = leer_caso(caso.filename)
+    assert [a.descripcion for a in leido.inversion.activos_fijos] == ['Torno']
+    assert seq == 1
+
+
+def test_compactacion_en_instantanea(directorio_casos):
+    gestor = gestor_diario()
+    gestor.umbral_diario = 2
+    caso = gestor.obtener_caso_actual()
+    for i in range(3):
+        agregar_activo(gestor, f'Activo {i}', 100.0 * (i + 1))
+    assert gestor.guardar_caso_actual()[0]
+
+    filepath = os.path.join(directorio_casos, caso.filename)
+    assert not os.path.exists(diario.ruta_diario(filepath))
+    leido, seq, lineas = leer_caso(caso.filename)
+    assert a_dict(leido) == a_dict(caso)
+    assert (seq, lineas) == (3, 0)
+
+
+def test_fallo_al_serializar_conserva_las_operaciones(directorio_casos, monkeypatch):
+    gestor = gestor_diario()
+    caso = gestor.obtener_caso_actual()
+    agregar_activo(gestor, 'Torno', 1500.0)
+
+    def fallar(*args, **kwargs):
+        raise ValueError("no serializable")
+
+    serializar = case_manager.serializar_caso
+    gestor.umbral_diario = 0 # Fuerza una instantánea
+    monkeypatch.setattr(case_manager, 'serializar_caso', fallar)
+    assert gestor.guardar_caso_actual() == (False, "no serializable")
+    assert gestor.modificado
+
+    # El siguiente guardado anexa al diario la operación que no se pudo guardar
+    monkeypatch.setattr(case_manager, 'serializar_caso', serializar)
+    gestor.umbral_diario = 500
+    assert gestor.guardar_caso_actual()[0]
+    leido, seq, _ = leer_caso(caso.filename)
+    assert [a.descripcion for a in leido.inversion.activos_fijos] == ['Torno']
+    assert seq == 1
+
+
+def test_autoguardado_no_espera_un_caso_en_uso(directorio_casos):
+    gestor = gestor_diario()
+    caso = gestor.obtener_caso_actual()
+    agregar_activo(gestor, 'Torno', 1500.0)
+
+    tomado, soltar = threading.Event(), threading.Event()
+
+    def peticion():
+        with gestor.lock:
+            tomado.set()
+            soltar.wait(5)
+
+    hilo = threading.Thread(target=peticion)
+    hilo.start()
+    tomado.wait(5)
+    try:
+        inicio = time.perf_counter()
+        autoguardado.vaciar(esperar=False)
+        assert time.perf_counter() - inicio < 1
+        assert gestor.modificado # Sigue pendiente para el próximo intervalo
+    finally:
+        soltar.set()
+        hilo.join()
+
+    autoguardado.vaciar()
+    assert not gestor.modificado
+    leido, _, _ = leer_caso(caso.filename)
+    assert [a.descripcion for a in leido.inversion.activos_fijos] == ['Torno']
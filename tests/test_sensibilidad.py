@@ -0,0 +1,11 @@
+from benchmarks.generador import caso_sintetico
+from core.sensibilidad import barrido, valores_rango
+
+
+def test_varios_procesos_dan_el_mismo_barrido():
+    caso = caso_sintetico(items=10, cargos=5, anios=6)
+    caso.flujo.precio_unitario, caso.flujo.costo_unitario = 40.0, 15.0
+    parametros = [('precio_unitario', valores_rango(30, 50, 4)), ('interes_anual', valores_rango(5, 12, 3))]
+    resultado = barrido(caso, parametros, procesos=2)
+    assert resultado['puntos'] == 12
+    assert resultado == barrido(caso, parametros, procesos=1)
@@ -0,0 +1,100 @@
+import math
+import random
+
+import pytest
+
+from benchmarks.generador import caso_sintetico
+from core.amortizacion import METODO_FRANCES
+from core.calculations import calcular_proyeccion, calcular_proyeccion_lote
+from core.flujo import calcular_flujos, evaluar_escenarios
+from core import simulacion
+from core.models import DatosSimulacion, Distribucion, Escenario
+from core.simulacion import (
+    PERCENTILES, _cronograma_frances, _cronograma_unitario, _fusionar, _percentil, _resumir_bloque,
+    cronograma_prestamo, flujo_neto, modelo_base, simular
+)
+
+
+def caso_con_flujo(metodo=METODO_FRANCES):
+    caso = caso_sintetico(items=20, cargos=10, anios=8)
+    caso.proyeccion.resultados_proyeccion = calcular_proyeccion(caso.proyeccion)
+    caso.flujo.precio_unitario, caso.flujo.costo_unitario = 45.0, 18.0
+    caso.flujo.gastos_fijos_anuales = 50000.0
+    caso.amortizacion.interes_anual, caso.amortizacion.anios = 9.5, 6
+    caso.amortizacion.metodo, caso.amortizacion.meses_gracia = metodo, 4
+    return caso
+
+
+def percentil_exacto(ordenados, p):
+    posicion = (len(ordenados) - 1) * p / 100
+    bajo = math.floor(posicion)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (posicion - bajo)
+
+
+@pytest.mark.parametrize('interes', [0.0, 0.5, 7.3, 24.0])
+@pytest.mark.parametrize('plazo,gracia', [(5, 0), (10, 6), (3, 36), (1, 3)])
+def test_cronograma_frances_igual_a_la_tabla(interes, plazo, gracia):
+    modelo = {'plazo': plazo, 'metodo': METODO_FRANCES, 'meses_gracia': gracia, 'anios': 8}
+    rapido, tabla = _cronograma_frances(modelo, interes), _cronograma_unitario(modelo, interes)
+    for clave in ('interes', 'amortizacion'):
+        assert rapido[clave] == pytest.approx(tabla[clave], rel=1e-12, abs=1e-15)
+
+
+@pytest.mark.parametrize('metodo', ['aleman', METODO_FRANCES])
+def test_flujo_neto_igual_al_escenario_real(metodo):
+    caso = caso_con_flujo(metodo)
+    modelo = modelo_base(caso)
+    cronograma = cronograma_prestamo(modelo, modelo['interes_anual'])
+    demanda = calcular_proyeccion_lote([modelo['demanda_inicial']], [modelo['tasa_crecimiento']], [modelo['anios']])[0]
+    flujo = flujo_neto(modelo, demanda, modelo['precio_unitario'], modelo['costo_unitario'], 1.0,
+                       cronograma['interes'], cronograma['amortizacion'])
+    real = calcular_flujos(caso, [Escenario(nombre='Real')])['flujo'][0]
+    assert flujo == pytest.approx(real, rel=1e-9)
+
+
+def test_simulacion_sin_varianza_da_el_van_del_escenario_real():
+    caso = caso_con_flujo()
+    datos = DatosSimulacion(trayectorias=50, distribuciones=[
+        Distribucion(parametro='precio_unitario', tipo='normal', media=45.0, desviacion=0.0),
+    ])
+    resultado = simular(caso, datos, procesos=1)
+    real = next(e for e in evaluar_escenarios(caso)['escenarios'] if e['nombre'] == 'Real')
+    assert resultado['van']['media'] == pytest.approx(real['van'], rel=1e-9)
+    assert resultado['van']['desviacion'] == pytest.approx(0.0, abs=1e-6 * abs(real['van']))
+    assert resultado['tir']['media'] == pytest.approx(real['tir'], rel=1e-6)
+
+
+def test_resumen_por_bloques_exacto_con_bloques_pequenos():
+    rnd = random.Random(2)
+    bloques = [[rnd.gauss(0, 50) for _ in range(n)] for n in (1, 700, 1999, 40)]
+    todos = sorted(v for b in bloques for v in b)
+    resumen = _fusionar([_resumir_bloque(b) for b in bloques])
+    assert resumen['n'] == len(todos)
+    assert resumen['negativos'] == sum(1 for v in todos if v < 0)
+    assert (resumen['minimo'], resumen['maximo']) == (todos[0], todos[-1])
+    media = math.fsum(todos) / len(todos)
+    assert resumen['m2'] == pytest.approx(math.fsum((v - media) ** 2 for v in todos))
+    for p in PERCENTILES + (0, 100, 33.3):
+        assert _percentil(resumen, p) == pytest.approx(percentil_exacto(todos, p), abs=1e-12)
+
+
+def test_resumen_por_bloques_acotado():
+    rnd = random.Random(4)
+    bloques = [[rnd.uniform(-100, 300) for _ in range(50_000)] for _ in range(3)]
+    todos = sorted(v for b in bloques for v in b)
+    resumenes = [_resumir_bloque(b) for b in bloques]
+    assert all(len(r['puntos']) <= 2000 for r in resumenes)
+    resumen = _fusionar(resumenes)
+    for p in PERCENTILES:
+        assert _percentil(resumen, p) == pytest.approx(percentil_exacto(todos, p), abs=0.5) # Rango de 400
+
+
+def test_varios_procesos_dan_el_mismo_resultado(monkeypatch):
+    monkeypatch.setattr(simulacion, 'TAMANO_BLOQUE', 1000)
+    caso = caso_con_flujo()
+    datos = DatosSimulacion(trayectorias=3000, semilla=9, distribuciones=[
+        Distribucion(parametro='precio_unitario', tipo='triangular', minimo=35.0, moda=45.0, maximo=50.0),
+        Distribucion(parametro='interes_anual', tipo='uniforme', minimo=6.0, maximo=12.0),
+    ])
+    assert simular(caso, datos, procesos=2) == simular(caso, datos, procesos=1)
@@ -0,0 +1,57 @@
+import pytest
+
+from core.models import DatosWacc, ItemWacc
+from core.wacc import leer_cambio
+
+
+def wacc_con_filas(filas=2, anios=5):
+    return DatosWacc(
+        tabla_utilidad=[ItemWacc(nombre=f"Empresa {i}", valores_anuales=[0.0] * anios) for i in range(filas)],
+        tabla_patrimonio=[ItemWacc(nombre=f"Empresa {i}", valores_anuales=[0.0] * anios) for i in range(filas)],
+    )
+
+
+def test_leer_cambio_valido():
+    wacc = wacc_con_filas()
+    assert leer_cambio({'tipo': 'patrimonio', 'fila': 1, 'col': 5, 'valor': '1,500.5'}, wacc, 5) == ('patrimonio', 1, 5, 1500.5)
+    assert leer_cambio({'fila': 0, 'col': 0, 'valor': ' Acme '}, wacc, 5) == ('utilidad', 0, 0, 'Acme')
+    assert leer_cambio({'fila': 0, 'col': 1, 'valor': ''}, wacc, 5) == ('utilidad', 0, 1, 0.0)
+
+
+@pytest.mark.parametrize('cambio', [
+    {'fila': 0, 'col': 6, 'valor': '1'},
+    {'fila': 0, 'col': 2_000_000, 'valor': '1'},
+    {'fila': 0, 'col': -1, 'valor': '1'},
+    {'fila': 2, 'col': 1, 'valor': '1'},
+    {'fila': 0, 'col': 1, 'valor': 'nan'},
+    {'fila': 0, 'col': 1, 'valor': 'inf'},
+    {'fila': 0, 'col': 1, 'valor': 'diez'},
+    {'tipo': 'otra', 'fila': 0, 'col': 1, 'valor': '1'},
+])
+def test_leer_cambio_invalido(cambio):
+    with pytest.raises(ValueError):
+        leer_cambio(cambio, wacc_con_filas(), 5)
+
+
+def test_rutas_rechazan_celdas_fuera_de_rango_y_no_finitas(cliente):
+    cliente.post('/iniciar-caso', data={'nombre_caso': 'WACC'})
+    cliente.post('/api/wacc/anhadir-fila')
+
+    for cambio in ({'tipo': 'utilidad', 'fila': 0, 'col': 2_000_000, 'valor': '1'},
+                   {'tipo': 'utilidad', 'fila': 0, 'col': 1, 'valor': 'nan'}):
+        respuesta = cliente.post('/api/wacc/guardar-celda', json=cambio)
+        assert respuesta.status_code == 400
+        assert respuesta.get_json()['success'] is False
+
+    respuesta = cliente.post('/api/wacc/guardar-celdas', json={'cambios': [
+        {'tipo': 'utilidad', 'fila': 0, 'col': 1, 'valor': '100'},
+        {'tipo': 'patrimonio', 'fila': 0, 'col': 1, 'valor': 'Infinity'},
+    ]})
+    assert respuesta.status_code == 400
+
+    respuesta = cliente.post('/api/wacc/guardar-celdas', json={'cambios': [
+        {'tipo': 'utilidad', 'fila': 0, 'col': 1, 'valor': '100'},
+        {'tipo': 'patrimonio', 'fila': 0, 'col': 1, 'valor': '400'},
+    ]})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['roe'] == [{'fila': 0, 'col': 0, 'valor': 0.25}]